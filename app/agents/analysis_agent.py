@@ -15,6 +15,7 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.agents.shared.config import AGENT_CONFIGS
+from app.tracing import span
 
 
 class AnalysisAgent:
@@ -24,7 +25,7 @@ class AnalysisAgent:
         cfg = AGENT_CONFIGS["analysis_agent"]
         self.role = cfg["role"]
         self.system_prompt = cfg["system_prompt"]
-        self.llm = get_llm()
+        self.llm = get_llm(agent="analysis_agent")
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", self.system_prompt),
@@ -51,6 +52,17 @@ class AnalysisAgent:
         )
         self.chain = self.prompt | self.llm | StrOutputParser()
 
+    @staticmethod
+    def _summary_inputs(question: str, sql: str, columns: Sequence[str], rows: Any, fallback_text: str) -> dict:
+        preview = rows[:30] if isinstance(rows, list) else rows
+        return {
+            "question": question,
+            "sql": sql,
+            "columns": list(columns or []),
+            "rows": preview,
+            "fallback_text": fallback_text,
+        }
+
     def summarize(
         self,
         question: str,
@@ -59,17 +71,27 @@ class AnalysisAgent:
         rows: Any,
         fallback_text: str,
     ) -> str:
-        preview = rows[:30] if isinstance(rows, list) else rows
         try:
-            text = self.chain.invoke(
-                {
-                    "question": question,
-                    "sql": sql,
-                    "columns": list(columns or []),
-                    "rows": preview,
-                    "fallback_text": fallback_text,
-                }
-            )
+            with span("llm.analysis_agent"):
+                text = self.chain.invoke(self._summary_inputs(question, sql, columns, rows, fallback_text))
+            cleaned = (text or "").strip()
+            if cleaned:
+                return cleaned
+        except Exception:
+            pass
+        return fallback_text
+
+    async def asummarize(
+        self,
+        question: str,
+        sql: str,
+        columns: Sequence[str],
+        rows: Any,
+        fallback_text: str,
+    ) -> str:
+        try:
+            with span("llm.analysis_agent"):
+                text = await self.chain.ainvoke(self._summary_inputs(question, sql, columns, rows, fallback_text))
             cleaned = (text or "").strip()
             if cleaned:
                 return cleaned
@@ -14,6 +14,7 @@ from langchain_core.prompts import ChatPromptTemplate
 
 from app.agents.shared.config import AGENT_CONFIGS
 from app.constants import clean_sql
+from app.tracing import span
 
 
 class ErrorAgent:
@@ -23,7 +24,7 @@ class ErrorAgent:
         cfg = AGENT_CONFIGS["error_agent"]
         self.role = cfg["role"]
         self.system_prompt = cfg["system_prompt"]
-        self.llm = get_llm()
+        self.llm = get_llm(agent="error_agent")
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", self.system_prompt),
@@ -42,16 +43,28 @@ class ErrorAgent:
         )
         self.chain = self.prompt | self.llm | StrOutputParser()
 
-    def repair_sql(self, question: str, schema_text: str, failed_sql: str, error_message: str) -> str:
-        raw = self.chain.invoke(
-            {
-                "question": question,
-                "schema": schema_text,
-                "failed_sql": failed_sql,
-                "error": error_message,
-            }
-        )
+    @staticmethod
+    def _repair_inputs(question: str, schema_text: str, failed_sql: str, error_message: str) -> dict:
+        return {
+            "question": question,
+            "schema": schema_text,
+            "failed_sql": failed_sql,
+            "error": error_message,
+        }
+
+    @staticmethod
+    def _clean_repaired(raw: str) -> str:
         sql = clean_sql(raw)
         if not sql:
             raise RuntimeError("Empty repaired SQL from model")
         return sql
+
+    def repair_sql(self, question: str, schema_text: str, failed_sql: str, error_message: str) -> str:
+        with span("llm.error_agent"):
+            raw = self.chain.invoke(self._repair_inputs(question, schema_text, failed_sql, error_message))
+        return self._clean_repaired(raw)
+
+    async def arepair_sql(self, question: str, schema_text: str, failed_sql: str, error_message: str) -> str:
+        with span("llm.error_agent"):
+            raw = await self.chain.ainvoke(self._repair_inputs(question, schema_text, failed_sql, error_message))
+        return self._clean_repaired(raw)
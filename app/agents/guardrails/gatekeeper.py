@@ -1,26 +1,33 @@
 import re
 
 from app.agents.guardrails.schemas import GatekeeperResult
+from app.question_features import SQL_MARKERS, question_features, vocabulary
 
-FORBIDDEN_INPUT_PATTERNS = [
-    r";", r"--", r"/\*", r"\*/",
-    r"\bDROP\b", r"\bDELETE\b", r"\bUPDATE\b", r"\bINSERT\b",
-    r"\bALTER\b", r"\bATTACH\b", r"\bDETACH\b", r"\bPRAGMA\b",
-    r"\bCREATE\b", r"\bREPLACE\b", r"\bCOPY\b",
-]
+# One keyword list feeds both the vocabularies the checks use and the regex
+# forms exported for callers that match text themselves.
+_FORBIDDEN_KEYWORDS = (
+    "drop", "delete", "update", "insert", "alter", "attach", "detach", "pragma", "create", "replace", "copy",
+)
+_PII_KEYWORDS = ("nom", "prenom", "date_naissance")
+
+_FORBIDDEN_WORDS = vocabulary(*_FORBIDDEN_KEYWORDS)
+_SQL_START_WORDS = _FORBIDDEN_WORDS | vocabulary("select")
+_PII_WORDS = vocabulary(*_PII_KEYWORDS)
 
-SQL_LIKE_START = r"^\s*(SELECT|UPDATE|DELETE|INSERT|DROP|ALTER|PRAGMA|ATTACH|CREATE|REPLACE|COPY)\b"
-PII_PATTERN = r"\b(nom|prenom|date_naissance)\b"
+FORBIDDEN_INPUT_PATTERNS = [re.escape(marker) for marker in SQL_MARKERS] + [
+    rf"\b{keyword.upper()}\b" for keyword in _FORBIDDEN_KEYWORDS
+]
+SQL_LIKE_START = r"^\s*({})\b".format("|".join(sorted(word.upper() for word in _SQL_START_WORDS)))
+PII_PATTERN = r"\b({})\b".format("|".join(_PII_KEYWORDS))
 
 
 def is_unsafe_user_input(q: str) -> bool:
-    q = q or ""
-    if re.search(SQL_LIKE_START, q, flags=re.IGNORECASE):
-        return True
-    for p in FORBIDDEN_INPUT_PATTERNS:
-        if re.search(p, q, flags=re.IGNORECASE):
-            return True
-    return False
+    features = question_features(q)
+    return (
+        features.has_sql_marker
+        or features.starts_with(_SQL_START_WORDS)
+        or features.has(_FORBIDDEN_WORDS)
+    )
 
 
 def gatekeep(user_question: str) -> GatekeeperResult:
@@ -37,7 +44,7 @@ def gatekeep(user_question: str) -> GatekeeperResult:
         )
 
     # 2) Block PII
-    if re.search(PII_PATTERN, q, flags=re.IGNORECASE):
+    if question_features(q).has(_PII_WORDS):
         return GatekeeperResult(
             status="OUT OF SCOPE",
             parsed_intent="pii_request",
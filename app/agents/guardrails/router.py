@@ -9,12 +9,12 @@ Connection in flow:
 
 from __future__ import annotations
 
-import re
 from dataclasses import dataclass
 from typing import Literal, Optional
 
 from app.agents.guardrails.gatekeeper import is_unsafe_user_input
 from app.messages import TIME_RANGE_CLARIFICATION_MESSAGE, build_ranking_clarification_message
+from app.question_features import QuestionFeatures, question_features, vocabulary
 
 Route = Literal["REFUSE", "CLARIFY", "DATA", "CHAT"]
 
@@ -26,56 +26,37 @@ class RouterDecision:
     clarifying_question: Optional[str] = None
 
 
-DATA_HINTS = [
+# Keyword vocabularies, matched as whole words/phrases via app.question_features.
+DATA_HINTS = vocabulary(
     # Core entity names
-    r"\bclients?\b",
-    r"\bcustomers?\b",
-    r"\bdossiers?\b",
-    r"\btransactions?\b",
-    r"\bpayments?\b",
+    "client", "clients", "customer", "customers", "dossier", "dossiers",
+    "transaction", "transactions", "payment", "payments",
     # Metrics / amounts
-    r"\bmontant\b",
-    r"\bamounts?\b",
-    r"\bspending?\b",
-    r"\brevenue\b",
-    r"\bsum\b",
-    r"\baverage\b",
-    r"\bmoyenne\b",
+    "montant", "amount", "amounts", "spending", "revenue", "sum", "average", "moyenne",
     # Dimensions
-    r"\bsegment\b",
-    r"\bcommunes?\b",
-    r"\bcities?\b",
-    r"\bcountry\b",
-    r"\bpays\b",
-    r"\benseigne\b",
-    r"\bcategorie_achat\b",
-    r"\bcategories?\b",
-    r"\bchannel\b",
-    r"\bcanal\b",
+    "segment", "commune", "communes", "cities", "country", "pays", "enseigne",
+    "categorie_achat", "categorie", "categories", "channel", "canal",
     # KPIs
-    r"\btaux\b",
-    r"\brates?\b",
-    r"\bratios?\b",
-    r"\bsolde\b",
-    r"\bbalance\b",
-    r"\bincidents?\b",
-    r"\bacceptance\b",
-    # Time signals
-    r"\b20\d{2}\b",
-    r"\bmonthly?\b",
-    r"\bmois\b",
-    r"\byearly?\b",
-    r"\bannee\b",
-]
-
-RANKING_PATTERN = r"\b(top|best|worst|highest|lowest|meilleur|pire)\b"
-METRIC_HINTS = r"\b(montant|total|sum|count|nombre|avg|average|moyenne|max|min|spend|dépense|transactions?|dossiers?|clients?)\b"
-TIME_HINTS = r"\b(20\d{2}|mois|month|année|year|entre|from|to|depuis|avant|après)\b"
+    "taux", "rate", "rates", "ratio", "ratios", "solde", "balance", "incident", "incidents", "acceptance",
+    # Time signals (years are matched separately)
+    "monthly", "mois", "yearly", "annee",
+)
+
+RANKING_HINTS = vocabulary("top", "best", "worst", "highest", "lowest", "meilleur", "pire")
+METRIC_HINTS = vocabulary(
+    "montant", "total", "sum", "count", "nombre", "avg", "average", "moyenne", "max", "min", "spend", "dépense",
+    "transaction", "transactions", "dossier", "dossiers", "client", "clients",
+)
+# Years are time hints too (QuestionFeatures.years).
+TIME_HINTS = vocabulary("mois", "month", "année", "year", "entre", "from", "to", "depuis", "avant", "après")
 # Entities that are inherently time-scoped (financial/activity data grows over time)
-TEMPORAL_ENTITY_HINTS = r"\b(transactions?|dossiers?|payments?|montant|amounts?|spending|revenue|paiements?)\b"
+TEMPORAL_ENTITY_HINTS = vocabulary(
+    "transaction", "transactions", "dossier", "dossiers", "payment", "payments", "montant",
+    "amount", "amounts", "spending", "revenue", "paiement", "paiements",
+)
 # Signals that the user wants an aggregate rather than a structural schema question
-AGGREGATE_HINTS = r"\b(total|sum|how many|nombre|combien|average|avg|moyenne|count)\b"
-GREETING_WORDS = {
+AGGREGATE_HINTS = vocabulary("total", "sum", "how many", "nombre", "combien", "average", "avg", "moyenne", "count")
+GREETING_WORDS = vocabulary(
     "hello",
     "hi",
     "hey",
@@ -84,21 +65,15 @@ GREETING_WORDS = {
     "yo",
     "goodmorning",
     "goodevening",
-}
+)
 
 
-def _contain_any(patterns: list[str], text: str) -> bool:
-    return any(re.search(p, text, flags=re.IGNORECASE) for p in patterns)
+def _is_greeting_message(features: QuestionFeatures) -> bool:
+    return 0 < len(features.words) <= 4 and all(word in GREETING_WORDS for word in features.words)
 
 
-def _is_greeting_message(text: str) -> bool:
-    cleaned = re.sub(r"[^a-zA-Z]", " ", (text or "").lower())
-    tokens = [t for t in cleaned.split() if t]
-    if not tokens:
-        return False
-    if len(tokens) > 4:
-        return False
-    return all(t in GREETING_WORDS for t in tokens)
+def _has_time_hint(features: QuestionFeatures) -> bool:
+    return bool(features.years) or features.has(TIME_HINTS)
 
 
 def route_message(message: str) -> RouterDecision:
@@ -109,12 +84,13 @@ def route_message(message: str) -> RouterDecision:
     if is_unsafe_user_input(q):
         return RouterDecision(route="REFUSE", reason="unsafe_sql_or_injection")
 
-    if _is_greeting_message(q):
+    features = question_features(q)
+    if _is_greeting_message(features):
         return RouterDecision(route="CHAT", reason="greeting")
 
-    if re.search(RANKING_PATTERN, q, flags=re.IGNORECASE):
-        need_metric = not re.search(METRIC_HINTS, q, flags=re.IGNORECASE)
-        need_time = not re.search(TIME_HINTS, q, flags=re.IGNORECASE)
+    if features.has(RANKING_HINTS):
+        need_metric = not features.has(METRIC_HINTS)
+        need_time = not _has_time_hint(features)
         if need_metric or need_time:
             missing = []
             if need_metric:
@@ -137,9 +113,9 @@ def route_message(message: str) -> RouterDecision:
     # Multi-turn follow-ups are exempt because context_resolver injects the prior
     # time reference into the question text before guardrails runs.
     if (
-        re.search(TEMPORAL_ENTITY_HINTS, q, flags=re.IGNORECASE)
-        and re.search(AGGREGATE_HINTS, q, flags=re.IGNORECASE)
-        and not re.search(TIME_HINTS, q, flags=re.IGNORECASE)
+        features.has(TEMPORAL_ENTITY_HINTS)
+        and features.has(AGGREGATE_HINTS)
+        and not _has_time_hint(features)
     ):
         return RouterDecision(
             route="CLARIFY",
@@ -147,7 +123,7 @@ def route_message(message: str) -> RouterDecision:
             clarifying_question=TIME_RANGE_CLARIFICATION_MESSAGE,
         )
 
-    if _contain_any(DATA_HINTS, q):
+    if features.years or features.has(DATA_HINTS):
         return RouterDecision(route="DATA", reason="mention_data_entities")
 
     return RouterDecision(route="CHAT", reason="no_data_signals")
@@ -2,7 +2,7 @@
 
 from typing import Any
 
-__all__ = ["AGENT_CONFIGS", "AgentConfig"]
+__all__ = ["AGENT_CONFIGS", "AgentConfig", "acall_agent", "get_agent", "reset_agents"]
 
 
 def __getattr__(name: str) -> Any:
@@ -14,4 +14,12 @@ def __getattr__(name: str) -> Any:
             "AgentConfig": AgentConfig,
         }
         return mapping[name]
+    if name in {"get_agent", "reset_agents"}:
+        from app.agents.shared import registry
+
+        return getattr(registry, name)
+    if name == "acall_agent":
+        from app.agents.shared.aio import acall_agent
+
+        return acall_agent
     raise AttributeError(f"module 'app.agents.shared' has no attribute {name!r}")
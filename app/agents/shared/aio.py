@@ -0,0 +1,19 @@
+"""Await agent methods from the async graph path.
+
+Agents expose a native coroutine next to each blocking method, named with an
+``a`` prefix (``generate_sql`` / ``agenerate_sql``) and built on the chain's
+``ainvoke``. Agents without one, such as test stubs or older plug-ins, are run
+in a worker thread so they never block the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+
+async def acall_agent(agent: Any, method: str, **kwargs: Any) -> Any:
+    native = getattr(agent, "a" + method, None)
+    if native is not None:
+        return await native(**kwargs)
+    return await asyncio.to_thread(getattr(agent, method), **kwargs)
@@ -0,0 +1,52 @@
+"""
+Process-wide agent instances, rebuilt only when LLM settings change.
+
+Connection in flow:
+- Upstream: used by app/pipeline/data_pipeline.py and app/pipeline/langgraph_flow.py.
+- This file: hands out one instance per agent slot, keyed by the factory and
+  the LLM settings fingerprint, so prompts, chains and HTTP clients are reused.
+- Downstream: agents keep their LLM client (and its connection pool) alive.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Hashable, TypeVar
+
+from app.llm.factory import LLMConfigurationError, llm_settings_fingerprint
+
+T = TypeVar("T")
+
+_AGENTS: dict[str, tuple[Callable[[], Any], Hashable, Any]] = {}
+_LOCK = threading.Lock()
+
+
+def agent_settings_fingerprint() -> Hashable:
+    """LLM settings fingerprint; configuration errors are left to the agent constructors."""
+    try:
+        return llm_settings_fingerprint()
+    except LLMConfigurationError as exc:
+        return ("unconfigured", str(exc))
+
+
+def get_agent(name: str, factory: Callable[[], T], uses_llm: bool = True) -> T:
+    """
+    Return the shared instance for an agent slot, building it on first use.
+
+    A new instance is built when the factory changes (e.g. a test stub) or,
+    for LLM-backed agents, when the settings fingerprint changes.
+    """
+    fingerprint = agent_settings_fingerprint() if uses_llm else None
+    with _LOCK:
+        entry = _AGENTS.get(name)
+        if entry is not None and entry[0] is factory and entry[1] == fingerprint:
+            return entry[2]
+        agent = factory()
+        _AGENTS[name] = (factory, fingerprint, agent)
+        return agent
+
+
+def reset_agents() -> None:
+    """Drop every shared agent (the next get_agent call rebuilds it)."""
+    with _LOCK:
+        _AGENTS.clear()
@@ -2,7 +2,7 @@
 
 from typing import Any
 
-__all__ = ["SQLAgent", "SQL_SYSTEM_PROMPT", "retrieve_similar_examples"]
+__all__ = ["SQLAgent", "SQL_SYSTEM_PROMPT", "compile_template_sql", "retrieve_similar_examples"]
 
 
 def __getattr__(name: str) -> Any:
@@ -14,6 +14,10 @@ def __getattr__(name: str) -> Any:
         from app.agents.sql.prompt import SQL_SYSTEM_PROMPT
 
         return SQL_SYSTEM_PROMPT
+    if name == "compile_template_sql":
+        from app.agents.sql.templates import compile_template_sql
+
+        return compile_template_sql
     if name == "retrieve_similar_examples":
         from app.agents.sql.retrieval import retrieve_similar_examples
 
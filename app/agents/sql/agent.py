@@ -17,6 +17,7 @@ from app.agents.shared.config import AGENT_CONFIGS
 from app.agents.sql.prompt import SQL_SYSTEM_PROMPT
 from app.agents.sql.retrieval import retrieve_similar_examples
 from app.constants import clean_sql
+from app.tracing import span
 
 
 class SQLAgent:
@@ -26,7 +27,7 @@ class SQLAgent:
         cfg = AGENT_CONFIGS["sql_agent"]
         self.role = cfg["role"]
         self.system_prompt = cfg["system_prompt"]
-        self.llm = get_llm()
+        self.llm = get_llm(agent="sql_agent")
         self.generate_prompt = ChatPromptTemplate.from_messages([
             ("system", SQL_SYSTEM_PROMPT),
             (
@@ -38,7 +39,7 @@ class SQLAgent:
         ])
         self.generate_chain = self.generate_prompt | self.llm | StrOutputParser()
 
-    def generate_sql(self, question: str, schema_text: str) -> str:
+    def _generate_inputs(self, question: str, schema_text: str) -> dict:
         similar = retrieve_similar_examples(question, k=3)
         if similar:
             examples_text = "\n\n".join(
@@ -46,13 +47,27 @@ class SQLAgent:
             )
         else:
             examples_text = "No examples available."
-
-        raw = self.generate_chain.invoke({
+        return {
             "question": question,
             "schema": schema_text,
             "examples": examples_text,
-        })
+        }
+
+    @staticmethod
+    def _clean_generated(raw: str) -> str:
         sql = clean_sql(raw)
         if not sql:
             raise RuntimeError("Empty SQL from model")
         return sql
+
+    def generate_sql(self, question: str, schema_text: str) -> str:
+        inputs = self._generate_inputs(question, schema_text)
+        with span("llm.sql_agent"):
+            raw = self.generate_chain.invoke(inputs)
+        return self._clean_generated(raw)
+
+    async def agenerate_sql(self, question: str, schema_text: str) -> str:
+        inputs = self._generate_inputs(question, schema_text)
+        with span("llm.sql_agent"):
+            raw = await self.generate_chain.ainvoke(inputs)
+        return self._clean_generated(raw)
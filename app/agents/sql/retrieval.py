@@ -9,14 +9,20 @@ TF-IDF cosine similarity layer that correctly handles rephrased questions.
 from __future__ import annotations
 
 import json
-import math
+import os
 import re
-from collections import Counter
+import threading
 from difflib import SequenceMatcher
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
 
 from app.agents.sql.example_bank import EXAMPLES
 
+if TYPE_CHECKING:
+    from scipy import sparse
+
 _STORE_PATH = Path(__file__).parent.parent.parent.parent / "data" / "rag_examples.json"
 _STOPWORDS = {
     "a", "an", "and", "are", "by", "count", "de", "des", "du", "for", "from",
@@ -73,56 +79,36 @@ def _tokenize(text: str) -> set[str]:
     }
 
 
-# ---------------------------------------------------------------------------
-# TF-IDF cosine similarity (no external deps)
-# ---------------------------------------------------------------------------
-
-_tfidf_cache: dict[str, tuple[list[dict], dict[str, float], list[dict[str, float]]]] | None = None
-
-
-def _build_tfidf_index(examples: list[dict]) -> tuple[dict[str, float], list[dict[str, float]]]:
-    """Build IDF table and per-example TF-IDF vectors from the example bank."""
-    doc_tokens: list[Counter] = [Counter(_tokenize(str(e.get("question", "")))) for e in examples]
-    n = len(doc_tokens)
-    df: Counter = Counter()
-    for ct in doc_tokens:
-        for tok in ct:
-            df[tok] += 1
-    idf: dict[str, float] = {tok: math.log((n + 1) / (freq + 1)) + 1.0 for tok, freq in df.items()}
-    vectors: list[dict[str, float]] = []
-    for ct in doc_tokens:
-        total = sum(ct.values()) or 1
-        vec = {tok: (count / total) * idf.get(tok, 1.0) for tok, count in ct.items()}
-        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
-        vectors.append({tok: v / norm for tok, v in vec.items()})
-    return idf, vectors
-
-
-def _cosine(query_vec: dict[str, float], doc_vec: dict[str, float]) -> float:
-    return sum(query_vec.get(tok, 0.0) * val for tok, val in doc_vec.items())
+# SQL shapes worth boosting: (query tokens, all required?, SQL fragment, weight).
+_SQL_PATTERNS: tuple[tuple[frozenset[str], bool, str, float], ...] = (
+    (frozenset({"segment", "client"}), True, "join", 2.0),
+    (frozenset({"average", "moyenne"}), False, "avg(", 1.5),
+    (frozenset({"total", "sum", "montant"}), False, "sum(", 1.5),
+    (frozenset({"ratio", "rate", "taux"}), False, "case when", 1.5),
+    (frozenset({"month", "hour", "year", "time"}), False, "strftime(", 1.5),
+    (frozenset({"top", "highest"}), False, "limit", 1.0),
+)
+_PATTERN_WEIGHTS = np.array([weight for _, _, _, weight in _SQL_PATTERNS])
+# Only this many best-scoring examples get the (pure Python) fuzzy ratio term.
+_FUZZY_CANDIDATES = 64
+
+
+def _query_pattern_mask(query_tokens: set[str]) -> np.ndarray:
+    return np.array(
+        [
+            tokens <= query_tokens if require_all else bool(tokens & query_tokens)
+            for tokens, require_all, _, _ in _SQL_PATTERNS
+        ]
+    )
 
 
-def _get_tfidf_index(examples: list[dict]):
-    global _tfidf_cache
-    # Invalidate cache if example set changed
-    cache_key = str(len(examples))
-    if _tfidf_cache is None or _tfidf_cache[0] != cache_key:
-        idf, vectors = _build_tfidf_index(examples)
-        _tfidf_cache = (cache_key, idf, vectors)
-    return _tfidf_cache[1], _tfidf_cache[2]
+def _sql_pattern_flags(sql: str) -> list[bool]:
+    lowered = sql.lower()
+    return [fragment in lowered for _, _, fragment, _ in _SQL_PATTERNS]
 
 
-def _tfidf_score(question: str, examples: list[dict]) -> list[float]:
-    """Return a cosine TF-IDF score for question vs each example."""
-    if not examples:
-        return []
-    idf, doc_vectors = _get_tfidf_index(examples)
-    q_tokens = Counter(_tokenize(question))
-    total = sum(q_tokens.values()) or 1
-    q_vec = {tok: (count / total) * idf.get(tok, 1.0) for tok, count in q_tokens.items()}
-    q_norm = math.sqrt(sum(v * v for v in q_vec.values())) or 1.0
-    q_vec = {tok: v / q_norm for tok, v in q_vec.items()}
-    return [_cosine(q_vec, dv) for dv in doc_vectors]
+def _fuzzy_ratio(query_text: str, example_text: str) -> float:
+    return SequenceMatcher(None, query_text, example_text).ratio()
 
 
 def _load_examples() -> list[dict[str, object]]:
@@ -136,37 +122,170 @@ def _load_examples() -> list[dict[str, object]]:
     return list(EXAMPLES)
 
 
+def _store_signature() -> Optional[tuple[int, int]]:
+    try:
+        stat = os.stat(_STORE_PATH)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 def _score_example(question: str, example: dict[str, object]) -> float:
+    """Score one example; the index computes the same terms for the whole bank."""
     query_tokens = _tokenize(question)
     example_tokens = _tokenize(str(example.get("question", "")))
     tag_tokens = {_normalize_token(str(tag)) for tag in example.get("tags", [])}
 
     overlap = len(query_tokens & example_tokens)
     tag_overlap = len(query_tokens & tag_tokens)
-    ratio = SequenceMatcher(
-        None,
-        " ".join(sorted(query_tokens)),
-        " ".join(sorted(example_tokens)),
-    ).ratio()
-
-    sql = str(example.get("sql", "")).lower()
-    pattern_score = 0.0
-    if {"segment", "client"} <= query_tokens and "join" in sql:
-        pattern_score += 2.0
-    if any(token in query_tokens for token in {"average", "moyenne"}) and "avg(" in sql:
-        pattern_score += 1.5
-    if any(token in query_tokens for token in {"total", "sum", "montant"}) and "sum(" in sql:
-        pattern_score += 1.5
-    if any(token in query_tokens for token in {"ratio", "rate", "taux"}) and "case when" in sql:
-        pattern_score += 1.5
-    if any(token in query_tokens for token in {"month", "hour", "year", "time"}) and "strftime(" in sql:
-        pattern_score += 1.5
-    if any(token in query_tokens for token in {"top", "highest"}) and "limit" in sql:
-        pattern_score += 1.0
+    ratio = _fuzzy_ratio(" ".join(sorted(query_tokens)), " ".join(sorted(example_tokens)))
+    flags = np.array(_sql_pattern_flags(str(example.get("sql", ""))))
+    pattern_score = float(_PATTERN_WEIGHTS[_query_pattern_mask(query_tokens) & flags].sum())
 
     return overlap * 3.0 + tag_overlap * 2.5 + ratio * 4.0 + pattern_score
 
 
+class _RetrievalIndex:
+    """In-memory index over the example bank.
+
+    Holds a token vocabulary with per-example token ids (the inverted index as
+    a sparse example x token matrix), tag ids, sorted token strings for the
+    fuzzy term and SQL pattern flags. Matrices are derived from those arrays
+    on demand, so adding an example never re-tokenizes the rest of the bank.
+    """
+
+    def __init__(self, examples: list[dict[str, object]], signature: Optional[tuple[int, int]]):
+        self.examples: list[dict[str, object]] = []
+        self.signature = signature
+        self._vocab: dict[str, int] = {}
+        self._token_ids: list[np.ndarray] = []
+        self._tag_ids: list[np.ndarray] = []
+        self._token_text: list[str] = []
+        self._flags: list[list[bool]] = []
+        self._by_question: dict[str, int] = {}
+        self._matrices: Optional[tuple[sparse.csr_matrix, sparse.csr_matrix, sparse.csr_matrix, np.ndarray, np.ndarray]] = None
+        for example in examples:
+            self._append(example)
+
+    def __len__(self) -> int:
+        return len(self.examples)
+
+    def _ids(self, tokens: set[str]) -> np.ndarray:
+        return np.array(sorted(self._vocab.setdefault(tok, len(self._vocab)) for tok in tokens), dtype=np.int64)
+
+    def _append(self, example: dict[str, object]) -> None:
+        tokens = _tokenize(str(example.get("question", "")))
+        tags = {_normalize_token(str(tag)) for tag in example.get("tags", [])}
+        self._by_question.setdefault(_normalize_question(str(example.get("question", ""))), len(self.examples))
+        self.examples.append(example)
+        self._token_ids.append(self._ids(tokens))
+        self._tag_ids.append(self._ids(tags))
+        self._token_text.append(" ".join(sorted(tokens)))
+        self._flags.append(_sql_pattern_flags(str(example.get("sql", ""))))
+        self._matrices = None
+
+    def upsert(self, question: str, sql: str) -> None:
+        """Update the SQL of a known question or append a new example."""
+        position = self._by_question.get(_normalize_question(question))
+        if position is None:
+            self._append({"question": question, "sql": sql, "tags": []})
+            return
+        self.examples[position]["sql"] = sql
+        self._flags[position] = _sql_pattern_flags(sql)
+        self._matrices = None
+
+    def _binary(self, id_lists: list[np.ndarray]) -> sparse.csr_matrix:
+        from scipy import sparse
+
+        indptr = np.zeros(len(id_lists) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in id_lists], out=indptr[1:])
+        indices = np.concatenate(id_lists) if id_lists else np.zeros(0, dtype=np.int64)
+        return sparse.csr_matrix(
+            (np.ones(len(indices)), indices, indptr),
+            shape=(len(id_lists), len(self._vocab)),
+        )
+
+    def matrices(self):
+        """(tokens, tags, tf-idf, idf, pattern flags), rebuilt only after changes."""
+        if self._matrices is None:
+            # scipy is imported on the first retrieval, not at start-up.
+            from scipy import sparse
+
+            tokens = self._binary(self._token_ids)
+            tags = self._binary(self._tag_ids)
+            n = len(self.examples)
+            doc_freq = np.asarray(tokens.sum(axis=0)).ravel()
+            # Tokens never seen in a question keep weight 1.0, like unseen query tokens.
+            idf = np.where(doc_freq > 0, np.log((n + 1) / (doc_freq + 1)) + 1.0, 1.0)
+            # Every token counts once per question, so the tf factor cancels
+            # out under L2 normalisation: rows are idf weights over their norm.
+            weighted = sparse.csr_matrix(tokens.multiply(idf))
+            norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            tfidf = sparse.csr_matrix(sparse.diags(1.0 / norms) @ weighted)
+            flags = np.array(self._flags, dtype=bool).reshape(n, len(_SQL_PATTERNS))
+            self._matrices = (tokens, tags, tfidf, idf, flags)
+        return self._matrices
+
+    def scores(self, question: str) -> np.ndarray:
+        """Combined score per example: normalised lexical + normalised TF-IDF."""
+        tokens, tags, tfidf, idf, flags = self.matrices()
+        query_tokens = _tokenize(question)
+        known = np.array(sorted(self._vocab[tok] for tok in query_tokens if tok in self._vocab), dtype=np.int64)
+
+        query = np.zeros(len(self._vocab))
+        query[known] = 1.0
+        overlap = tokens @ query
+        tag_overlap = tags @ query
+        pattern = flags.astype(float) @ (_PATTERN_WEIGHTS * _query_pattern_mask(query_tokens))
+
+        query_weights = np.zeros(len(self._vocab))
+        query_weights[known] = idf[known]
+        unknown = len(query_tokens) - len(known)
+        query_norm = np.sqrt(float(query_weights @ query_weights) + unknown) or 1.0
+        tfidf_scores = tfidf @ (query_weights / query_norm)
+
+        lexical = overlap * 3.0 + tag_overlap * 2.5 + pattern
+        # The fuzzy ratio adds at most 4.0, so it only re-ranks the shortlist.
+        shortlist = _top_indices(lexical + tfidf_scores * 4.0, _FUZZY_CANDIDATES)
+        query_text = " ".join(sorted(query_tokens))
+        for i in shortlist:
+            lexical[i] += 4.0 * _fuzzy_ratio(query_text, self._token_text[i])
+
+        max_lex = float(lexical.max(initial=0.0)) or 1.0
+        max_tfidf = float(tfidf_scores.max(initial=0.0)) or 1.0
+        return lexical / max_lex + tfidf_scores / max_tfidf
+
+
+def _normalize_question(question: str) -> str:
+    return " ".join((question or "").strip().lower().split())
+
+
+def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (ties keep bank order)."""
+    if k <= 0 or len(scores) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+_INDEX: Optional[_RetrievalIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def _get_index() -> _RetrievalIndex:
+    """Return the index, reloading only when the JSON store changed on disk."""
+    global _INDEX
+    signature = _store_signature()
+    with _INDEX_LOCK:
+        if _INDEX is None or _INDEX.signature != signature:
+            _INDEX = _RetrievalIndex(_load_examples(), signature)
+        return _INDEX
+
+
 def retrieve_similar_examples(question: str, k: int = 3) -> list[dict]:
     """Return the top-k most relevant examples for the incoming question.
 
@@ -175,57 +294,36 @@ def retrieve_similar_examples(question: str, k: int = 3) -> list[dict]:
     - TF-IDF cosine similarity (handles rephrased / synonym questions)
     Both are normalised and summed so neither dominates.
     """
-    examples = _load_examples()
-    if not examples:
+    index = _get_index()
+    if not len(index):
         return []
 
-    lexical_scores = [_score_example(question, e) for e in examples]
-    tfidf_scores = _tfidf_score(question, examples)
-
-    # Normalise each list to [0, 1] before combining
-    max_lex = max(lexical_scores, default=1.0) or 1.0
-    max_tfidf = max(tfidf_scores, default=1.0) or 1.0
-
-    combined = [
-        (lex / max_lex) + (tf / max_tfidf)
-        for lex, tf in zip(lexical_scores, tfidf_scores)
+    with _INDEX_LOCK:
+        scores = index.scores(question)
+    return [
+        {
+            "question": str(index.examples[i].get("question", "")),
+            "sql": str(index.examples[i].get("sql", "")),
+            "tags": list(index.examples[i].get("tags", [])),
+        }
+        for i in _top_indices(scores, k)
+        if scores[i] > 0
     ]
 
-    ranked = sorted(
-        (
-            (
-                combined[i],
-                {
-                    "question": str(examples[i].get("question", "")),
-                    "sql": str(examples[i].get("sql", "")),
-                    "tags": list(examples[i].get("tags", [])),
-                },
-            )
-            for i in range(len(examples))
-        ),
-        key=lambda item: item[0],
-        reverse=True,
-    )
-    return [example for score, example in ranked[:k] if score > 0]
-
 
 def add_example(question: str, sql: str) -> None:
     """Add or update a local example in the JSON-backed retrieval store."""
-    examples = _load_examples()
-    normalized_question = " ".join((question or "").strip().lower().split())
-    updated = False
-    for example in examples:
-        if " ".join(str(example.get("question", "")).strip().lower().split()) == normalized_question:
-            example["sql"] = sql
-            updated = True
-            break
-    if not updated:
-        examples.append({"question": question, "sql": sql, "tags": []})
-
-    _STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    _STORE_PATH.write_text(json.dumps(examples, ensure_ascii=False, indent=2), encoding="utf-8")
+    global _INDEX
+    index = _get_index()
+    with _INDEX_LOCK:
+        index.upsert(question, sql)
+        _STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _STORE_PATH.write_text(json.dumps(index.examples, ensure_ascii=False, indent=2), encoding="utf-8")
+        # The in-memory index already reflects the write; adopt the new file version.
+        index.signature = _store_signature()
+        _INDEX = index
 
 
 def count_examples() -> int:
     """Return the number of available retrieval examples."""
-    return len(_load_examples())
\ No newline at end of file
+    return len(_get_index())
@@ -0,0 +1,391 @@
+"""Rule-based SQL for the common "count/sum/average X by Y in year Z" questions.
+
+compile_template_sql() reads the question word by word against a small
+lexicon (aggregates, the three business tables, measured columns, grouping
+dimensions, a year, "top N") and, when every word is understood, fills a
+fixed SELECT template from the live schema. Joins come from
+_infer_relationships. Anything outside that grammar - an unknown word, two
+dimensions, an ambiguous column, a join that would double count - returns
+None and the question goes to the LLM as before.
+
+In the graph the question has already been rewritten into the normalized
+request block, so compile_request_sql() parses the request's
+original_question instead and checks it against the request's filters,
+year, grouping, limit and sort, which may carry over from earlier turns.
+
+Only schema identifiers, a four-digit year and an integer LIMIT ever reach
+the SQL text, so filling the template cannot inject anything.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.db.sqlite import TableDef, _infer_relationships, _load_schema
+from app.question_features import question_features
+
+_MAX_PHRASE_WORDS = 3
+_DEFAULT_LIMIT = 200
+
+_AGGREGATES: Dict[str, str] = {
+    "how many": "count",
+    "number of": "count",
+    "total number of": "count",
+    "count": "count",
+    "count of": "count",
+    "nombre": "count",
+    "nombre de": "count",
+    "nb": "count",
+    "total": "sum",
+    "sum": "sum",
+    "sum of": "sum",
+    "somme": "sum",
+    "average": "avg",
+    "avg": "avg",
+    "mean": "avg",
+    "moyenne": "avg",
+    "moyen": "avg",
+}
+_ENTITIES: Dict[str, str] = {
+    "client": "clients",
+    "clients": "clients",
+    "customer": "clients",
+    "customers": "clients",
+    "dossier": "dossiers",
+    "dossiers": "dossiers",
+    "application": "dossiers",
+    "applications": "dossiers",
+    "transaction": "transactions",
+    "transactions": "transactions",
+    "payment": "transactions",
+    "payments": "transactions",
+    "purchase": "transactions",
+    "purchases": "transactions",
+}
+# Measured (summed / averaged) columns.
+_VALUES: Dict[str, str] = {
+    "amount": "montant",
+    "amounts": "montant",
+    "montant": "montant",
+    "montants": "montant",
+    "spend": "montant",
+    "spending": "montant",
+    "seniority": "anciennete_mois",
+    "anciennete": "anciennete_mois",
+    "tenure": "anciennete_mois",
+    "incidents": "nombre_incidents_paiement",
+    "payment incidents": "nombre_incidents_paiement",
+    "fragility score": "score_client_fragile",
+}
+# Grouping columns; "month" and "year" group on the measured table's date column.
+_DIMENSIONS: Dict[str, str] = {
+    "segment": "segment_client",
+    "segments": "segment_client",
+    "client segment": "segment_client",
+    "customer segment": "segment_client",
+    "segment_client": "segment_client",
+    "commune": "commune",
+    "communes": "commune",
+    "city": "commune",
+    "cities": "commune",
+    "country": "pays",
+    "countries": "pays",
+    "pays": "pays",
+    "category": "categorie_achat",
+    "categories": "categorie_achat",
+    "purchase category": "categorie_achat",
+    "spending category": "categorie_achat",
+    "categorie": "categorie_achat",
+    "categorie_achat": "categorie_achat",
+    "enseigne": "enseigne",
+    "enseignes": "enseigne",
+    "retailer": "enseigne",
+    "retailers": "enseigne",
+    "merchant": "enseigne",
+    "merchants": "enseigne",
+    "channel": "canal_souscription",
+    "channels": "canal_souscription",
+    "subscription channel": "canal_souscription",
+    "canal": "canal_souscription",
+    "canal de souscription": "canal_souscription",
+    "canal_souscription": "canal_souscription",
+    "product": "type_produit",
+    "products": "type_produit",
+    "product type": "type_produit",
+    "product types": "type_produit",
+    "type de produit": "type_produit",
+    "type_produit": "type_produit",
+    "month": "month",
+    "months": "month",
+    "monthly": "month",
+    "mois": "month",
+    "year": "year",
+    "years": "year",
+    "yearly": "year",
+    "annual": "year",
+    "annee": "year",
+}
+_ORDER: Dict[str, str] = {
+    "highest": "DESC",
+    "most": "DESC",
+    "largest": "DESC",
+    "lowest": "ASC",
+    "least": "ASC",
+    "smallest": "ASC",
+}
+_FILLER = frozenset({
+    "a", "all", "an", "are", "by", "de", "des", "du", "during", "each", "en",
+    "for", "get", "give", "in", "is", "la", "le", "les", "me", "of", "over",
+    "par", "per", "please", "s", "show", "the", "there", "was", "were", "what",
+    "which",
+})
+# build_normalized_request dimension names -> _DIMENSIONS values.
+_REQUEST_DIMENSIONS: Dict[str, str] = {
+    "commune": "commune",
+    "country": "pays",
+    "month": "month",
+    "year": "year",
+    "segment": "segment_client",
+}
+# Dimension -> (SQL expression template over the date column, output alias).
+_TIME_GROUPS = {
+    "month": ("strftime('%Y-%m', {})", "mois"),
+    "year": ("strftime('%Y', {})", "annee"),
+}
+
+
+def templates_enabled() -> bool:
+    """SQL_TEMPLATES=off sends every question to the LLM."""
+    return os.getenv("SQL_TEMPLATES", "on").strip().lower() not in {"off", "0", "false", "no"}
+
+
+@dataclass(frozen=True)
+class _Slots:
+    aggregate: str = ""
+    entity: str = ""
+    value: str = ""
+    dimension: str = ""
+    year: str = ""
+    top_k: Optional[int] = None
+    order: str = ""
+
+
+def _parse(question: str) -> Optional[_Slots]:
+    """Slots of question, or None when any word is outside the lexicon."""
+    features = question_features(question)
+    words = features.words
+    slots = _Slots()
+    i = 0
+    while i < len(words):
+        for size in range(min(_MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+            phrase = " ".join(words[i:i + size])
+            slot, value = _classify(phrase)
+            if slot:
+                break
+        else:
+            word = words[i]
+            if word == "top" and i + 1 < len(words) and words[i + 1].isdecimal():
+                slot, value, size = "top_k", int(words[i + 1]), 2
+            elif word in features.years:
+                slot, value, size = "year", word, 1
+            elif word in _FILLER:
+                i += 1
+                continue
+            else:
+                return None
+        current = getattr(slots, slot)
+        if current and current != value:
+            return None
+        slots = replace(slots, **{slot: value})
+        i += size
+    return slots
+
+
+def _classify(phrase: str) -> Tuple[str, object]:
+    for slot, lexicon in (
+        ("aggregate", _AGGREGATES),
+        ("entity", _ENTITIES),
+        ("value", _VALUES),
+        ("dimension", _DIMENSIONS),
+        ("order", _ORDER),
+    ):
+        if phrase in lexicon:
+            return slot, lexicon[phrase]
+    return "", None
+
+
+def _with_conventional_keys(tables: Tuple[TableDef, ...]) -> Tuple[TableDef, ...]:
+    """Mark <singular>_id as the primary key of tables declared without one.
+
+    The production database is written by pandas, which declares no keys, so
+    _infer_relationships would otherwise find no joins there.
+    """
+    keyed = []
+    for table in tables:
+        if not any(column.is_pk for column in table.columns):
+            key = f"{table.name.rstrip('s')}_id"
+            table = replace(
+                table,
+                columns=tuple(replace(column, is_pk=column.name == key) for column in table.columns),
+            )
+        keyed.append(table)
+    return tuple(keyed)
+
+
+def _date_column(table: TableDef) -> str:
+    names = [column.name for column in table.columns]
+    preferred = f"date_{table.name.rstrip('s')}"
+    if preferred in names:
+        return preferred
+    return next((name for name in names if name.startswith("date_")), "")
+
+
+def _primary_key(table: TableDef) -> str:
+    return next((column.name for column in table.columns if column.is_pk), "")
+
+
+def _has_column(table: TableDef, name: str) -> bool:
+    return any(column.name == name for column in table.columns)
+
+
+def _join(
+    tables: Tuple[TableDef, ...], measure: str, other: str
+) -> Optional[Tuple[str, bool]]:
+    """(ON condition, measure is the referenced side) for measure JOIN other."""
+    for relationship in _infer_relationships(tables, {measure, other}):
+        source, target = (part.strip() for part in relationship.split("->"))
+        source_table, column = source.split(".")
+        target_table = target.split(".")[0]
+        condition = f"{measure[0]}.{column} = {other[0]}.{column}"
+        if source_table == measure and target_table == other:
+            return condition, False
+        if source_table == other and target_table == measure:
+            return condition, True
+    return None
+
+
+def compile_template_sql(db_path: str, question: str) -> Optional[str]:
+    """Deterministic SQL for question, or None when it needs the LLM."""
+    return _compile(db_path, _parse(question))
+
+
+def _matches_request(slots: _Slots, request: Mapping[str, Any]) -> bool:
+    """True when the request says nothing the user's own words do not."""
+    filters = dict(request.get("filters") or {})
+    if set(filters) - {"year"} or filters.get("year", "") != slots.year:
+        return False
+    time_reference = dict(request.get("time_reference") or {})
+    if str(time_reference.get("value", "")) != slots.year:
+        return False
+    if request.get("limit") != slots.top_k:
+        return False
+    dimensions = [_REQUEST_DIMENSIONS.get(name, name) for name in request.get("dimensions") or []]
+    if dimensions != ([slots.dimension] if slots.dimension in dimensions else []):
+        return False
+    direction = str(request.get("sort_direction") or "").upper()
+    ranked = slots.dimension and slots.dimension not in _TIME_GROUPS
+    return not (direction and ranked and direction != (slots.order or "DESC"))
+
+
+def compile_request_sql(db_path: str, request: Mapping[str, Any]) -> Optional[str]:
+    """compile_template_sql for a build_normalized_request() dict.
+
+    Follow-up turns inherit filters, years, groupings, limits and sorts the
+    original question never mentions; those requests go to the LLM.
+    """
+    slots = _parse(str(request.get("original_question") or ""))
+    if slots is None or not _matches_request(slots, request):
+        return None
+    return _compile(db_path, slots)
+
+
+def _compile(db_path: str, slots: Optional[_Slots]) -> Optional[str]:
+    if slots is None or not (slots.aggregate or slots.value or (slots.entity and slots.dimension)):
+        return None
+    try:
+        tables = _with_conventional_keys(_load_schema(db_path))
+    except (OSError, sqlite3.Error):
+        return None
+    by_name = {table.name: table for table in tables}
+
+    measure = slots.entity
+    if slots.value:
+        owners = [name for name, table in by_name.items() if _has_column(table, slots.value)]
+        if measure:
+            if measure not in owners:
+                return None
+        elif len(owners) == 1:
+            measure = owners[0]
+        else:
+            return None
+    if measure not in by_name:
+        return None
+    table = by_name[measure]
+
+    aggregate = slots.aggregate or "count"
+    if (aggregate == "count") == bool(slots.value):
+        # "total amount" needs a sum/avg word, "how many" must not name a column.
+        return None
+
+    date_column = _date_column(table)
+    if (slots.year or slots.dimension in _TIME_GROUPS) and not date_column:
+        return None
+    if slots.top_k is not None and (not slots.dimension or slots.dimension in _TIME_GROUPS):
+        return None
+
+    # Resolve the grouping column, joining when it lives on another table.
+    join = ""
+    group_table = measure
+    one_side = False
+    if slots.dimension and slots.dimension not in _TIME_GROUPS and not _has_column(table, slots.dimension):
+        owners = [name for name, other in by_name.items() if name != measure and _has_column(other, slots.dimension)]
+        if len(owners) != 1:
+            return None
+        found = _join(tables, measure, owners[0])
+        if found is None or owners[0][0] == measure[0]:
+            return None
+        condition, one_side = found
+        if one_side and aggregate != "count":
+            # Summing the "one" side over a one-to-many join counts it once per child row.
+            return None
+        group_table = owners[0]
+        join = f" {measure} {measure[0]} JOIN {group_table} {group_table[0]} ON {condition}"
+
+    def column(table_name: str, name: str) -> str:
+        return f"{table_name[0]}.{name}" if join else name
+
+    if aggregate == "count":
+        key = _primary_key(table)
+        if one_side and not key:
+            return None
+        metric = f"COUNT(DISTINCT {column(measure, key)})" if one_side else "COUNT(*)"
+        alias = "nb"
+    elif aggregate == "sum":
+        metric, alias = f"SUM({column(measure, slots.value)})", f"{slots.value}_total"
+    else:
+        metric, alias = f"AVG({column(measure, slots.value)})", f"{slots.value}_moyen"
+
+    select = [f"{metric} AS {alias}"]
+    where = ""
+    if slots.year:
+        where = f" WHERE strftime('%Y', {column(measure, date_column)}) = '{slots.year}'"
+    group = order = ""
+    if slots.dimension in _TIME_GROUPS:
+        expression, time_alias = _TIME_GROUPS[slots.dimension]
+        select.insert(0, f"{expression.format(column(measure, date_column))} AS {time_alias}")
+        group = f" GROUP BY {time_alias}"
+        order = f" ORDER BY {time_alias}"
+    elif slots.dimension:
+        grouped = column(group_table, slots.dimension)
+        select.insert(0, grouped)
+        limit = slots.top_k if slots.top_k is not None else _DEFAULT_LIMIT
+        group = f" GROUP BY {grouped}"
+        order = f" ORDER BY {alias} {slots.order or 'DESC'} LIMIT {limit}"
+    elif slots.order:
+        return None
+
+    source = join or f" {measure}"
+    return f"SELECT {', '.join(select)} FROM{source}{where}{group}{order}"
@@ -9,16 +9,21 @@ Connection in flow:
 
 from __future__ import annotations
 
+import asyncio
 import concurrent.futures
 import json
-from typing import Any, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Optional, Sequence
 
-import pandas as pd
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.agents.shared.config import AGENT_CONFIGS
+from app.db.result_set import ResultSet
 from app.constants import strip_code_fences
+from app.tracing import span
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class VizAgent:
@@ -28,7 +33,7 @@ class VizAgent:
         cfg = AGENT_CONFIGS["viz_agent"]
         self.role = cfg["role"]
         self.system_prompt = cfg["system_prompt"]
-        self.llm = get_llm()
+        self.llm = get_llm(agent="viz_agent")
         self.prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", self.system_prompt),
@@ -50,6 +55,70 @@ class VizAgent:
         )
         self.chain = self.prompt | self.llm | StrOutputParser()
 
+    @staticmethod
+    def _frame(columns: Sequence[str], rows: Any) -> Optional[pd.DataFrame]:
+        # pandas is only needed once a chart is generated; keep it off the import path.
+        import pandas as pd
+
+        if isinstance(rows, ResultSet):
+            # Shallow copy: generated code may add columns, never touch the shared frame.
+            df = rows.to_frame().copy(deep=False)
+        elif not isinstance(rows[0], dict):
+            df = pd.DataFrame(rows, columns=list(columns))
+        else:
+            df = pd.DataFrame(rows)
+        if df.empty or len(df.columns) < 2:
+            return None
+        return df
+
+    @staticmethod
+    def _chain_inputs(question: str, df: pd.DataFrame) -> dict:
+        return {
+            "question": question,
+            "columns": list(df.columns),
+            "rows": json.dumps(df.head(20).to_dict(orient="records"), ensure_ascii=False),
+        }
+
+    @staticmethod
+    def _render(raw: str, df: pd.DataFrame, px: Any, go: Any, fallback_viz: Optional[dict[str, Any]]) -> Optional[dict[str, Any]]:
+        code = strip_code_fences(raw)
+        if not code or "import " in code:
+            return fallback_viz
+
+        safe_builtins = {
+            "len": len,
+            "min": min,
+            "max": max,
+            "sum": sum,
+            "sorted": sorted,
+            "range": range,
+            "list": list,
+            "dict": dict,
+            "float": float,
+            "int": int,
+            "str": str,
+        }
+        env: dict[str, Any] = {
+            "__builtins__": safe_builtins,
+            "df": df,
+            "px": px,
+            "go": go,
+        }
+        def _run_exec() -> None:
+            exec(code, env, env)  # noqa: S102 - restricted builtins sandbox
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as _ex:
+            _future = _ex.submit(_run_exec)
+            try:
+                _future.result(timeout=5.0)
+            except (concurrent.futures.TimeoutError, Exception):
+                return fallback_viz
+
+        fig = env.get("fig")
+        if fig is None or not hasattr(fig, "to_dict"):
+            return fallback_viz
+        return {"type": "plotly", "figure": fig.to_dict()}
+
     def generate(
         self,
         question: str,
@@ -67,53 +136,38 @@ class VizAgent:
             return fallback_viz
 
         try:
-            df = pd.DataFrame(rows, columns=list(columns)) if rows and not isinstance(rows[0], dict) else pd.DataFrame(rows)
-            if df.empty or len(df.columns) < 2:
+            df = self._frame(columns, rows)
+            if df is None:
                 return fallback_viz
+            with span("llm.viz_agent"):
+                raw = self.chain.invoke(self._chain_inputs(question, df))
+            return self._render(raw, df, px, go, fallback_viz)
+        except Exception:
+            return fallback_viz
 
-            raw = self.chain.invoke(
-                {
-                    "question": question,
-                    "columns": list(df.columns),
-                    "rows": json.dumps(df.head(20).to_dict(orient="records"), ensure_ascii=False),
-                }
-            )
-            code = strip_code_fences(raw)
-            if not code or "import " in code:
-                return fallback_viz
+    async def agenerate(
+        self,
+        question: str,
+        columns: Sequence[str],
+        rows: Any,
+        fallback_viz: Optional[dict[str, Any]] = None,
+    ) -> Optional[dict[str, Any]]:
+        if not isinstance(rows, list) or not rows:
+            return fallback_viz
 
-            safe_builtins = {
-                "len": len,
-                "min": min,
-                "max": max,
-                "sum": sum,
-                "sorted": sorted,
-                "range": range,
-                "list": list,
-                "dict": dict,
-                "float": float,
-                "int": int,
-                "str": str,
-            }
-            env: dict[str, Any] = {
-                "__builtins__": safe_builtins,
-                "df": df,
-                "px": px,
-                "go": go,
-            }
-            def _run_exec() -> None:
-                exec(code, env, env)  # noqa: S102 - restricted builtins sandbox
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as _ex:
-                _future = _ex.submit(_run_exec)
-                try:
-                    _future.result(timeout=5.0)
-                except (concurrent.futures.TimeoutError, Exception):
-                    return fallback_viz
-
-            fig = env.get("fig")
-            if fig is None or not hasattr(fig, "to_dict"):
+        try:
+            import plotly.express as px
+            import plotly.graph_objects as go
+        except Exception:
+            return fallback_viz
+
+        try:
+            df = self._frame(columns, rows)
+            if df is None:
                 return fallback_viz
-            return {"type": "plotly", "figure": fig.to_dict()}
+            with span("llm.viz_agent"):
+                raw = await self.chain.ainvoke(self._chain_inputs(question, df))
+            # Running generated code and serializing the figure is CPU work; keep it off the loop.
+            return await asyncio.to_thread(self._render, raw, df, px, go, fallback_viz)
         except Exception:
             return fallback_viz
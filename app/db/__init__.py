@@ -1,13 +1,28 @@
 """Database access helpers."""
 
-from app.db.corrections import fetch_similar_correction, log_correction
-from app.db.sqlite import DBConfig, get_prompt_schema_text, get_schema_text, run_query, table_exists
+from app.db.corrections import corrections_db_path, fetch_similar_correction, log_correction
+from app.db.result_set import ResultSet
+from app.db.sqlite import (
+    DBConfig,
+    count_query_rows,
+    get_prompt_schema_text,
+    get_schema_text,
+    invalidate_connection_pool,
+    iter_query,
+    run_query,
+    table_exists,
+)
 
 __all__ = [
     "DBConfig",
+    "ResultSet",
+    "corrections_db_path",
+    "count_query_rows",
     "fetch_similar_correction",
     "get_prompt_schema_text",
     "get_schema_text",
+    "invalidate_connection_pool",
+    "iter_query",
     "log_correction",
     "run_query",
     "table_exists",
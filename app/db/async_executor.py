@@ -0,0 +1,77 @@
+"""Bounded thread pool for running SQLite work from async code.
+
+The async graph path awaits LLM calls on the event loop, but the sqlite3
+module only offers blocking calls. Schema lookups, correction lookups and
+query execution are therefore sent to a small shared pool, so many
+conversations can wait on the LLM while only a bounded number of threads
+touch the database. Each worker keeps its own pooled read-only connections.
+
+Cancelling the awaiting task (or letting asyncio.wait_for time out) also
+interrupts the query that is running for it in the worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.db.sqlite import cancellation_scope
+
+T = TypeVar("T")
+
+_DEFAULT_WORKERS = 8
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def executor_workers() -> int:
+    """Worker count from SQLITE_EXECUTOR_WORKERS (at least 1)."""
+    try:
+        workers = int(os.getenv("SQLITE_EXECUTOR_WORKERS", str(_DEFAULT_WORKERS)))
+    except ValueError:
+        workers = _DEFAULT_WORKERS
+    return max(1, workers)
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=executor_workers(), thread_name_prefix="sqlite")
+        return _EXECUTOR
+
+
+def shutdown_db_executor() -> None:
+    """Stop the pool; the next call to run_in_db_executor starts a new one."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_cancellable(event: threading.Event, call: Callable[[], T]) -> T:
+    if event.is_set():
+        raise asyncio.CancelledError()
+    with cancellation_scope(event):
+        return call()
+
+
+async def run_in_db_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking database call on the shared pool and await its result."""
+    loop = asyncio.get_running_loop()
+    event = threading.Event()
+    # Run in a copy of the caller's context so tracing spans nest under the awaiting node.
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    future = loop.run_in_executor(get_db_executor(), _run_cancellable, event, call)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        event.set()
+        raise
@@ -0,0 +1,489 @@
+"""SQLite-backed LangGraph checkpointer for multi-turn memory.
+
+Conversations survive restarts and can be shared by several worker processes
+through one WAL-mode file (CHECKPOINT_DB_PATH). Storage stays bounded:
+
+- channel values are stored once per version, so ``rows`` or
+  ``result_object`` are not copied into every checkpoint of a turn;
+- values whose serialized form is large are zlib-compressed;
+- only the last CHECKPOINT_KEEP_LAST checkpoints of a thread are kept, with
+  the writes and channel values nothing refers to any more;
+- threads idle for longer than CHECKPOINT_TTL_S are deleted.
+
+CHECKPOINT_DB_PATH=:memory: keeps the previous in-process MemorySaver.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.db.migrations import apply_migrations
+
+_DEFAULT_DB_PATH = str(Path(__file__).parent.parent.parent / "data" / "checkpoints.sqlite")
+_DEFAULT_KEEP_LAST = 20
+_DEFAULT_TTL_S = 86400.0
+# Serialized values at least this large are stored zlib-compressed.
+_COMPRESS_MIN_BYTES = 1024
+_COMPRESSED_SUFFIX = "+zlib"
+# Idle threads are swept at most this often, from put().
+_SWEEP_INTERVAL_S = 60.0
+
+
+def _create_checkpoint_tables(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            parent_checkpoint_id TEXT,
+            type TEXT NOT NULL,
+            checkpoint BLOB NOT NULL,
+            channel_versions TEXT NOT NULL,
+            metadata_type TEXT NOT NULL,
+            metadata BLOB NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            channel TEXT NOT NULL,
+            version TEXT NOT NULL,
+            type TEXT NOT NULL,
+            value BLOB,
+            PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS checkpoint_writes (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            task_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            type TEXT NOT NULL,
+            value BLOB,
+            task_path TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_created_at ON checkpoints (thread_id, created_at)")
+
+
+# Append only: position + 1 is the user_version a migration brings the file to.
+_MIGRATIONS = (_create_checkpoint_tables,)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def checkpoint_db_path() -> str:
+    return os.getenv("CHECKPOINT_DB_PATH") or _DEFAULT_DB_PATH
+
+
+def build_checkpointer() -> BaseCheckpointSaver:
+    """Checkpointer configured from the environment (see module docstring)."""
+    path = checkpoint_db_path()
+    if path == ":memory:":
+        return MemorySaver()
+    return SQLiteCheckpointSaver(
+        path,
+        keep_last=int(_env_number("CHECKPOINT_KEEP_LAST", _DEFAULT_KEEP_LAST)),
+        ttl_s=_env_number("CHECKPOINT_TTL_S", _DEFAULT_TTL_S),
+    )
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Bounded, persistent checkpointer over one SQLite file.
+
+    keep_last <= 0 keeps every checkpoint and ttl_s <= 0 never expires
+    threads. One connection is shared behind a lock; the async methods run
+    the blocking ones in a worker thread.
+    """
+
+    def __init__(self, db_path: str, *, keep_last: int = _DEFAULT_KEEP_LAST, ttl_s: float = _DEFAULT_TTL_S, serde=None):
+        super().__init__(serde=serde)
+        self.db_path = str(db_path)
+        self.keep_last = keep_last
+        self.ttl_s = ttl_s
+        apply_migrations(self.db_path, _MIGRATIONS, wal=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._last_sweep = 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- serialization -----------------------------------------------------
+
+    def _dumps(self, value: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= _COMPRESS_MIN_BYTES:
+            return type_ + _COMPRESSED_SUFFIX, zlib.compress(data)
+        return type_, data
+
+    def _loads(self, type_: str, data: Optional[bytes]) -> Any:
+        if type_.endswith(_COMPRESSED_SUFFIX):
+            type_, data = type_[: -len(_COMPRESSED_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data or b""))
+
+    # -- reads -------------------------------------------------------------
+
+    def _tuple_from_row(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, data, versions, metadata_type, metadata = row
+        with self._lock:
+            blobs = self._conn.execute(
+                """
+                SELECT b.channel, b.type, b.value
+                FROM checkpoint_blobs AS b
+                JOIN json_each(?) AS v ON b.channel = v.key AND b.version = v.value
+                WHERE b.thread_id = ? AND b.checkpoint_ns = ?
+                """,
+                (versions, thread_id, checkpoint_ns),
+            ).fetchall()
+            writes = self._conn.execute(
+                """
+                SELECT task_id, channel, type, value FROM checkpoint_writes
+                WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+                ORDER BY task_path, task_id, idx
+                """,
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        checkpoint: Checkpoint = self._loads(type_, data)
+        checkpoint["channel_values"] = {
+            channel: self._loads(blob_type, value) for channel, blob_type, value in blobs if blob_type != "empty"
+        }
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self._loads(metadata_type, metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, self._loads(type_, value)) for task_id, channel, type_, value in writes],
+        )
+
+    _ROW_COLUMNS = (
+        "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+        "channel_versions, metadata_type, metadata"
+    )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        query = f"SELECT {self._ROW_COLUMNS} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        params: list = [thread_id, checkpoint_ns]
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return self._tuple_from_row(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        clauses: list = []
+        params: list = []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self._ROW_COLUMNS} FROM checkpoints{where} ORDER BY checkpoint_id DESC",
+                params,
+            ).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self._loads(row[7], row[8])
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._tuple_from_row(row)
+
+    # -- writes ------------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values: dict[str, Any] = stored.pop("channel_values")  # type: ignore[misc]
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version), *(
+                self._dumps(values[channel]) if channel in values else ("empty", None)
+            ))
+            for channel, version in new_versions.items()
+        ]
+        type_, data = self._dumps(stored)
+        metadata_type, metadata_data = self._dumps(get_checkpoint_metadata(config, metadata))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoint_blobs "
+                    "(thread_id, checkpoint_ns, channel, version, type, value) VALUES (?, ?, ?, ?, ?, ?)",
+                    blobs,
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints "
+                    "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                    "channel_versions, metadata_type, metadata, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_,
+                        data,
+                        json.dumps({k: str(v) for k, v in checkpoint["channel_versions"].items()}),
+                        metadata_type,
+                        metadata_data,
+                        now,
+                    ),
+                )
+                self._trim_thread(thread_id, checkpoint_ns)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if self.ttl_s > 0 and now - self._last_sweep >= _SWEEP_INTERVAL_S:
+                self._last_sweep = now
+                self.prune_expired(now=now)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _trim_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop checkpoints beyond keep_last, then the writes and blobs they alone used."""
+        if self.keep_last <= 0:
+            return
+        removed = self._conn.execute(
+            """
+            DELETE FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM checkpoints
+                WHERE thread_id = ? AND checkpoint_ns = ?
+                ORDER BY checkpoint_id DESC LIMIT ?
+            )
+            """,
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last),
+        ).rowcount
+        if not removed:
+            return
+        self._conn.execute(
+            """
+            DELETE FROM checkpoint_writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+            )
+            """,
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+        )
+        self._conn.execute(
+            """
+            DELETE FROM checkpoint_blobs
+            WHERE thread_id = ? AND checkpoint_ns = ? AND NOT EXISTS (
+                SELECT 1 FROM checkpoints AS c, json_each(c.channel_versions) AS v
+                WHERE c.thread_id = checkpoint_blobs.thread_id
+                  AND c.checkpoint_ns = checkpoint_blobs.checkpoint_ns
+                  AND v.key = checkpoint_blobs.channel
+                  AND v.value = checkpoint_blobs.version
+            )
+            """,
+            (thread_id, checkpoint_ns),
+        )
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts) replace earlier ones; regular
+        # writes are idempotent, as in MemorySaver.
+        verb = "REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "IGNORE"
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+             *self._dumps(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR {verb} INTO checkpoint_writes "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _delete_threads(self, thread_ids: Sequence[str]) -> None:
+        for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+            self._conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_threads([thread_id])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def prune_expired(self, now: Optional[float] = None) -> int:
+        """Delete threads whose latest checkpoint is older than ttl_s; return how many."""
+        if self.ttl_s <= 0:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.ttl_s
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                        (cutoff,),
+                    )
+                ]
+                self._delete_threads(expired)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(expired)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # -- async -------------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)]
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -1,12 +1,25 @@
-"""Expert correction logging and retrieval."""
+"""Expert correction logging and retrieval.
+
+Corrections live in the analytics database by default. Set
+CORRECTIONS_DB_PATH to keep them in a separate WAL-mode file, so expert
+reviews never take write locks on the file analytics queries read from.
+"""
 
 from __future__ import annotations
 
+import os
 import re
 import sqlite3
+import threading
+from dataclasses import dataclass, field
 from difflib import SequenceMatcher
 from typing import Optional
 
+import numpy as np
+
+from app.db.migrations import apply_migrations
+from app.db.sqlite import database_fingerprint, run_query
+
 _TOKEN_RE = re.compile(r"[a-zA-Z0-9_]+")
 _CORRECTION_MATCH_THRESHOLD = 0.55  # minimum similarity score to reuse a correction
 
@@ -30,7 +43,7 @@ def _similarity(a: str, b: str) -> float:
     return overlap * 0.6 + ratio * 0.4
 
 
-def _ensure_corrections_table(cur: sqlite3.Cursor) -> None:
+def _create_corrections_log(cur: sqlite3.Cursor) -> None:
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS corrections_log (
@@ -44,6 +57,7 @@ def _ensure_corrections_table(cur: sqlite3.Cursor) -> None:
         )
         """
     )
+    # Tables created before normalized_question existed.
     cur.execute("PRAGMA table_info(corrections_log)")
     columns = {row[1] for row in cur.fetchall()}
     if "normalized_question" not in columns:
@@ -53,13 +67,168 @@ def _ensure_corrections_table(cur: sqlite3.Cursor) -> None:
         )
 
 
+def _index_normalized_question(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_corrections_normalized_question "
+        "ON corrections_log (normalized_question, timestamp)"
+    )
+
+
+# Append only: position + 1 is the user_version a migration brings the file to.
+_MIGRATIONS = (
+    _create_corrections_log,
+    _index_normalized_question,
+)
+
+
+def corrections_db_path(db_path: str) -> str:
+    """Database file that holds corrections_log for the given analytics DB."""
+    return os.getenv("CORRECTIONS_DB_PATH") or str(db_path)
+
+
+def _prepare_store(db_path: str) -> str:
+    """Resolve the corrections store and migrate it (once per file per process)."""
+    store_path = corrections_db_path(db_path)
+    separate = os.path.abspath(store_path) != os.path.abspath(str(db_path))
+    apply_migrations(store_path, _MIGRATIONS, wal=separate)
+    return store_path
+
+
+@dataclass(frozen=True)
+class _Correction:
+    order: tuple[str, int]  # (timestamp, id): later corrections win ties
+    normalized: str
+    tokens: frozenset[str]
+    corrected_sql: str
+
+
+@dataclass
+class _CorrectionIndex:
+    """In-process view of corrections_log for one database file.
+
+    exact maps normalized_question to the latest correction; postings is a
+    token inverted index used to prune fuzzy candidates. Rows are loaded
+    incrementally by id, so new corrections never force a full reload.
+    """
+
+    identity: Optional[tuple[int, int]] = None  # (st_dev, st_ino) of the indexed file
+    max_id: int = 0
+    exact: dict[str, _Correction] = field(default_factory=dict)
+    entries: list[_Correction] = field(default_factory=list)
+    postings: dict[str, list[int]] = field(default_factory=dict)
+    _posting_arrays: dict[str, np.ndarray] = field(default_factory=dict)
+    _token_counts: Optional[np.ndarray] = None
+
+    def add(self, row_id: int, question: str, normalized_question: Optional[str], corrected_sql: str, timestamp: str) -> None:
+        entry = _Correction(
+            order=(timestamp or "", row_id),
+            normalized=_normalize_question(question),
+            tokens=frozenset(_tokenize_question(question)),
+            corrected_sql=corrected_sql,
+        )
+        key = normalized_question or ""
+        if key not in self.exact or self.exact[key].order < entry.order:
+            self.exact[key] = entry
+        position = len(self.entries)
+        self.entries.append(entry)
+        for token in entry.tokens:
+            self.postings.setdefault(token, []).append(position)
+            self._posting_arrays.pop(token, None)
+        self._token_counts = None
+        self.max_id = max(self.max_id, row_id)
+
+    def add_rows(self, rows) -> None:
+        for row in rows:
+            self.add(*row)
+
+    def _postings(self, token: str) -> np.ndarray:
+        array = self._posting_arrays.get(token)
+        if array is None:
+            array = self._posting_arrays[token] = np.array(self.postings.get(token, ()), dtype=np.int64)
+        return array
+
+    def best_match(self, question: str) -> Optional[str]:
+        exact = self.exact.get(_normalize_question(question))
+        if exact is not None:
+            return exact.corrected_sql
+
+        query_tokens = _tokenize_question(question)
+        if not query_tokens or not self.entries:
+            return None
+        if self._token_counts is None:
+            self._token_counts = np.array([len(entry.tokens) for entry in self.entries], dtype=np.int64)
+        shared = np.bincount(
+            np.concatenate([self._postings(token) for token in query_tokens]),
+            minlength=len(self.entries),
+        )
+        overlap = shared / np.maximum(self._token_counts, len(query_tokens))
+
+        # The sequence ratio adds at most 0.4, so corrections sharing too few
+        # tokens can never reach the threshold and are skipped unscored.
+        upper_bound = overlap * 0.6 + 0.4
+        candidates = np.flatnonzero(upper_bound >= _CORRECTION_MATCH_THRESHOLD)
+        candidates = candidates[np.argsort(-upper_bound[candidates], kind="stable")]
+
+        normalized = _normalize_question(question)
+        best: Optional[_Correction] = None
+        best_score = 0.0
+        for position in candidates:
+            if upper_bound[position] < best_score:
+                break
+            entry = self.entries[position]
+            entry_overlap = float(overlap[position]) * 0.6
+            matcher = SequenceMatcher(None, normalized, entry.normalized)
+            if entry_overlap + matcher.real_quick_ratio() * 0.4 < best_score:
+                continue
+            if entry_overlap + matcher.quick_ratio() * 0.4 < best_score:
+                continue
+            score = entry_overlap + matcher.ratio() * 0.4
+            if score > best_score or (score == best_score and best is not None and entry.order > best.order):
+                best, best_score = entry, score
+
+        if best is None or best_score < _CORRECTION_MATCH_THRESHOLD:
+            return None
+        return best.corrected_sql
+
+
+_INDEXES: dict[str, _CorrectionIndex] = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def _refresh_index(store_path: str) -> _CorrectionIndex:
+    """Return the index for store_path, reading only rows added since the last call.
+
+    Reads go through the pooled read-only connections; corrections are only
+    ever appended, so the highest id tells whether anything is new.
+    """
+    key, signature = database_fingerprint(store_path)
+    _, rows = run_query(store_path, "SELECT MAX(id) FROM corrections_log")
+    max_id = rows[0][0] or 0
+    index = _INDEXES.get(key)
+    if index is None or index.identity != signature[:2] or max_id < index.max_id:
+        # New or replaced file: start over.
+        index = _INDEXES[key] = _CorrectionIndex(identity=signature[:2])
+    if max_id > index.max_id:
+        _, rows = run_query(
+            store_path,
+            """
+            SELECT id, question, normalized_question, corrected_sql, timestamp
+            FROM corrections_log
+            WHERE id > ?
+            ORDER BY id
+            """,
+            params=(index.max_id,),
+        )
+        index.add_rows(rows)
+    return index
+
+
 def log_correction(db_path: str, question: str, generated_sql: str, corrected_sql: str, user: str = "expert") -> None:
     """Log an expert correction to the corrections_log table."""
-    conn = sqlite3.connect(db_path)
+    store_path = _prepare_store(db_path)
+    conn = sqlite3.connect(store_path, timeout=30.0)
     try:
-        cur = conn.cursor()
-        _ensure_corrections_table(cur)
-        cur.execute(
+        conn.execute(
             """
             INSERT INTO corrections_log (question, normalized_question, generated_sql, corrected_sql, user)
             VALUES (?, ?, ?, ?, ?)
@@ -69,6 +238,9 @@ def log_correction(db_path: str, question: str, generated_sql: str, corrected_sq
         conn.commit()
     finally:
         conn.close()
+    with _INDEX_LOCK:
+        # Picks up this row (and any written elsewhere) without a full reload.
+        _refresh_index(store_path)
 
 
 def fetch_similar_correction(db_path: str, question: str) -> Optional[str]:
@@ -76,51 +248,14 @@ def fetch_similar_correction(db_path: str, question: str) -> Optional[str]:
 
     Strategy (in priority order):
     1. Exact normalized-string match (fastest).
-    2. Fuzzy similarity match — scores all corrections and picks the best one
-       above _CORRECTION_MATCH_THRESHOLD, so rephrased questions also benefit
-       from expert memory.
-    """
-    conn = sqlite3.connect(db_path)
-    try:
-        cur = conn.cursor()
-        _ensure_corrections_table(cur)
-        normalized_question = _normalize_question(question)
-
-        # 1. Exact match
-        cur.execute(
-            """
-            SELECT corrected_sql
-            FROM corrections_log
-            WHERE normalized_question = ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """,
-            (normalized_question,),
-        )
-        row = cur.fetchone()
-        if row:
-            return row[0]
-
-        # 2. Fuzzy match — fetch all corrections and score in Python
-        cur.execute(
-            """
-            SELECT question, corrected_sql
-            FROM corrections_log
-            ORDER BY timestamp DESC
-            """
-        )
-        rows = cur.fetchall()
-        if not rows:
-            return None
-
-        best_sql: Optional[str] = None
-        best_score = 0.0
-        for stored_question, corrected_sql in rows:
-            score = _similarity(question, stored_question or "")
-            if score > best_score:
-                best_score = score
-                best_sql = corrected_sql
+    2. Fuzzy similarity match — scores the corrections that share tokens with
+       the question and picks the best one above _CORRECTION_MATCH_THRESHOLD,
+       so rephrased questions also benefit from expert memory.
 
-        return best_sql if best_score >= _CORRECTION_MATCH_THRESHOLD else None
-    finally:
-        conn.close()
+    Both steps run against an in-process index fed by read-only pooled
+    connections; only newly appended rows are read on each call.
+    """
+    store_path = _prepare_store(db_path)
+    with _INDEX_LOCK:
+        index = _refresh_index(store_path)
+        return index.best_match(question)
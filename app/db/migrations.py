@@ -0,0 +1,71 @@
+"""Versioned schema migrations for the tables the app owns.
+
+Each migration is a function that receives a cursor inside one write
+transaction. The number of applied migrations is stored in the file's
+``PRAGMA user_version``, and each database file is checked at most once per
+process, so hot read paths never issue DDL or need a writable connection.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Sequence
+
+Migration = Callable[[sqlite3.Cursor], None]
+
+_MIGRATED: set[tuple[str, int, int]] = set()
+_LOCK = threading.Lock()
+
+
+def _file_identity(db_path: str | Path) -> tuple[str, int, int] | None:
+    path = Path(db_path).resolve()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return str(path), stat.st_dev, stat.st_ino
+
+
+def apply_migrations(db_path: str | Path, migrations: Sequence[Migration], wal: bool = False) -> int:
+    """
+    Bring db_path up to len(migrations) and return the resulting version.
+
+    Migrations that are already recorded in user_version are skipped. With
+    wal=True the file is switched to WAL journaling, which lets readers keep
+    going while corrections are written.
+    """
+    identity = _file_identity(db_path)
+    if identity in _MIGRATED:
+        return len(migrations)
+
+    with _LOCK:
+        identity = _file_identity(db_path)
+        if identity in _MIGRATED:
+            return len(migrations)
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), timeout=30.0, isolation_level=None)
+        try:
+            if wal:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = conn.cursor()
+                version = cur.execute("PRAGMA user_version").fetchone()[0]
+                for number, migration in enumerate(migrations[version:], start=version + 1):
+                    migration(cur)
+                    cur.execute(f"PRAGMA user_version = {number}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            version = max(version, len(migrations))
+        finally:
+            conn.close()
+
+        _MIGRATED.add(_file_identity(db_path))
+        return version
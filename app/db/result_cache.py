@@ -0,0 +1,150 @@
+"""Bounded in-process cache for SELECT results.
+
+Entries are keyed by normalized SQL, row cap and the database fingerprint, so a
+rebuilt database never serves stale rows. Eviction is LRU, bounded by entry
+count and by an estimate of the bytes held, and entries expire after a TTL.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Sequence
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def normalize_sql_key(sql: str) -> str:
+    """Collapse whitespace and lowercase SQL outside of quoted literals."""
+    text = (sql or "").strip().rstrip(";").strip()
+    parts: list[str] = []
+    last = 0
+    for match in _LITERAL_RE.finditer(text):
+        parts.append(_WHITESPACE_RE.sub(" ", text[last:match.start()]).lower())
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(_WHITESPACE_RE.sub(" ", text[last:]).lower())
+    return "".join(parts)
+
+
+def estimate_result_bytes(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> int:
+    """Approximate memory held by a (columns, rows) result."""
+    total = sys.getsizeof(columns) + sum(sys.getsizeof(c) for c in columns)
+    total += sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return total
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size_bytes: int
+    expires_at: float
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache with a byte budget.
+
+    With env_prefix, the limits are read from <prefix>_MAX_ENTRIES,
+    <prefix>_MAX_BYTES and <prefix>_TTL_S on first use (the constructor
+    values are the defaults), so a .env loaded after import still applies.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl_s: float = 600.0,
+                 env_prefix: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._defaults = (max_entries, max_bytes, ttl_s)
+        self._env_prefix = env_prefix
+        self._configured = env_prefix is None
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def reconfigure(self) -> None:
+        """Re-read the limits from the environment on next use."""
+        with self._lock:
+            self._configured = self._env_prefix is None
+
+    def _configure(self) -> None:
+        # Caller holds the lock.
+        if self._configured:
+            return
+        max_entries, max_bytes, ttl_s = self._defaults
+        self.max_entries = int(_env_number(f"{self._env_prefix}_MAX_ENTRIES", max_entries))
+        self.max_bytes = int(_env_number(f"{self._env_prefix}_MAX_BYTES", max_bytes))
+        self.ttl_s = _env_number(f"{self._env_prefix}_TTL_S", ttl_s)
+        self._configured = True
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._configure()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, size_bytes: int) -> bool:
+        """Store value; returns False when it is larger than the whole budget."""
+        with self._lock:
+            self._configure()
+            if size_bytes > self.max_bytes or self.max_entries <= 0:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(value=value, size_bytes=size_bytes, expires_at=time.monotonic() + self.ttl_s)
+            self._bytes += size_bytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "cache_evictions": self.evictions,
+                "cache_entries": len(self._entries),
+                "cache_bytes": self._bytes,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+
+
+QUERY_RESULT_CACHE = ResultCache(env_prefix="RESULT_CACHE")
@@ -0,0 +1,90 @@
+"""Immutable query result shared by execution, formatting, charts and the UI.
+
+A ResultSet is the list of row tuples returned by the cursor, frozen, plus
+lazily built typed column arrays (NumPy) and a memo for derived metadata such
+as the chart profile. Downstream code reads columns and cached values instead
+of re-copying rows into new lists or DataFrames.
+
+It subclasses list on purpose: LangGraph checkpoints, JSON output and
+Streamlit session state all treat it as a plain list of rows.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+
+
+def _typed_array(values: Sequence[Any]) -> np.ndarray:
+    if values and all(type(v) is int for v in values):
+        try:
+            array = np.array(values, dtype=np.int64)
+        except OverflowError:
+            array = np.array(values, dtype=object)
+    elif values and all(type(v) in (int, float) for v in values):
+        array = np.array(values, dtype=np.float64)
+    else:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+    array.flags.writeable = False
+    return array
+
+
+class ResultSet(list):
+    """Read-only rows (tuples) with cached column arrays and derived metadata."""
+
+    def __init__(self, columns: Iterable[str], rows: Iterable[Sequence[Any]] = ()):
+        super().__init__(rows)
+        self.columns: tuple[str, ...] = tuple(str(c) for c in columns)
+        self._memo: dict[str, Any] = {}
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> Any:
+        raise TypeError("ResultSet is immutable")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = clear = sort = reverse = _immutable
+
+    def __reduce__(self):
+        return (ResultSet, (self.columns, list(self)))
+
+    def memo(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Compute a derived value once per result (e.g. the chart profile)."""
+        if key not in self._memo:
+            self._memo[key] = factory()
+        return self._memo[key]
+
+    def arrays(self) -> tuple[np.ndarray, ...]:
+        """Typed, read-only column arrays (int64 / float64 / object)."""
+
+        def _build() -> tuple[np.ndarray, ...]:
+            if not self:
+                return tuple(np.empty(0, dtype=object) for _ in self.columns)
+            return tuple(_typed_array(values) for values in zip(*self))
+
+        return self.memo("arrays", _build)
+
+    def column(self, key: int | str) -> np.ndarray:
+        index = key if isinstance(key, int) else self.columns.index(key)
+        return self.arrays()[index]
+
+    def head(self, n: int) -> "ResultSet":
+        if n >= len(self):
+            return self
+        return ResultSet(self.columns, self[:n])
+
+    def to_frame(self):
+        """pandas DataFrame over the column arrays (built once, no row copies).
+
+        The frame is shared: callers that add or reassign columns should take
+        ``frame.copy(deep=False)`` first.
+        """
+
+        def _build():
+            import pandas as pd
+
+            frame = pd.DataFrame(dict(enumerate(self.arrays())), copy=False)
+            frame.columns = list(self.columns)
+            return frame
+
+        return self.memo("frame", _build)
@@ -0,0 +1,257 @@
+"""Content-addressed store for query results referenced from graph state.
+
+Graph state and its checkpoints keep a short handle (a SHA-256 of the columns
+and rows) plus small previews instead of the rows themselves, so one result
+is held once however many state fields point at it, and LangGraph no longer
+copies it at every node transition. Results live in a bounded in-process LRU
+and are written through, by a background thread, to a SQLite file
+(RESULT_STORE_PATH) that keeps its own most recently used entries, so handles
+in persisted checkpoints still resolve after a restart. A handle that resolves
+nowhere (for example after a restart with RESULT_STORE_PATH=:memory:) returns
+None and callers fall back to the previews kept in state.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from app.db.migrations import apply_migrations
+from app.db.result_cache import estimate_result_bytes
+from app.db.result_set import ResultSet
+from app.logging_utils import get_logger, log_event
+
+logger = get_logger(__name__)
+
+_DEFAULT_PATH = str(Path(__file__).parent.parent.parent / "data" / "result_store.sqlite")
+_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_SPILL_MAX_ENTRIES = 2000
+
+
+def _create_result_store(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS result_store (
+            handle TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_result_store_last_used ON result_store (last_used)")
+
+
+_MIGRATIONS = (_create_result_store,)
+
+
+def _encode_value(value: Any) -> Any:
+    # sqlite3 only returns int, float, str, None and bytes.
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"$bytes": base64.b64encode(bytes(value)).decode("ascii")}
+    return str(value)
+
+
+def _decode_value(obj: dict) -> Any:
+    if set(obj) == {"$bytes"}:
+        return base64.b64decode(obj["$bytes"])
+    return obj
+
+
+def _serialize(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    return json.dumps(
+        [list(columns), rows], default=_encode_value, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def result_handle(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """Content address of a result: equal columns and rows share one handle."""
+    return hashlib.sha256(_serialize(columns, rows)).hexdigest()
+
+
+class ResultStore:
+    """Thread-safe LRU of results by handle, written through to SQLite in the background.
+
+    New results are queued for one writer thread and stay readable from the
+    queue until they are on disk. Disk I/O never runs under the lock that
+    guards the in-memory entries.
+    """
+
+    def __init__(self, max_bytes: int = _DEFAULT_MAX_BYTES, spill_path: Optional[str] = None,
+                 spill_max_entries: int = _SPILL_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.spill_max_entries = max(1, int(spill_max_entries))
+        self._entries: "OrderedDict[str, tuple[Sequence[str], Sequence[Any], int]]" = OrderedDict()
+        self._pending: dict[str, tuple[Sequence[str], Sequence[Any], bytes]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._write_conn: Optional[sqlite3.Connection] = None  # writer thread only
+        self._writer = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-store") if spill_path else None
+        )
+
+    def put(self, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+        payload = _serialize(columns, rows)
+        handle = hashlib.sha256(payload).hexdigest()
+        with self._lock:
+            if handle in self._entries:
+                self._entries.move_to_end(handle)
+                return handle
+            self._insert(handle, columns, rows)
+            queue = self._writer is not None and handle not in self._pending
+            if queue:
+                self._pending[handle] = (columns, rows, payload)
+        if queue:
+            self._writer.submit(self._write, handle)
+        return handle
+
+    def get(self, handle: Optional[str]) -> Optional[Sequence[Any]]:
+        """Rows stored under handle, or None when it is unknown."""
+        if not handle:
+            return None
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None:
+                self._entries.move_to_end(handle)
+                return entry[1]
+            pending = self._pending.get(handle)
+            if pending is not None:
+                self._insert(handle, pending[0], pending[1])
+                return pending[1]
+        loaded = self._load_spilled(handle)
+        if loaded is None:
+            return None
+        columns, rows = loaded
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None:
+                return entry[1]
+            self._insert(handle, columns, rows)
+        return rows
+
+    def flush(self) -> None:
+        """Wait until every queued result is on disk."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._bytes = 0
+        if self._writer is not None:
+            self._writer.submit(lambda: self._write_connection().execute("DELETE FROM result_store")).result()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _insert(self, handle: str, columns: Sequence[str], rows: Sequence[Any]) -> None:
+        size = estimate_result_bytes(columns, rows)
+        self._entries[handle] = (columns, rows, size)
+        self._bytes += size
+        # The newest entry always stays in memory, even when it alone is over budget.
+        # Evicted entries are already on disk (or queued for it).
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _old_handle, (_columns, _rows, old_size) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+
+    # -- on-disk copy (writer thread) --------------------------------------
+
+    def _write_connection(self) -> sqlite3.Connection:
+        if self._write_conn is None:
+            apply_migrations(self.spill_path, _MIGRATIONS, wal=True)
+            self._write_conn = sqlite3.connect(self.spill_path, timeout=30.0, isolation_level=None)
+            self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        return self._write_conn
+
+    def _write(self, handle: str) -> None:
+        with self._lock:
+            pending = self._pending.get(handle)
+        if pending is None:
+            return
+        try:
+            conn = self._write_connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO result_store (handle, payload, last_used) VALUES (?, ?, ?)",
+                (handle, zlib.compress(pending[2]), time.time()),
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM result_store").fetchone()[0] - self.spill_max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM result_store WHERE handle IN "
+                    "(SELECT handle FROM result_store ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+        except sqlite3.Error as e:
+            log_event(logger, logging.WARNING, "result_store.write_failed", handle=handle, error=str(e))
+        finally:
+            with self._lock:
+                self._pending.pop(handle, None)
+
+    def _touch(self, handle: str) -> None:
+        try:
+            self._write_connection().execute(
+                "UPDATE result_store SET last_used = ? WHERE handle = ?", (time.time(), handle)
+            )
+        except sqlite3.Error as e:
+            log_event(logger, logging.WARNING, "result_store.write_failed", handle=handle, error=str(e))
+
+    # -- on-disk copy (any thread) -----------------------------------------
+
+    def _read_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            apply_migrations(self.spill_path, _MIGRATIONS, wal=True)
+            conn = self._local.conn = sqlite3.connect(self.spill_path, timeout=30.0, isolation_level=None)
+        return conn
+
+    def _load_spilled(self, handle: str) -> Optional[tuple[list, ResultSet]]:
+        if self._writer is None:
+            return None
+        row = self._read_connection().execute(
+            "SELECT payload FROM result_store WHERE handle = ?", (handle,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._writer.submit(self._touch, handle)
+        columns, rows = json.loads(zlib.decompress(row[0]), object_hook=_decode_value)
+        return columns, ResultSet(columns, (tuple(r) for r in rows))
+
+
+_STORE: Optional[ResultStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Process-wide store configured from RESULT_STORE_PATH and RESULT_STORE_MAX_BYTES."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            path = os.getenv("RESULT_STORE_PATH") or _DEFAULT_PATH
+            try:
+                max_bytes = int(os.getenv("RESULT_STORE_MAX_BYTES", "") or _DEFAULT_MAX_BYTES)
+            except ValueError:
+                max_bytes = _DEFAULT_MAX_BYTES
+            _STORE = ResultStore(max_bytes=max_bytes, spill_path=None if path == ":memory:" else path)
+        return _STORE
+
+
+def store_result(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    return get_result_store().put(columns, rows)
+
+
+def load_result(handle: Optional[str]) -> Optional[Sequence[Any]]:
+    return get_result_store().get(handle)
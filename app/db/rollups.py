@@ -0,0 +1,418 @@
+"""Pre-aggregated rollup tables and the rewriter that answers from them.
+
+build_rollups() runs at database build time (scripts/build_sqlite_db.py) and
+stores COUNT(*), SUM(x) and COUNT(x) per combination of a few low-cardinality
+dimensions: month x category x country x status for transactions, hour of
+day, month x client segment, product x channel x acceptance status for
+dossiers, and the same with client segment. A rollup has as many rows as its dimensions have
+combinations, whatever the size of the fact table.
+
+rewrite_for_rollups() recognises the dashboard-style aggregate shape
+
+    SELECT <dims>, COUNT(*) | COUNT(x) | SUM(x) | AVG(x) [ROUND(...)]
+    FROM fact [JOIN dim_table ON ...]
+    [WHERE <dim> = <literal> AND ...] [GROUP BY <dims>] [ORDER BY ...] [LIMIT n]
+
+and, when one rollup covers every dimension and measure, returns the same
+query over that rollup (COUNT(*) -> SUM(nb), AVG(x) -> SUM(x_total) /
+SUM(x_count), strftime('%Y', date) -> substr(mois, 1, 4)). Anything else -
+DISTINCT, HAVING, CASE, ranges, sub-queries, outer joins - is left alone.
+execute_sql applies it when ROLLUP_REWRITE=on.
+
+Rollup tables are hidden from the schema helpers, so neither the LLM nor the
+SQL templates query them directly.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.db.sqlite import ROLLUP_TABLE_PREFIX, _load_schema, rollup_table_names
+
+
+def rollup_rewrite_enabled() -> bool:
+    """ROLLUP_REWRITE=on lets execute_sql answer matching aggregates from rollup tables."""
+    return os.getenv("ROLLUP_REWRITE", "off").strip().lower() in {"on", "1", "true", "yes"}
+
+
+@dataclass(frozen=True)
+class Dimension:
+    name: str
+    table: str
+    column: str
+    # strftime format applied to the column ("" groups on the raw value).
+    fmt: str = ""
+
+    @property
+    def expression(self) -> str:
+        ref = f"{self.table}.{self.column}"
+        return f"strftime('{self.fmt}', {ref})" if self.fmt else ref
+
+
+@dataclass(frozen=True)
+class Rollup:
+    name: str
+    fact: str
+    dimensions: Tuple[Dimension, ...]
+    # Fact columns stored as <column>_total (SUM) and <column>_count (COUNT).
+    measures: Tuple[str, ...]
+    # Many-to-one join from the fact table, on a column of the same name.
+    join: str = ""
+    join_column: str = ""
+
+
+_MONTH = Dimension("mois", "transactions", "date_transaction", "%Y-%m")
+# Smallest first: the first rollup that covers a query answers it.
+ROLLUPS: Tuple[Rollup, ...] = (
+    Rollup(
+        name=f"{ROLLUP_TABLE_PREFIX}transactions_hourly",
+        fact="transactions",
+        dimensions=(Dimension("heure", "transactions", "datetime_transaction", "%H"),),
+        measures=("montant",),
+    ),
+    Rollup(
+        name=f"{ROLLUP_TABLE_PREFIX}transactions_segment_monthly",
+        fact="transactions",
+        dimensions=(_MONTH, Dimension("segment_client", "clients", "segment_client")),
+        measures=("montant",),
+        join="clients",
+        join_column="client_id",
+    ),
+    Rollup(
+        name=f"{ROLLUP_TABLE_PREFIX}dossiers",
+        fact="dossiers",
+        dimensions=(
+            Dimension("type_produit", "dossiers", "type_produit"),
+            Dimension("canal_souscription", "dossiers", "canal_souscription"),
+            Dimension("statut_acceptation", "dossiers", "statut_acceptation"),
+        ),
+        measures=("montant", "nombre_incidents_paiement"),
+    ),
+    Rollup(
+        name=f"{ROLLUP_TABLE_PREFIX}dossiers_acceptance",
+        fact="dossiers",
+        dimensions=(
+            Dimension("type_produit", "dossiers", "type_produit"),
+            Dimension("canal_souscription", "dossiers", "canal_souscription"),
+            Dimension("segment_client", "clients", "segment_client"),
+            Dimension("statut_acceptation", "dossiers", "statut_acceptation"),
+        ),
+        measures=("montant", "nombre_incidents_paiement"),
+        join="clients",
+        join_column="client_id",
+    ),
+    Rollup(
+        name=f"{ROLLUP_TABLE_PREFIX}transactions_monthly",
+        fact="transactions",
+        dimensions=(
+            _MONTH,
+            Dimension("categorie_achat", "transactions", "categorie_achat"),
+            Dimension("pays", "transactions", "pays"),
+            Dimension("statut_transaction", "transactions", "statut_transaction"),
+        ),
+        measures=("montant",),
+    ),
+)
+
+
+def _build_sql(rollup: Rollup) -> str:
+    columns = [f"{dimension.expression} AS {dimension.name}" for dimension in rollup.dimensions]
+    columns.append("COUNT(*) AS nb")
+    for measure in rollup.measures:
+        ref = f"{rollup.fact}.{measure}"
+        columns.extend([f"SUM({ref}) AS {measure}_total", f"COUNT({ref}) AS {measure}_count"])
+    source = rollup.fact
+    if rollup.join:
+        source += (
+            f" JOIN {rollup.join} ON {rollup.fact}.{rollup.join_column} = {rollup.join}.{rollup.join_column}"
+        )
+    groups = ", ".join(dimension.expression for dimension in rollup.dimensions)
+    return f"CREATE TABLE {rollup.name} AS SELECT {', '.join(columns)} FROM {source} GROUP BY {groups}"
+
+
+def build_rollups(con: sqlite3.Connection) -> Dict[str, int]:
+    """(Re)create every rollup whose source columns exist; returns {name: row count}.
+
+    The caller commits.
+    """
+    built: Dict[str, int] = {}
+    for rollup in ROLLUPS:
+        con.execute(f"DROP TABLE IF EXISTS {rollup.name}")
+        try:
+            con.execute(_build_sql(rollup))
+        except sqlite3.OperationalError:
+            # A source table or column is missing from this database.
+            continue
+        built[rollup.name] = con.execute(f"SELECT COUNT(*) FROM {rollup.name}").fetchone()[0]
+    return built
+
+
+# ---------------------------------------------------------------------------
+# Rewriter
+# ---------------------------------------------------------------------------
+
+_STATEMENT_RE = re.compile(
+    r"^SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<source>.+?)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+GROUP\s+BY\s+(?P<group>.+?))?"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\d+))?$",
+    re.IGNORECASE | re.DOTALL,
+)
+_NOT_ALIAS = r"(?!(?:JOIN|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|ON|WHERE|GROUP|ORDER|LIMIT)\b)"
+_SOURCE_RE = re.compile(
+    rf"^(?P<fact>\w+)(?:\s+(?:AS\s+)?{_NOT_ALIAS}(?P<fact_alias>\w+))?"
+    rf"(?:\s+(?:INNER\s+)?JOIN\s+(?P<join>\w+)(?:\s+(?:AS\s+)?{_NOT_ALIAS}(?P<join_alias>\w+))?"
+    r"\s+ON\s+(?P<left>(?:\w+\.)?\w+)\s*=\s*(?P<right>(?:\w+\.)?\w+))?$",
+    re.IGNORECASE,
+)
+_ALIASED_RE = re.compile(r"^(?P<expr>.+?)\s+AS\s+(?P<alias>\w+)$", re.IGNORECASE | re.DOTALL)
+_COLUMN_RE = re.compile(r"^(?:(?P<qualifier>\w+)\.)?(?P<column>[A-Za-z_]\w*)$")
+_STRFTIME_RE = re.compile(
+    r"^strftime\(\s*'(?P<fmt>[^']*)'\s*,\s*(?P<ref>(?:\w+\.)?\w+)\s*\)$", re.IGNORECASE
+)
+_AGGREGATE_RE = re.compile(r"^(?P<func>COUNT|SUM|AVG)\(\s*(?P<arg>\*|(?:\w+\.)?\w+)\s*\)$", re.IGNORECASE)
+_ROUND_RE = re.compile(r"^ROUND\(\s*(?P<inner>.+?)\s*,\s*(?P<digits>\d+)\s*\)$", re.IGNORECASE | re.DOTALL)
+_CONDITION_RE = re.compile(
+    r"^(?P<expr>.+?)\s*=\s*(?P<literal>'[^']*'|-?\d+(?:\.\d+)?)$", re.DOTALL
+)
+_ORDER_ITEM_RE = re.compile(r"^(?P<expr>.+?)(?:\s+(?P<direction>ASC|DESC))?$", re.IGNORECASE | re.DOTALL)
+_AND_RE = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+
+class _NoMatch(Exception):
+    """The query is outside the shape the rewriter handles."""
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses and string literals."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for index, char in enumerate(text):
+        if char == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:index].strip())
+            start = index + 1
+    parts.append(text[start:].strip())
+    return parts
+
+
+@dataclass(frozen=True)
+class _Query:
+    fact: str
+    join: str
+    join_column: str
+    # alias or table name -> table
+    names: Dict[str, str]
+    columns: Dict[str, frozenset]
+
+
+def _parse_source(source: str, columns: Dict[str, frozenset]) -> _Query:
+    match = _SOURCE_RE.match(source.strip())
+    if not match:
+        raise _NoMatch
+    fact, join = match.group("fact"), match.group("join") or ""
+    names = {fact: fact}
+    if match.group("fact_alias"):
+        names[match.group("fact_alias")] = fact
+    if join:
+        names[join] = join
+        if match.group("join_alias"):
+            names[match.group("join_alias")] = join
+    query = _Query(fact=fact, join=join, join_column="", names=names, columns=columns)
+    if not join:
+        return query
+    left = _resolve(query, match.group("left"))
+    right = _resolve(query, match.group("right"))
+    if left[1] != right[1] or {left[0], right[0]} != {fact, join}:
+        raise _NoMatch
+    return _Query(fact=fact, join=join, join_column=left[1], names=names, columns=columns)
+
+
+def _resolve(query: _Query, ref: str) -> Tuple[str, str]:
+    """(table, column) of a column reference in the query's FROM clause."""
+    match = _COLUMN_RE.match(ref.strip())
+    if not match:
+        raise _NoMatch
+    qualifier, column = match.group("qualifier"), match.group("column")
+    if qualifier:
+        table = query.names.get(qualifier)
+        if table is None:
+            raise _NoMatch
+        return table, column
+    owners = [table for table in {query.fact, query.join} if table and column in query.columns.get(table, ())]
+    if len(owners) != 1:
+        raise _NoMatch
+    return owners[0], column
+
+
+def _dimension_sql(query: _Query, rollup: Rollup, expr: str) -> str:
+    """Rollup expression for a grouping/filter expression of the query."""
+    expr = expr.strip()
+    strftime = _STRFTIME_RE.match(expr)
+    fmt, ref = (strftime.group("fmt"), strftime.group("ref")) if strftime else ("", expr)
+    table, column = _resolve(query, ref)
+    for dimension in rollup.dimensions:
+        if (dimension.table, dimension.column) != (table, column):
+            continue
+        if dimension.fmt == fmt:
+            return dimension.name
+        if dimension.fmt == "%Y-%m" and fmt == "%Y":
+            return f"substr({dimension.name}, 1, 4)"
+    raise _NoMatch
+
+
+def _measure_sql(query: _Query, rollup: Rollup, expr: str) -> Optional[str]:
+    """Rollup expression for an aggregate, or None when expr is not an aggregate."""
+    expr = expr.strip()
+    rounded = _ROUND_RE.match(expr)
+    if rounded:
+        inner = _measure_sql(query, rollup, rounded.group("inner"))
+        if inner is None:
+            raise _NoMatch
+        return f"ROUND({inner}, {rounded.group('digits')})"
+    match = _AGGREGATE_RE.match(expr)
+    if not match:
+        if _COLUMN_RE.match(expr) or _STRFTIME_RE.match(expr):
+            return None
+        raise _NoMatch
+    func, arg = match.group("func").upper(), match.group("arg")
+    if arg == "*":
+        if func != "COUNT":
+            raise _NoMatch
+        return "COALESCE(SUM(nb), 0)"
+    table, column = _resolve(query, arg)
+    if table != rollup.fact or column not in rollup.measures:
+        raise _NoMatch
+    if func == "COUNT":
+        return f"COALESCE(SUM({column}_count), 0)"
+    if func == "SUM":
+        return f"SUM({column}_total)"
+    return f"SUM({column}_total) * 1.0 / SUM({column}_count)"
+
+
+def _measure_columns(rollup: Rollup) -> set:
+    names = {"nb"}
+    for measure in rollup.measures:
+        names.update({f"{measure}_total", f"{measure}_count"})
+    return names
+
+
+def _rewrite(query: _Query, rollup: Rollup, parts: Dict[str, Optional[str]]) -> str:
+    if (query.fact, query.join, query.join_column) != (rollup.fact, rollup.join, rollup.join_column):
+        raise _NoMatch
+    dimension_names = {dimension.name for dimension in rollup.dimensions}
+
+    select_sql: List[str] = []
+    # Per select item: (rollup expression, is a dimension); aliases index into it.
+    items: List[Tuple[str, bool]] = []
+    aliases: Dict[str, Tuple[str, bool]] = {}
+    grouped_select: List[str] = []
+    for item in _split_top_level(parts["select"]):
+        aliased = _ALIASED_RE.match(item)
+        expr, alias = (aliased.group("expr"), aliased.group("alias")) if aliased else (item, "")
+        measure = _measure_sql(query, rollup, expr)
+        if measure is not None:
+            mapped, is_dimension = measure, False
+        else:
+            mapped, is_dimension = _dimension_sql(query, rollup, expr), True
+            grouped_select.append(mapped)
+        if not alias:
+            column = _COLUMN_RE.match(expr.strip())
+            if column:
+                alias = column.group("column")
+            elif '"' in expr:
+                raise _NoMatch
+            else:
+                # SQLite names an unaliased expression column after its text.
+                alias = f'"{expr.strip()}"'
+        if alias in dimension_names and not (is_dimension and mapped == alias):
+            # An alias shadowing a rollup column would change what GROUP BY / WHERE refer to.
+            raise _NoMatch
+        items.append((mapped, is_dimension))
+        aliases[alias.lower()] = items[-1]
+        select_sql.append(mapped if mapped == alias else f"{mapped} AS {alias}")
+
+    groups: List[str] = []
+    for item in _split_top_level(parts["group"]) if parts["group"] else []:
+        known = aliases.get(item.strip().lower())
+        if known is not None:
+            if not known[1]:
+                raise _NoMatch
+            groups.append(known[0])
+        else:
+            groups.append(_dimension_sql(query, rollup, item))
+    if any(mapped not in groups for mapped in grouped_select):
+        raise _NoMatch
+
+    conditions: List[str] = []
+    for condition in _AND_RE.split(parts["where"]) if parts["where"] else []:
+        match = _CONDITION_RE.match(condition.strip())
+        if not match:
+            raise _NoMatch
+        conditions.append(f"{_dimension_sql(query, rollup, match.group('expr'))} = {match.group('literal')}")
+
+    order: List[str] = []
+    for item in _split_top_level(parts["order"]) if parts["order"] else []:
+        match = _ORDER_ITEM_RE.match(item.strip())
+        expr = match.group("expr").strip()
+        direction = f" {match.group('direction').upper()}" if match.group("direction") else ""
+        if expr.lower() in aliases or expr.isdecimal():
+            order.append(f"{expr}{direction}")
+            continue
+        measure = _measure_sql(query, rollup, expr)
+        mapped = measure if measure is not None else _dimension_sql(query, rollup, expr)
+        positions = [i for i, known in enumerate(items, start=1) if known[0] == mapped]
+        if positions:
+            order.append(f"{positions[0]}{direction}")
+        elif aliases.keys() & _measure_columns(rollup):
+            # e.g. "COUNT(*) AS nb": SUM(nb) in ORDER BY would read the alias.
+            raise _NoMatch
+        else:
+            order.append(f"{mapped}{direction}")
+
+    sql = f"SELECT {', '.join(select_sql)} FROM {rollup.name}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if groups:
+        sql += " GROUP BY " + ", ".join(groups)
+    if order:
+        sql += " ORDER BY " + ", ".join(order)
+    if parts["limit"]:
+        sql += f" LIMIT {parts['limit']}"
+    return sql
+
+
+def rewrite_for_rollups(sqlite_path: str | Path, sql: str) -> Optional[Tuple[str, str]]:
+    """(rewritten SQL, rollup name) when a rollup of this database answers sql, else None."""
+    available = rollup_table_names(sqlite_path)
+    if not available:
+        return None
+    statement = _STATEMENT_RE.match(" ".join(sql.split()).rstrip(";").strip())
+    if not statement:
+        return None
+    columns = {table.name: frozenset(column.name for column in table.columns) for table in _load_schema(sqlite_path)}
+    parts = statement.groupdict()
+    try:
+        query = _parse_source(parts["source"], columns)
+    except _NoMatch:
+        return None
+    for rollup in ROLLUPS:
+        if rollup.name not in available:
+            continue
+        try:
+            return _rewrite(query, rollup, parts), rollup.name
+        except _NoMatch:
+            continue
+    return None
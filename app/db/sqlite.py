@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+from contextlib import closing, contextmanager
 from functools import lru_cache
+import os
 import sqlite3
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, replace
 from pathlib import Path
 import re
-from typing import Any, Iterable, Optional, Tuple, List
+from typing import Any, Iterable, Iterator, Optional, Tuple, List
+
+from app.db.result_set import ResultSet
+from app.tracing import span
 
 
 @dataclass(frozen=True)
@@ -28,6 +34,9 @@ class TableDef:
     columns: tuple[ColumnDef, ...]
 
 
+# Pre-aggregated tables written by app/db/rollups.py; hidden from the schema helpers.
+ROLLUP_TABLE_PREFIX = "rollup_"
+
 _TOKEN_RE = re.compile(r"[a-zA-Z0-9_]+")
 _STOPWORDS = {
     "a", "an", "and", "are", "by", "de", "des", "du", "for", "how", "in", "is",
@@ -70,9 +79,57 @@ _TABLE_HINTS = {
 }
 
 
-def _connect(cfg: DBConfig) -> sqlite3.Connection:
+# Read-only connection tuning applied once per pooled connection.
+_MMAP_SIZE_BYTES = 256 * 1024 * 1024
+_CACHE_SIZE_KIB = 64 * 1024
+_READ_ONLY_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA temp_store = MEMORY",
+    f"PRAGMA mmap_size = {_MMAP_SIZE_BYTES}",
+    f"PRAGMA cache_size = -{_CACHE_SIZE_KIB}",
+)
+
+# SQLite VM steps between checks of the calling thread's cancel flag.
+_CANCEL_CHECK_STEPS = 10_000
+
+FileSignature = Tuple[int, int, int, int]
+
+_CANCEL = threading.local()
+
+
+def _cancel_requested() -> int:
+    event = getattr(_CANCEL, "event", None)
+    return 1 if event is not None and event.is_set() else 0
+
+
+@contextmanager
+def cancellation_scope(event: threading.Event) -> Iterator[None]:
+    """
+    Abort read-only queries run by this thread once event is set.
+
+    Pooled connections poll the flag every _CANCEL_CHECK_STEPS VM steps, and
+    an aborted statement raises sqlite3.OperationalError("interrupted").
+    """
+    previous = getattr(_CANCEL, "event", None)
+    _CANCEL.event = event
+    try:
+        yield
+    finally:
+        _CANCEL.event = previous
+
+
+def _file_signature(path: Path) -> FileSignature:
+    """(device, inode, mtime_ns, size) of the database file; changes when the file is rebuilt."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"SQLite database not found: {path}") from None
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _open_connection(cfg: DBConfig) -> sqlite3.Connection:
     """
-    Connect to SQLite
+    Open a new SQLite connection (not pooled).
     """
     path = cfg.sqlite_path.resolve()
 
@@ -83,6 +140,9 @@ def _connect(cfg: DBConfig) -> sqlite3.Connection:
         # Read-only connection
         uri = f"file:{path.as_posix()}?mode=ro"
         con = sqlite3.connect(uri, uri=True, timeout=cfg.timeout_s)
+        for pragma in _READ_ONLY_PRAGMAS:
+            con.execute(pragma)
+        con.set_progress_handler(_cancel_requested, _CANCEL_CHECK_STEPS)
     else:
         con = sqlite3.connect(str(path), timeout=cfg.timeout_s)
 
@@ -91,6 +151,99 @@ def _connect(cfg: DBConfig) -> sqlite3.Connection:
     return con
 
 
+class _ConnectionPool:
+    """
+    Per-thread read-only connections keyed by resolved DBConfig.
+
+    Connections stay open between calls. Each acquire() compares the file
+    signature recorded at open time with the current one, so a database that
+    was rebuilt (new inode / mtime) gets a fresh connection on next use.
+    Stale connections are closed by the thread that owns them.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._global_generation = 0
+        self._generations: dict[Path, int] = {}
+
+    def _slots(self) -> dict[DBConfig, tuple[FileSignature, int, sqlite3.Connection]]:
+        slots = getattr(self._local, "slots", None)
+        if slots is None:
+            slots = {}
+            self._local.slots = slots
+        return slots
+
+    def _generation(self, path: Path) -> int:
+        with self._lock:
+            return self._global_generation + self._generations.get(path, 0)
+
+    def acquire(self, cfg: DBConfig) -> sqlite3.Connection:
+        key = replace(cfg, sqlite_path=cfg.sqlite_path.resolve())
+        signature = _file_signature(key.sqlite_path)
+        generation = self._generation(key.sqlite_path)
+        slots = self._slots()
+
+        cached = slots.get(key)
+        if cached is not None:
+            cached_signature, cached_generation, con = cached
+            if cached_signature == signature and cached_generation == generation:
+                return con
+            del slots[key]
+            con.close()
+
+        con = _open_connection(key)
+        slots[key] = (signature, generation, con)
+        return con
+
+    def invalidate(self, sqlite_path: str | Path | None = None) -> None:
+        """Mark pooled connections stale (every database when sqlite_path is None)."""
+        path = Path(sqlite_path).resolve() if sqlite_path is not None else None
+        with self._lock:
+            if path is None:
+                self._global_generation += 1
+            else:
+                self._generations[path] = self._generations.get(path, 0) + 1
+        # Connections owned by the calling thread can be closed right away;
+        # other threads notice the generation bump on their next acquire().
+        slots = self._slots()
+        for key in list(slots):
+            if path is None or key.sqlite_path == path:
+                slots.pop(key)[2].close()
+
+
+_POOL = _ConnectionPool()
+
+
+def _connect(cfg: DBConfig) -> sqlite3.Connection:
+    """
+    Connect to SQLite. Read-only configs are served from the per-thread pool
+    and must not be closed by the caller.
+    """
+    if cfg.read_only:
+        return _POOL.acquire(cfg)
+    return _open_connection(cfg)
+
+
+def database_fingerprint(sqlite_path: str | Path) -> tuple[str, FileSignature]:
+    """
+    Identify the current contents of a database file: (resolved path, signature).
+    """
+    path = Path(sqlite_path).resolve()
+    return str(path), _file_signature(path)
+
+
+def invalidate_connection_pool(sqlite_path: str | Path | None = None) -> None:
+    """
+    Drop pooled read-only connections and the cached schema snapshot.
+
+    Rebuilt files are detected automatically; call this after an in-place
+    change that keeps the same inode and mtime.
+    """
+    _POOL.invalidate(sqlite_path)
+    _get_schema_snapshot.cache_clear()
+
+
 def _normalize_token(token: str) -> str:
     token = token.lower()
     if token.endswith("s") and len(token) > 4:
@@ -107,12 +260,14 @@ def _tokenize(text: str) -> set[str]:
 
 
 @lru_cache(maxsize=8)
-def _get_schema_snapshot(sqlite_path_str: str) -> tuple[TableDef, ...]:
+def _get_schema_snapshot(sqlite_path_str: str, signature: FileSignature) -> tuple[TableDef, ...]:
+    # signature is part of the cache key so a rebuilt database is re-read.
     cfg = DBConfig(sqlite_path=Path(sqlite_path_str), read_only=True)
     tables: list[TableDef] = []
 
-    with _connect(cfg) as con:
-        cur = con.cursor()
+    # Pooled connections outlive the call: close cursors so no statement keeps
+    # a read lock on the file between turns.
+    with _connect(cfg) as con, closing(con.cursor()) as cur:
         cur.execute(
             """
             SELECT name
@@ -139,6 +294,19 @@ def _get_schema_snapshot(sqlite_path_str: str) -> tuple[TableDef, ...]:
     return tuple(tables)
 
 
+def _load_schema(sqlite_path: str | Path) -> tuple[TableDef, ...]:
+    path = Path(sqlite_path).resolve()
+    tables = _get_schema_snapshot(str(path), _file_signature(path))
+    return tuple(table for table in tables if not table.name.startswith(ROLLUP_TABLE_PREFIX))
+
+
+def rollup_table_names(sqlite_path: str | Path) -> frozenset[str]:
+    """Names of the rollup tables present in the database."""
+    path = Path(sqlite_path).resolve()
+    tables = _get_schema_snapshot(str(path), _file_signature(path))
+    return frozenset(table.name for table in tables if table.name.startswith(ROLLUP_TABLE_PREFIX))
+
+
 def _format_schema_text(tables: tuple[TableDef, ...]) -> str:
     lines: list[str] = []
     for table in tables:
@@ -232,8 +400,7 @@ def table_exists(sqlite_path: str | Path, table_name: str) -> bool:
     Return True if table_name exists in sqlite_master.
     """
     cfg = DBConfig(sqlite_path=Path(sqlite_path), read_only=True)
-    with _connect(cfg) as con:
-        cur = con.cursor()
+    with _connect(cfg) as con, closing(con.cursor()) as cur:
         cur.execute(
             """
             SELECT 1
@@ -252,8 +419,7 @@ def get_schema_text(sqlite_path: str | Path) -> str:
     """
     Build a schema string listing tables and columns (types + PK)
     """
-    path = str(Path(sqlite_path).resolve())
-    tables = _get_schema_snapshot(path)
+    tables = _load_schema(sqlite_path)
     if not tables:
         return "No user tables found in database."
     return _format_schema_text(tables)
@@ -261,8 +427,7 @@ def get_schema_text(sqlite_path: str | Path) -> str:
 
 def get_prompt_schema_text(sqlite_path: str | Path, question: str, max_tables: int = 3) -> str:
     """Return a question-focused schema summary for prompt construction."""
-    path = str(Path(sqlite_path).resolve())
-    tables = _get_schema_snapshot(path)
+    tables = _load_schema(sqlite_path)
     if not tables:
         return "No user tables found in database."
 
@@ -274,34 +439,79 @@ def get_prompt_schema_text(sqlite_path: str | Path, question: str, max_tables: i
     return "\n".join(line for line in lines if line)
 
 
+def _execute_tuples(con: sqlite3.Connection, sql: str, params: Optional[Iterable[Any]]) -> sqlite3.Cursor:
+    cur = con.cursor()
+    # Plain tuples: avoids building sqlite3.Row objects only to copy them.
+    cur.row_factory = None
+    if params is None:
+        cur.execute(sql)
+    else:
+        cur.execute(sql, tuple(params))
+    return cur
+
+
 def run_query(
     sqlite_path: str | Path,
     sql: str,
     params: Optional[Iterable[Any]] = None,
     max_rows: Optional[int] = None,
-) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+) -> Tuple[List[str], ResultSet]:
     """
-    Execute SQL and return (columns, rows).
+    Execute SQL and return (columns, rows). rows is an immutable ResultSet of
+    tuples that downstream formatters, charts and the UI share without copying.
     """
     cfg = DBConfig(sqlite_path=Path(sqlite_path), read_only=True)
 
-    with _connect(cfg) as con:
-        cur = con.cursor()
-        if params is None:
-            cur.execute(sql)
-        else:
-            cur.execute(sql, tuple(params))
-
+    with span("sql.run_query") as current, _connect(cfg) as con, closing(_execute_tuples(con, sql, params)) as cur:
         # Cursor description gives columns for SELECT queries
         if cur.description is None:
-            return [], []
+            return [], ResultSet(())
 
         columns = [d[0] for d in cur.description]
 
         if max_rows is None:
-            fetched = cur.fetchall()
+            rows = cur.fetchall()
         else:
-            fetched = cur.fetchmany(max_rows)
+            rows = cur.fetchmany(max_rows)
+        current.set(rows=len(rows))
+        return columns, ResultSet(columns, rows)
+
 
-        rows = [tuple(r) for r in fetched]
-        return columns, rows
+def iter_query(
+    sqlite_path: str | Path,
+    sql: str,
+    params: Optional[Iterable[Any]] = None,
+    chunk_size: int = 1000,
+) -> Tuple[List[str], Iterator[List[Tuple[Any, ...]]]]:
+    """
+    Execute SQL and return (columns, chunks) where chunks lazily yields lists
+    of at most chunk_size rows. The cursor is closed once the iterator is
+    exhausted or closed, so consume or close it before the next turn.
+    """
+    cfg = DBConfig(sqlite_path=Path(sqlite_path), read_only=True)
+    cur = _execute_tuples(_connect(cfg), sql, params)
+    if cur.description is None:
+        cur.close()
+        return [], iter(())
+    columns = [d[0] for d in cur.description]
+
+    def _chunks() -> Iterator[List[Tuple[Any, ...]]]:
+        try:
+            while True:
+                chunk = cur.fetchmany(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            cur.close()
+
+    return columns, _chunks()
+
+
+def count_query_rows(sqlite_path: str | Path, sql: str, params: Optional[Iterable[Any]] = None) -> int:
+    """
+    Return the number of rows a SELECT produces, counted inside SQLite.
+    """
+    # The newlines keep a trailing "-- comment" in sql from swallowing the ")".
+    _columns, rows = run_query(sqlite_path, f"SELECT COUNT(*) FROM (\n{sql}\n)", params)
+    return int(rows[0][0]) if rows else 0
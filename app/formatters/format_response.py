@@ -13,6 +13,7 @@ from app.messages import (
 )
 
 from app.constants import PII_COLUMNS  # noqa: E402
+from app.tracing import traced
 YEAR_RE = re.compile(r"^\d{4}$")
 DATEISH_RE = re.compile(r"^\d{4}(-\d{2}){0,2}$")
 MONTH_NAME_RE = re.compile(
@@ -154,7 +155,12 @@ def format_response(
     *,
     max_preview_rows: int = 20,
     max_col_width: int = 32,
+    total_rows: Optional[int] = None,
 ) -> FormattedResponse:
+    """
+    Summarize a result. Only the first max_preview_rows rows are converted;
+    total_rows lets callers report the real size of a capped result.
+    """
     cols = [str(c) for c in (columns or [])]
     if any(c in PII_COLUMNS for c in cols):
         return FormattedResponse(
@@ -165,11 +171,10 @@ def format_response(
             total_rows=0,
         )
 
-    norm = _normalize_rows(cols, rows)
-    total_rows = len(norm)
+    preview = _normalize_rows(cols, list(rows[:max_preview_rows]) if rows else [])
+    total_rows = max(len(rows or []), total_rows or 0)
 
     # Convert preview rows to strings
-    preview = norm[:max_preview_rows]
     preview_str = [[_to_str(x) for x in r] for r in preview]
 
     # Case A: no rows
@@ -299,6 +304,7 @@ def format_response(
     )
 
 
+@traced("format.response")
 def format_response_dict(columns: Sequence[str], rows: Any, **kwargs) -> Dict[str, Any]:
     fr = format_response(columns, rows, **kwargs)
     return {
@@ -1,7 +1,10 @@
 import re
 from typing import Any, Dict, Optional, Sequence
 
+import numpy as np
+
 from app.constants import PII_COLUMNS
+from app.db.result_set import ResultSet
 MAX_PIE_CATEGORIES = 8
 MAX_BAR_CATEGORIES = 20
 
@@ -31,17 +34,43 @@ def _is_positive_number(value: Any) -> bool:
     return _is_number(value) and float(value) > 0
 
 
-def _as_rows(columns: Sequence[str], rows: Any) -> list[list[Any]]:
+def _as_rows(columns: Sequence[str], rows: Any) -> Sequence[Sequence[Any]]:
+    """Index-able rows; sequence rows (tuples, lists, ResultSet) are used as-is."""
     if not isinstance(rows, list) or len(rows) == 0:
         return []
     if isinstance(rows[0], dict):
         cols = [str(c) for c in (columns or [])]
         return [[row.get(col) for col in cols] for row in rows]
-    return [list(row) for row in rows]
+    return rows
+
+
+def _column_values(rows: Any, data_rows: Sequence[Sequence[Any]], index: int) -> Sequence[Any]:
+    if isinstance(rows, ResultSet):
+        return rows.column(index)
+    return [row[index] for row in data_rows]
+
+
+def _all_numbers(values: Sequence[Any]) -> bool:
+    if isinstance(values, np.ndarray) and values.dtype.kind in "if":
+        return True
+    return all(_is_number(value) for value in values)
+
+
+def _all_positive(values: Sequence[Any]) -> bool:
+    if isinstance(values, np.ndarray) and values.dtype.kind in "if":
+        return bool((values > 0).all())
+    return all(_is_positive_number(value) for value in values)
 
 
 def describe_result_set(columns: Sequence[str], rows: Any) -> Dict[str, Any]:
     cols = [str(c) for c in (columns or [])]
+    if isinstance(rows, ResultSet) and tuple(cols) == rows.columns:
+        # Profiled once per result; callers get their own copy to annotate.
+        return dict(rows.memo("profile", lambda: _describe_result_set(cols, rows)))
+    return _describe_result_set(cols, rows)
+
+
+def _describe_result_set(cols: list[str], rows: Any) -> Dict[str, Any]:
     data_rows = _as_rows(cols, rows)
     profile: Dict[str, Any] = {
         "semantic_type": "empty",
@@ -70,24 +99,25 @@ def describe_result_set(columns: Sequence[str], rows: Any) -> Dict[str, Any]:
         profile["reason"] = "A chart needs one label column and one numeric value column."
         return profile
 
-    x_values = [row[0] for row in data_rows]
-    y_values = [row[1] for row in data_rows]
+    x_values = _column_values(rows, data_rows, 0)
+    y_values = _column_values(rows, data_rows, 1)
+    x0 = data_rows[0][0]
     profile["x_column"] = cols[0]
     profile["y_column"] = cols[1]
 
-    if not all(_is_number(value) for value in y_values):
+    if not _all_numbers(y_values):
         profile["semantic_type"] = "table"
         profile["reason"] = "The second column is not numeric."
         return profile
 
-    if _looks_like_date(cols[0], x_values[0]):
+    if _looks_like_date(cols[0], x0):
         profile["semantic_type"] = "time_series"
         profile["chart_ready"] = True
         profile["suggested_chart"] = "line chart"
         profile["reason"] = "Time series data is best shown as a line chart."
         return profile
 
-    if _is_number(x_values[0]):
+    if _is_number(x0):
         profile["semantic_type"] = "numeric_pair"
         profile["chart_ready"] = True
         profile["suggested_chart"] = "scatter plot"
@@ -97,7 +127,7 @@ def describe_result_set(columns: Sequence[str], rows: Any) -> Dict[str, Any]:
     profile["semantic_type"] = "categorical_comparison"
     profile["suggested_chart"] = "bar chart"
     profile["pie_allowed"] = (
-        2 <= len(x_values) <= MAX_PIE_CATEGORIES and all(_is_positive_number(value) for value in y_values)
+        2 <= len(x_values) <= MAX_PIE_CATEGORIES and _all_positive(y_values)
     )
     if len(x_values) > MAX_BAR_CATEGORIES:
         profile["reason"] = "There are too many categories for a readable chart."
@@ -135,7 +165,6 @@ def supports_visualization_request(question: str, columns: Sequence[str], rows:
     data_rows = _as_rows(cols, rows)
     if not profile["suggested_chart"] or not cols or not data_rows:
         return False
-    x_values = [row[0] for row in data_rows]
 
     requested = requested_chart_type(question)
     recommended = profile["suggested_chart"]
@@ -147,7 +176,7 @@ def supports_visualization_request(question: str, columns: Sequence[str], rows:
     if requested == "line chart":
         return recommended == "line chart"
     if requested == "bar chart":
-        return recommended == "bar chart" and len(x_values) <= MAX_BAR_CATEGORIES
+        return recommended == "bar chart" and len(data_rows) <= MAX_BAR_CATEGORIES
     if requested == "scatter plot":
         return recommended == "scatter plot"
     if requested == "histogram":
@@ -227,7 +256,7 @@ def infer_plotly(question: str, columns: Sequence[str], rows: Any, max_points: i
         return None
 
     xcol, ycol = cols[0], cols[1]
-    data_rows = rows if isinstance(rows[0], dict) else [list(r) for r in rows]
+    data_rows = rows
 
     x0 = data_rows[0].get(xcol) if isinstance(data_rows[0], dict) else data_rows[0][0]
     y0 = data_rows[0].get(ycol) if isinstance(data_rows[0], dict) else data_rows[0][1]
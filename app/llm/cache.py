@@ -0,0 +1,249 @@
+"""Disk-backed prompt -> completion cache for the chat models.
+
+Plugs into LangChain's ``BaseCache`` hook, so every chain built on a model
+from ``get_llm`` is cached without changes to the agents. Entries are keyed by
+a SHA-256 of provider, model, temperature, LangChain's model parameter string
+and the rendered prompt. They live in one SQLite file shared by all agents,
+with an entry cap and least-recently-used eviction. Hits and misses are
+counted per agent.
+
+The cache is only enabled automatically when the temperature is 0, where a
+repeated prompt is expected to produce the same answer anyway.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+from app.db.migrations import apply_migrations
+from app.logging_utils import get_logger, log_event
+from app.tracing import annotate
+
+logger = get_logger(__name__)
+
+_DEFAULT_PATH = Path(__file__).parent.parent.parent / "data" / "llm_cache.sqlite"
+_DEFAULT_MAX_ENTRIES = 5000
+
+
+def _create_llm_cache(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            generations TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+
+
+_MIGRATIONS = (_create_llm_cache,)
+
+
+class DiskLLMStore:
+    """SQLite table of serialized generations with LRU eviction."""
+
+    def __init__(self, path: str | Path, max_entries: int = _DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            apply_migrations(self.path, _MIGRATIONS, wal=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False)
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT generations FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return row[0]
+
+    def put(self, key: str, provider: str, model: str, generations: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                """
+                INSERT INTO llm_cache (key, provider, model, generations, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET generations = excluded.generations, last_used = excluded.last_used
+                """,
+                (key, provider, model, generations, now, now),
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+_STATS: dict[str, Counter] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def _record(agent: str, hit: bool) -> None:
+    with _STATS_LOCK:
+        counter = _STATS.setdefault(agent, Counter())
+        counter["hits" if hit else "misses"] += 1
+        hits, misses = counter["hits"], counter["misses"]
+    log_event(
+        logger,
+        logging.INFO,
+        "llm.cache",
+        agent=agent,
+        hit=hit,
+        llm_cache_hits=hits,
+        llm_cache_misses=misses,
+        llm_cache_hit_rate=round(hits / (hits + misses), 4),
+    )
+
+
+def llm_cache_stats() -> dict[str, dict[str, float]]:
+    """Per-agent hit/miss counters since process start."""
+    with _STATS_LOCK:
+        return {
+            agent: {
+                "hits": counter["hits"],
+                "misses": counter["misses"],
+                "hit_rate": counter["hits"] / ((counter["hits"] + counter["misses"]) or 1),
+            }
+            for agent, counter in _STATS.items()
+        }
+
+
+def reset_llm_cache_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    payload = []
+    for generation in generations:
+        if isinstance(generation, ChatGeneration):
+            payload.append({"type": "chat", "content": generation.message.content})
+        else:
+            payload.append({"type": "text", "text": generation.text})
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _load_generations(raw: str) -> list[Generation]:
+    generations: list[Generation] = []
+    for item in json.loads(raw):
+        if item.get("type") == "chat":
+            generations.append(ChatGeneration(message=AIMessage(content=item["content"])))
+        else:
+            generations.append(Generation(text=item.get("text", "")))
+    return generations
+
+
+class AgentLLMCache(BaseCache):
+    """Per-agent view of the shared disk store (the key ignores the agent)."""
+
+    def __init__(self, store: DiskLLMStore, provider: str, model: str, temperature: float, agent: str):
+        self.store = store
+        self.provider = provider
+        self.model = model
+        self.temperature = temperature
+        self.agent = agent
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        material = json.dumps([self.provider, self.model, self.temperature, llm_string, prompt], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        try:
+            raw = self.store.get(self._key(prompt, llm_string))
+        except sqlite3.Error:
+            raw = None
+        _record(self.agent, raw is not None)
+        annotate(cache_hit=raw is not None)
+        return _load_generations(raw) if raw is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        try:
+            self.store.put(self._key(prompt, llm_string), self.provider, self.model, _dump_generations(return_val))
+        except sqlite3.Error:
+            # A cache write must never fail the LLM call it follows.
+            pass
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+
+_STORES: dict[tuple[str, int], DiskLLMStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def _cache_mode() -> str:
+    return os.getenv("LLM_CACHE", "auto").strip().lower()
+
+
+def cache_settings() -> tuple[str, str, int]:
+    """(mode, path, max entries) from the environment."""
+    path = os.getenv("LLM_CACHE_PATH", "").strip() or str(_DEFAULT_PATH)
+    try:
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", str(_DEFAULT_MAX_ENTRIES)))
+    except ValueError:
+        max_entries = _DEFAULT_MAX_ENTRIES
+    return _cache_mode(), path, max_entries
+
+
+def get_disk_store() -> DiskLLMStore:
+    _, path, max_entries = cache_settings()
+    key = (str(Path(path).resolve()), max_entries)
+    with _STORES_LOCK:
+        if key not in _STORES:
+            _STORES[key] = DiskLLMStore(path, max_entries=max_entries)
+        return _STORES[key]
+
+
+def cache_for(provider: str, model: str, temperature: float, agent: Optional[str]) -> Optional[AgentLLMCache]:
+    """
+    Return the cache a model should use, or None when caching is off.
+
+    LLM_CACHE=auto (default) caches only at temperature 0, on caches at any
+    temperature and off disables caching.
+    """
+    mode = _cache_mode()
+    if mode in {"off", "0", "false", "no"}:
+        return None
+    if mode == "auto" and temperature != 0:
+        return None
+    return AgentLLMCache(get_disk_store(), provider, model, temperature, agent or "default")
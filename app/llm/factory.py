@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
 import os
+from typing import TYPE_CHECKING, Hashable
 
-from dotenv import load_dotenv
-from langchain_core.language_models.chat_models import BaseChatModel
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
 
-
-load_dotenv()
+# .env is loaded by the entry points (app/main.py, streamlit_app.py, scripts),
+# not on import, so importing the package stays side-effect free and cheap.
 
 
 class LLMConfigurationError(RuntimeError):
@@ -21,6 +24,11 @@ class LLMSettings:
     temperature: float
 
 
+_API_KEY_VARS = {
+    "openai": "OPENAI_API_KEY",
+    "google": "GOOGLE_API_KEY",
+}
+
 _DEFAULT_MODELS = {
     "openai": "gpt-4o-mini",
     "google": "gemini-1.5-flash",
@@ -62,11 +70,37 @@ def load_llm_settings() -> LLMSettings:
     return LLMSettings(provider=provider, model=model, temperature=temperature)
 
 
-def get_llm() -> BaseChatModel:
+def llm_settings_fingerprint() -> Hashable:
+    """Everything get_llm depends on: settings, a hash of the API key, cache config."""
+    from app.llm.cache import cache_settings
+
     settings = load_llm_settings()
+    key_var = _API_KEY_VARS.get(settings.provider)
+    key_hash = hashlib.sha256(os.getenv(key_var, "").encode("utf-8")).hexdigest() if key_var else ""
+    return settings, key_hash, cache_settings()
+
+
+def get_llm(agent: str | None = None) -> BaseChatModel:
+    """
+    Return the configured chat model; agent names the response-cache bucket.
+
+    Models are built once per settings fingerprint and agent, so repeated
+    calls reuse the provider client and its HTTP connection pool.
+    """
+    return _build_llm(llm_settings_fingerprint(), agent)
+
+
+@lru_cache(maxsize=16)
+def _build_llm(fingerprint: Hashable, agent: str | None) -> BaseChatModel:
+    from app.llm.cache import cache_for
+    from app.llm.usage import TOKEN_USAGE_HANDLER
+
+    callbacks = [TOKEN_USAGE_HANDLER]
+    settings = fingerprint[0]
     provider = settings.provider
     model = settings.model
     temperature = settings.temperature
+    cache = cache_for(provider, model, temperature, agent)
 
     if provider == "openai":
         try:
@@ -76,7 +110,7 @@ def get_llm() -> BaseChatModel:
                 "LLM configuration error: langchain-openai is required when LLM_PROVIDER=openai."
             ) from exc
 
-        return ChatOpenAI(model=model, temperature=temperature)
+        return ChatOpenAI(model=model, temperature=temperature, cache=cache, callbacks=callbacks)
     if provider == "google":
         try:
             from langchain_google_genai import ChatGoogleGenerativeAI
@@ -85,7 +119,7 @@ def get_llm() -> BaseChatModel:
                 "LLM configuration error: langchain-google-genai is required when LLM_PROVIDER=google."
             ) from exc
 
-        return ChatGoogleGenerativeAI(model=model, temperature=temperature)
+        return ChatGoogleGenerativeAI(model=model, temperature=temperature, cache=cache, callbacks=callbacks)
     if provider == "ollama":
         try:
             from langchain_ollama import ChatOllama
@@ -94,6 +128,6 @@ def get_llm() -> BaseChatModel:
                 "LLM configuration error: langchain-ollama is required when LLM_PROVIDER=ollama."
             ) from exc
 
-        return ChatOllama(model=model, temperature=temperature)
+        return ChatOllama(model=model, temperature=temperature, cache=cache, callbacks=callbacks)
 
     raise LLMConfigurationError("LLM configuration error: unsupported provider '{}'.".format(provider))
@@ -0,0 +1,46 @@
+"""Token usage of each model call, added to the current tracing span.
+
+Attached to every model built by ``get_llm``, so the ``llm.<agent>`` span
+around a chain call gets ``prompt_tokens`` and ``completion_tokens``. Cache
+hits report no usage and add nothing.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.tracing import current_span
+
+
+def token_usage(response: LLMResult) -> Tuple[int, int]:
+    """(prompt, completion) tokens from message usage_metadata, else provider llm_output."""
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt += int(usage.get("input_tokens", 0) or 0)
+            completion += int(usage.get("output_tokens", 0) or 0)
+    if not (prompt or completion):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = int(usage.get("prompt_tokens", 0) or 0)
+        completion = int(usage.get("completion_tokens", 0) or 0)
+    return prompt, completion
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    # Inline in async runs too, so the span of the awaiting task is the current one.
+    run_inline = True
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        span = current_span()
+        if span is None:
+            return
+        prompt, completion = token_usage(response)
+        span.add("prompt_tokens", prompt)
+        span.add("completion_tokens", completion)
+
+
+TOKEN_USAGE_HANDLER = TokenUsageHandler()
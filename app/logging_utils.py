@@ -5,6 +5,8 @@ import logging
 import os
 from typing import Any
 
+from app.tracing import current_trace_id
+
 _LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
 
 
@@ -44,5 +46,8 @@ def _json_safe(value: Any) -> Any:
 
 def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
     payload = {"event": event}
+    trace_id = current_trace_id()
+    if trace_id:
+        payload["trace_id"] = trace_id
     payload.update({key: _json_safe(value) for key, value in fields.items()})
     logger.log(level, json.dumps(payload, ensure_ascii=False, sort_keys=True))
@@ -1,18 +1,47 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import io
 import json
+import sys
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence
 
 from dotenv import load_dotenv
 
 from app.logging_utils import configure_logging
-from app.pipeline import invoke_graph_pipeline
+from app.pipeline import get_graph_app, invoke_graph_pipeline
+from app.tracing import start_metrics_server
+
+_DEFAULT_WORKERS = 4
+
 
 def _build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description="Run StatApp Text2SQL pipeline once.")
+    parser = argparse.ArgumentParser(description="Run StatApp Text2SQL pipeline on one question or a batch.")
     parser.add_argument("--db", default="data/statapp.sqlite", help="Path to SQLite database.")
-    parser.add_argument("--question", required=True, help="Natural-language question for the pipeline.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--question", help="Natural-language question for the pipeline.")
+    source.add_argument(
+        "--batch",
+        metavar="PATH",
+        help="JSONL or CSV file of questions ('-' for stdin); one JSON result per line is written to stdout.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("auto", "jsonl", "csv"),
+        default="auto",
+        help="Batch input format (auto: CSV for *.csv files, JSONL otherwise).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=_DEFAULT_WORKERS,
+        help="Questions answered concurrently in batch mode.",
+    )
     parser.add_argument(
         "--compact",
         action="store_true",
@@ -21,10 +50,143 @@ def _build_parser() -> argparse.ArgumentParser:
     return parser
 
 
-def main() -> None:
+def _parse_jsonl(lines: Sequence[str]) -> List[Dict[str, Any]]:
+    items = []
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"line {line_no}: invalid JSON ({exc.msg})") from exc
+        item = {"question": value} if isinstance(value, str) else value
+        if not isinstance(item, dict) or not str(item.get("question") or "").strip():
+            raise ValueError(f"line {line_no}: expected a string or an object with a 'question'")
+        items.append(item)
+    return items
+
+
+def _parse_csv(text: str) -> List[Dict[str, Any]]:
+    reader = csv.DictReader(io.StringIO(text))
+    if "question" not in (reader.fieldnames or []):
+        raise ValueError("CSV input needs a 'question' column")
+    return [row for row in reader if (row.get("question") or "").strip()]
+
+
+def read_batch(path: str, fmt: str = "auto") -> List[Dict[str, Any]]:
+    """Questions to replay, as dicts with 'question' and optional 'id' / 'thread_id'.
+
+    Rows that share a thread_id form one conversation and are answered in
+    file order; every other row gets its own thread.
+    """
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as handle:
+            text = handle.read()
+    if fmt == "auto":
+        fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if fmt == "csv":
+        return _parse_csv(text)
+    return _parse_jsonl(text.splitlines())
+
+
+def _conversations(items: Sequence[Dict[str, Any]]) -> List[List[tuple[int, Dict[str, Any], str]]]:
+    run_id = uuid.uuid4().hex[:8]
+    groups: Dict[str, List[tuple[int, Dict[str, Any], str]]] = {}
+    for index, item in enumerate(items):
+        thread_id = str(item.get("thread_id") or "") or f"batch-{run_id}-{index}"
+        groups.setdefault(thread_id, []).append((index, item, thread_id))
+    return list(groups.values())
+
+
+def run_batch(
+    items: Sequence[Dict[str, Any]],
+    *,
+    db_path: str,
+    workers: int = _DEFAULT_WORKERS,
+    out=None,
+) -> int:
+    """Answer items through one compiled graph and write a JSON line per question.
+
+    Lines are written as questions finish (use 'index' to restore input
+    order). Returns the number of questions that ended in an error.
+    """
+    out = out or sys.stdout
+    try:
+        # Compile once up front instead of racing the first workers.
+        graph_app = get_graph_app()
+    except Exception:
+        # e.g. missing LLM settings: each invoke reports it in its own line.
+        graph_app = None
+    write_lock = threading.Lock()
+    errors = 0
+
+    def _emit(record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with write_lock:
+            out.write(line + "\n")
+            out.flush()
+
+    def _answer(conversation) -> int:
+        failed = 0
+        for index, item, thread_id in conversation:
+            question = str(item["question"]).strip()
+            started = time.perf_counter()
+            record: Dict[str, Any] = {
+                "index": index,
+                "id": item.get("id"),
+                "thread_id": thread_id,
+                "question": question,
+            }
+            try:
+                result, _prior = invoke_graph_pipeline(
+                    db_path=db_path,
+                    question=question,
+                    thread_id=thread_id,
+                    graph_app=graph_app,
+                )
+                record["route"] = result.get("route")
+                record["result"] = result
+            except Exception as exc:
+                record["route"] = "ERROR"
+                record["error"] = f"{type(exc).__name__}: {exc}"
+            record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            failed += record["route"] == "ERROR"
+            _emit(record)
+        return failed
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+        for future in as_completed([pool.submit(_answer, c) for c in _conversations(items)]):
+            errors += future.result()
+    return errors
+
+
+def _main_batch(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    try:
+        items = read_batch(args.batch, args.format)
+    except (OSError, ValueError) as exc:
+        parser.error(f"--batch {args.batch}: {exc}")
+    started = time.perf_counter()
+    errors = run_batch(items, db_path=args.db, workers=args.workers)
+    print(
+        "{} questions, {} errors, {:.1f} s".format(len(items), errors, time.perf_counter() - started),
+        file=sys.stderr,
+    )
+    if errors:
+        raise SystemExit(1)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
     load_dotenv()
     configure_logging()
-    args = _build_parser().parse_args()
+    start_metrics_server()
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        _main_batch(args, parser)
+        return
 
     result, _prior = invoke_graph_pipeline(
         db_path=args.db,
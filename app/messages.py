@@ -35,6 +35,15 @@ PLOT_SUGGESTION = (
     '\n\nI can plot this data for you - just ask '
     '(for example, "plot a bar chart" or "show me a pie chart").'
 )
+# Progress captions shown while a streamed turn runs (keyed by event stage).
+STREAM_STAGE_MESSAGES = {
+    "context_resolved": "Reading your question...",
+    "guardrails_decided": "Preparing the query...",
+    "sql_ready": "Running the query...",
+    "sql_failed": "Fixing the query...",
+    "sql_repaired": "Running the corrected query...",
+    "rows_ready": "Writing the answer...",
+}
 
 
 TIME_RANGE_CLARIFICATION_MESSAGE = (
@@ -75,6 +84,10 @@ def pipeline_error_message(exc: BaseException) -> str:
     return "Pipeline error: {}: {}".format(type(exc).__name__, exc)
 
 
+def pipeline_timeout_message(timeout_s: float | None) -> str:
+    return "The request took longer than {}s and was cancelled. Please try again or narrow the question.".format(timeout_s)
+
+
 def sql_generation_failed_message(exc: BaseException) -> str:
     return "SQL generation failed: {}: {}".format(type(exc).__name__, exc)
 
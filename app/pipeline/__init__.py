@@ -5,12 +5,15 @@ from typing import Any
 from app.pipeline.execute_sql import execute_sql
 
 __all__ = [
+    "ainvoke_graph_pipeline",
+    "astream_graph_pipeline",
     "build_text2sql_graph",
     "execute_sql",
     "get_graph_app",
     "invoke_graph_pipeline",
     "run_data_pipeline",
     "run_reviewed_sql",
+    "stream_graph_pipeline",
 ]
 
 
@@ -38,6 +41,24 @@ def invoke_graph_pipeline(*args: Any, **kwargs: Any) -> Any:
     return _invoke_graph_pipeline(*args, **kwargs)
 
 
+async def ainvoke_graph_pipeline(*args: Any, **kwargs: Any) -> Any:
+    from app.pipeline.langgraph_flow import ainvoke_graph_pipeline as _ainvoke_graph_pipeline
+
+    return await _ainvoke_graph_pipeline(*args, **kwargs)
+
+
+def stream_graph_pipeline(*args: Any, **kwargs: Any) -> Any:
+    from app.pipeline.langgraph_flow import stream_graph_pipeline as _stream_graph_pipeline
+
+    return _stream_graph_pipeline(*args, **kwargs)
+
+
+def astream_graph_pipeline(*args: Any, **kwargs: Any) -> Any:
+    from app.pipeline.langgraph_flow import astream_graph_pipeline as _astream_graph_pipeline
+
+    return _astream_graph_pipeline(*args, **kwargs)
+
+
 def run_reviewed_sql(*args: Any, **kwargs: Any) -> Any:
     from app.pipeline.expert_review import run_reviewed_sql as _run_reviewed_sql
 
@@ -0,0 +1,177 @@
+"""
+Background chart generation for chart-ready results.
+
+Connection in flow:
+- Upstream: analysis_node starts a job as soon as a result is chart_ready and
+  stores the returned key in result_object["chart_key"].
+- This file: runs the deterministic infer_plotly fallback first, then the
+  VizAgent LLM call, on a small worker pool, and keeps the outcome in a
+  bounded in-process table.
+- Downstream: viz_node looks the key up on a "plot it" follow-up and only
+  calls the VizAgent itself when nothing matching was precomputed.
+
+Keys are random, so a checkpoint restored in another process simply misses
+and falls back to generating the chart on demand.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.formatters.viz_plotly import describe_result_set, requested_chart_type
+
+Chart = Optional[Dict[str, Any]]
+
+_WORKERS = 2
+_MAX_JOBS = 64
+# How long a follow-up waits for an LLM chart that is still being generated
+# before settling for the deterministic fallback.
+_WAIT_S = 30.0
+
+_MISS: Tuple[bool, Chart] = (False, None)
+
+
+class _ChartJob:
+    def __init__(self, chart_type: Optional[str]):
+        self.chart_type = chart_type
+        self.fallback: Chart = None
+        self.fallback_ready = threading.Event()
+        self.future: Optional[Future] = None
+
+
+_JOBS: "OrderedDict[str, _ChartJob]" = OrderedDict()
+_JOBS_LOCK = threading.Lock()
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def precompute_enabled() -> bool:
+    """CHART_PRECOMPUTE=off disables background chart generation."""
+    return os.getenv("CHART_PRECOMPUTE", "on").strip().lower() not in {"off", "0", "false", "no"}
+
+
+def resolved_chart_type(question: str, columns: Any, rows: Any) -> Optional[str]:
+    """The chart type a question asks for, or the profile's suggestion when it names none."""
+    requested = requested_chart_type(question)
+    if requested != "chart":
+        return requested
+    return describe_result_set(columns, rows).get("suggested_chart")
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="chart")
+    return _EXECUTOR
+
+
+def _run(job: _ChartJob, fallback: Callable[[], Chart], generate: Callable[[Chart], Chart]) -> Chart:
+    try:
+        job.fallback = fallback()
+    finally:
+        job.fallback_ready.set()
+    return generate(job.fallback)
+
+
+def start_chart(
+    fallback: Callable[[], Chart],
+    generate: Callable[[Chart], Chart],
+    chart_type: Optional[str],
+) -> str:
+    """
+    Queue chart generation and return its key.
+
+    fallback builds the deterministic figure; generate receives it and returns
+    the final chart (normally VizAgent.generate with fallback_viz).
+    """
+    key = uuid.uuid4().hex
+    job = _ChartJob(chart_type)
+    with _JOBS_LOCK:
+        _JOBS[key] = job
+        while len(_JOBS) > _MAX_JOBS:
+            # An evicted job can never be looked up again; free its worker slot.
+            _cancel(_JOBS.popitem(last=False)[1])
+        job.future = _executor().submit(_run, job, fallback, generate)
+    return key
+
+
+def _cancel(job: _ChartJob) -> bool:
+    """Cancel a job that has not started; True when it will never run."""
+    return job.future is not None and job.future.cancel()
+
+
+def _queued_miss(key: str, job: _ChartJob) -> bool:
+    # Still queued behind other charts: building it inline beats waiting for a worker.
+    if not _cancel(job):
+        return False
+    with _JOBS_LOCK:
+        if _JOBS.get(key) is job:
+            del _JOBS[key]
+    return True
+
+
+def _job_for(key: Optional[str], chart_type: Optional[str]) -> Optional[_ChartJob]:
+    if not key:
+        return None
+    with _JOBS_LOCK:
+        job = _JOBS.get(key)
+        if job is None or job.chart_type != chart_type:
+            return None
+        _JOBS.move_to_end(key)
+        return job
+
+
+def _settle(job: _ChartJob) -> Tuple[bool, Chart]:
+    # The LLM part is slow or failed: the deterministic figure is still a hit.
+    if job.fallback_ready.is_set() and job.fallback is not None:
+        return True, job.fallback
+    return _MISS
+
+
+def lookup_chart(key: Optional[str], chart_type: Optional[str], timeout_s: float = _WAIT_S) -> Tuple[bool, Chart]:
+    """
+    Return (hit, chart) for a precomputed chart of chart_type.
+
+    Waits up to timeout_s for a job that is still running; a job that has
+    not started yet is cancelled instead. A miss means the caller should
+    generate the chart itself.
+    """
+    job = _job_for(key, chart_type)
+    if job is None or _queued_miss(key, job):
+        return _MISS
+    try:
+        return True, job.future.result(timeout=timeout_s)
+    except FutureTimeoutError:
+        return _settle(job)
+    except Exception:
+        return _settle(job)
+
+
+async def alookup_chart(
+    key: Optional[str],
+    chart_type: Optional[str],
+    timeout_s: float = _WAIT_S,
+) -> Tuple[bool, Chart]:
+    """Async variant of lookup_chart that waits without blocking the event loop."""
+    job = _job_for(key, chart_type)
+    if job is None or _queued_miss(key, job):
+        return _MISS
+    try:
+        return True, await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout_s)
+    except asyncio.TimeoutError:
+        return _settle(job)
+    except Exception:
+        return _settle(job)
+
+
+def clear_precomputed_charts() -> None:
+    with _JOBS_LOCK:
+        for job in _JOBS.values():
+            _cancel(job)
+        _JOBS.clear()
@@ -11,27 +11,27 @@ from app.pipeline.conversation_state import (
     detect_followup_action,
     empty_conversation_state,
 )
+from app.question_features import QuestionFeatures, question_features, vocabulary
 
 _YEAR_RE = re.compile(r"\b(20\d{2})\b")
 _TOP_K_RE = re.compile(r"\btop\s+(\d+)\b", re.IGNORECASE)
 _LOCATION_RE = re.compile(
     r"\b(?:for|in|only for|just for|filter to|go back to)\s+([A-Z][A-Za-z]+(?:\s+[A-Z][A-Za-z]+)*)\b"
 )
-_EXPLAIN_RE = re.compile(
-    r"\b(explain( that| this)?|what do you mean|what does this number mean|what did you compare)\b",
-    re.IGNORECASE,
-)
-_SIMPLIFY_RE = re.compile(r"\b(make (it|that) simpler|simplify|simpler)\b", re.IGNORECASE)
-_WHY_EMPTY_RE = re.compile(r"\b(why is (that|it) empty|why no result|why is the result empty)\b", re.IGNORECASE)
-_RESET_RE = re.compile(r"\b(start over|reset( context)?|clear context)\b", re.IGNORECASE)
-_CORRECTION_RE = re.compile(r"^\s*(actually|no[, ]|i meant|rather)\b", re.IGNORECASE)
-_COMPARE_RE = re.compile(r"\bcompare\s+(with|to)\b|\b(last year|previous year)\b", re.IGNORECASE)
 _GROUP_CHANGE_RE = re.compile(r"\b(by|group by|now by|same thing but by)\s+([a-zA-Z_]+)\b", re.IGNORECASE)
-_DATA_HINT_RE = re.compile(
-    r"\b(client|clients|transaction|transactions|dossier|dossiers|commune|country|pays|segment|amount|montant)\b",
-    re.IGNORECASE,
+
+# Turn-intent vocabularies, matched on app.question_features.
+_EXPLAIN_TERMS = vocabulary("explain", "what do you mean", "what does this number mean", "what did you compare")
+_SIMPLIFY_TERMS = vocabulary("simplify", "simpler")
+_WHY_EMPTY_TERMS = vocabulary("why is that empty", "why is it empty", "why no result", "why is the result empty")
+_RESET_TERMS = vocabulary("start over", "reset", "clear context")
+_CORRECTION_LEADS = vocabulary("actually", "i meant", "rather")
+_COMPARE_TERMS = vocabulary("compare with", "compare to", "last year", "previous year")
+_DATA_HINT_TERMS = vocabulary(
+    "client", "clients", "transaction", "transactions", "dossier", "dossiers",
+    "commune", "country", "pays", "segment", "amount", "montant",
 )
-_RANKING_RE = re.compile(r"\b(top|best|worst|highest|lowest)\b", re.IGNORECASE)
+_RANKING_TERMS = vocabulary("top", "best", "worst", "highest", "lowest")
 
 _METRIC_PATTERNS = [
     (re.compile(r"\b(client|clients?)\b", re.IGNORECASE), "client_count"),
@@ -54,41 +54,48 @@ def has_active_analysis_context(conversation_state: Dict[str, Any]) -> bool:
     return bool(state.get("last_sql_query") or state.get("last_result_object"))
 
 
+def _is_correction(features: QuestionFeatures) -> bool:
+    # "no, ..." / "no ..." but not "no." or "nothing".
+    if features.leading_word == "no":
+        return features.leading_separator in {",", " "}
+    return features.starts_with(_CORRECTION_LEADS)
+
+
 def classify_turn_intent(question: str, conversation_state: Dict[str, Any], prior_route: str = "") -> str:
     q = (question or "").strip()
     if not q:
         return "unsupported_ambiguous"
-    lower = q.lower()
+    features = question_features(q)
     followup_action = detect_followup_action(q)
 
-    if _RESET_RE.search(lower):
+    if features.has(_RESET_TERMS):
         return "reset_context"
-    if _WHY_EMPTY_RE.search(lower):
+    if features.has(_WHY_EMPTY_TERMS):
         return "empty_result_explanation"
-    if _SIMPLIFY_RE.search(lower):
+    if features.has(_SIMPLIFY_TERMS):
         return "simplification_request"
-    if _EXPLAIN_RE.search(lower):
+    if features.has(_EXPLAIN_TERMS):
         return "explanation_request"
     if followup_action == "chart_request" and (
         has_active_analysis_context(conversation_state)
-        or not (_DATA_HINT_RE.search(q) or _YEAR_RE.search(q) or _RANKING_RE.search(q))
+        or not (features.has(_DATA_HINT_TERMS) or features.years or features.has(_RANKING_TERMS))
     ):
         return "visualization_request"
     if prior_route == "CLARIFY":
         return "clarification_reply"
-    if _COMPARE_RE.search(lower):
+    if features.has(_COMPARE_TERMS):
         return "comparison_request"
     if followup_action == "context_clear":
         return "filter_removal"
     if followup_action in {"topk_modification", "sort_modification", "grouping_change"}:
         return followup_action
-    if _CORRECTION_RE.search(q):
+    if _is_correction(features):
         return "correction"
     if followup_action == "filter_refinement":
         return "filter_change" if has_active_analysis_context(conversation_state) else "new_analytical_question"
     if has_active_analysis_context(conversation_state) and len(q.split()) <= 8:
         return "follow_up_refinement"
-    if _DATA_HINT_RE.search(q):
+    if features.has(_DATA_HINT_TERMS):
         return "new_analytical_question"
     return "unsupported_ambiguous"
 
@@ -184,7 +191,7 @@ def _derive_sort(intent: str, question: str, metric: str, prior_state: Dict[str,
 
 
 def _clarification_for_request(question: str, metric: str, time_reference: Dict[str, Any]) -> Optional[str]:
-    if _RANKING_RE.search(question or ""):
+    if question_features(question).has(_RANKING_TERMS):
         missing: List[str] = []
         if not metric:
             missing.append("metric")
@@ -5,6 +5,7 @@ import re
 from typing import Any, Dict, List, Optional, Sequence
 
 from app.formatters.viz_plotly import describe_result_set
+from app.question_features import question_features, vocabulary
 
 _SCHEMA_TABLE_RE = re.compile(r"TABLE\s+\w+\((.*?)\)", re.IGNORECASE | re.DOTALL)
 _YEAR_RE = re.compile(r"\b(20\d{2})\b")
@@ -40,11 +41,26 @@ GROUPING_ALIASES = {
     "segment_client": "segment",
 }
 
-VIZ_REQUEST_RE = re.compile(
-    r"\b(plot|chart|graph|visuali[sz]e|show\s+(me\s+)?(a\s+)?(chart|graph|plot)|draw|bar\s*chart|pie\s*chart|line\s*chart)\b",
-    re.IGNORECASE,
+# Rows kept inline in a result object whose full rows sit in the result store
+# (app/db/result_store.py) under result_handle; the profile still covers all rows.
+_RESULT_PREVIEW_ROWS = 20
+
+# "show me a chart", "bar chart" etc. are covered by their last word.
+VIZ_REQUEST_TERMS = vocabulary(
+    "plot", "chart", "graph", "visualise", "visualize", "draw", "barchart", "piechart", "linechart",
 )
 
+# Follow-up vocabularies for detect_followup_action.
+_CONTEXT_RESET_TERMS = vocabulary(
+    "clear context", "clear the context", "reset context", "reset the context", "start over",
+)
+_CLEAR_FILTER_TERMS = vocabulary("forget", "ignore", "remove", "without")
+_TIME_COMPARE_TERMS = vocabulary("compare with", "compare to")
+_SORT_TERMS = vocabulary("sort", "order", "desc", "descending", "asc", "ascending")
+_REGROUP_TERMS = vocabulary("now", "instead", "group", "break down", "plot")
+_REFINEMENT_LEADS = vocabulary("and", "only", "just")
+_LOCATION_TERMS = vocabulary("for", "in", "filter")
+
 
 def extract_schema_columns(schema_text: str) -> List[str]:
     fields: List[str] = []
@@ -124,13 +140,15 @@ def build_result_object(
     current_grouping: Optional[Sequence[str]] = None,
     time_reference: Optional[Dict[str, Any]] = None,
     entity_focus: str = "",
+    result_handle: str = "",
 ) -> Dict[str, Any]:
     profile = describe_result_set(columns, rows)
-    return {
+    kept_rows = rows if isinstance(rows, list) else []
+    result_object = {
         "question": question,
         "sql": sql,
         "columns": [str(c) for c in (columns or [])],
-        "rows": rows if isinstance(rows, list) else [],
+        "rows": list(kept_rows[:_RESULT_PREVIEW_ROWS]) if result_handle else kept_rows,
         "row_count": len(rows or []),
         "semantic_type": profile["semantic_type"],
         "chart_ready": profile["chart_ready"],
@@ -145,6 +163,9 @@ def build_result_object(
         "chart_reason": profile["reason"],
         "summary_text": summary_text,
     }
+    if result_handle:
+        result_object["result_handle"] = result_handle
+    return result_object
 
 
 def build_conversation_state(
@@ -249,22 +270,23 @@ def detect_followup_action(question: str) -> str:
     q = (question or "").strip()
     if not q:
         return "new_query"
-    lower = q.lower()
-    if re.search(r"\b(clear|reset)\s+(the\s+)?context\b|\bstart over\b", lower):
+    features = question_features(q)
+    if features.has(_CONTEXT_RESET_TERMS):
         return "context_reset"
-    if _CLEAR_FILTER_RE.search(q):
+    # Regexes that capture a value only run once their trigger word is present.
+    if features.has(_CLEAR_FILTER_TERMS) and _CLEAR_FILTER_RE.search(q):
         return "context_clear"
-    if re.search(r"\bcompare\s+(with|to)\b", lower):
+    if features.has(_TIME_COMPARE_TERMS):
         return "time_comparison"
-    if _TOP_K_RE.search(q):
+    if features.top_k is not None:
         return "topk_modification"
-    if re.search(r"\b(sort|order)\b", lower) or re.search(r"\b(desc|descending|asc|ascending)\b", lower):
+    if features.has(_SORT_TERMS):
         return "sort_modification"
-    if _GROUPING_RE.search(q) and re.search(r"\b(now|instead|group|break down|plot)\b", lower):
+    if features.has(_REGROUP_TERMS) and "by" in features.terms and _GROUPING_RE.search(q):
         return "grouping_change"
-    if VIZ_REQUEST_RE.search(q):
+    if features.has(VIZ_REQUEST_TERMS):
         return "chart_request"
-    if re.search(r"^\s*(and|only|just)\b", lower) or _LOCATION_RE.search(q):
+    if features.starts_with(_REFINEMENT_LEADS) or (features.has(_LOCATION_TERMS) and _LOCATION_RE.search(q)):
         return "filter_refinement"
     return "new_query"
 
@@ -18,7 +18,9 @@ from app.db.sqlite import get_prompt_schema_text
 from app.agents.analysis_agent import AnalysisAgent
 from app.agents.error_agent import ErrorAgent
 from app.agents.guardrails.agent import GuardrailsAgent
+from app.agents.shared.registry import get_agent
 from app.agents.sql.agent import SQLAgent
+from app.agents.sql.templates import compile_template_sql, templates_enabled
 from app.llm.factory import LLMConfigurationError
 from app.logging_utils import get_logger, log_event
 from app.messages import (
@@ -35,6 +37,7 @@ from app.pipeline.conversation_state import build_conversation_state, build_resu
 
 from app.formatters.format_response import format_response_dict, with_plot_suggestion
 from app.formatters.viz_plotly import can_visualize
+from app.tracing import span
 
 MAX_SQL_REPAIR_ATTEMPTS = 3
 logger = get_logger(__name__)
@@ -54,8 +57,15 @@ def _get_clarifying_questions(gk: Any) -> List[str]:
 
 
 def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
+    with span("turn", pipeline="sync") as turn:
+        result = _run_data_pipeline(db_path, question)
+        turn.set(route=str(result.get("route", "")))
+        return result
+
+
+def _run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
     schema_text = get_prompt_schema_text(db_path, question)
-    guardrails_agent = GuardrailsAgent()
+    guardrails_agent = get_agent("guardrails_agent", GuardrailsAgent, uses_llm=False)
 
     def _finalize(
         payload: Dict[str, Any],
@@ -78,9 +88,9 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
         return result
 
     try:
-        sql_agent = SQLAgent()
-        error_agent = ErrorAgent()
-        analysis_agent = AnalysisAgent()
+        sql_agent = get_agent("sql_agent", SQLAgent)
+        error_agent = get_agent("error_agent", ErrorAgent)
+        analysis_agent = get_agent("analysis_agent", AnalysisAgent)
     except LLMConfigurationError as exc:
         log_event(
             logger,
@@ -172,6 +182,7 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
         return generated_sql
 
     try:
+        template_sql = compile_template_sql(db_path, question) if templates_enabled() else None
         remembered_sql = fetch_similar_correction(db_path, question)
         if remembered_sql:
             sql = remembered_sql
@@ -185,6 +196,16 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
                 sql=sql,
                 question_preview=question[:120],
             )
+        elif template_sql:
+            sql = template_sql
+            sql_source = "template"
+            log_event(
+                logger,
+                logging.INFO,
+                "sql.compiled_from_template",
+                pipeline="sync",
+                sql=sql,
+            )
         else:
             sql = _generate_sql_with_llm()
             sql_source = "llm"
@@ -221,10 +242,10 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
                 sql=sql,
                 error=last_error,
             )
-            if reused_correction and not memory_fallback_attempted:
+            if sql_source != "llm" and not memory_fallback_attempted:
                 try:
                     sql = _generate_sql_with_llm()
-                    sql_source = "llm"
+                    failed_source, sql_source = sql_source, "llm"
                     memory_fallback_attempted = True
                     log_event(
                         logger,
@@ -232,6 +253,7 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
                         "sql.memory_fallback_to_llm",
                         pipeline="sync",
                         failed_memory_sql=attempts[-1].sql,
+                        failed_source=failed_source,
                         error=last_error,
                     )
                     continue
@@ -276,10 +298,10 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
                 sql=sql,
                 error=last_error,
             )
-            if reused_correction and not memory_fallback_attempted:
+            if sql_source != "llm" and not memory_fallback_attempted:
                 try:
                     sql = _generate_sql_with_llm()
-                    sql_source = "llm"
+                    failed_source, sql_source = sql_source, "llm"
                     memory_fallback_attempted = True
                     log_event(
                         logger,
@@ -287,6 +309,7 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
                         "sql.memory_fallback_to_llm",
                         pipeline="sync",
                         failed_memory_sql=attempts[-1].sql,
+                        failed_source=failed_source,
                         error=last_error,
                     )
                     continue
@@ -358,7 +381,7 @@ def run_data_pipeline(db_path: str, question: str) -> Dict[str, Any]:
 
     columns = exec_res.get("columns", [])
     rows = exec_res.get("rows", [])
-    formatted = format_response_dict(columns, rows)
+    formatted = format_response_dict(columns, rows, total_rows=exec_res.get("total_rows"))
     result_object = build_result_object(
         columns,
         rows,
@@ -1,18 +1,112 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import csv
+import logging
+from typing import Any, Dict, TextIO
 
-from app.db.sqlite import run_query
+from app.db.result_set import ResultSet
+from app.db.result_cache import QUERY_RESULT_CACHE, estimate_result_bytes, normalize_sql_key
+from app.db.rollups import rewrite_for_rollups, rollup_rewrite_enabled
+from app.db.sqlite import count_query_rows, database_fingerprint, iter_query, run_query
+from app.logging_utils import get_logger, log_event
 from app.safety.sql_validator import validate_sql
+from app.tracing import annotate, span
 
+logger = get_logger(__name__)
 
-def execute_sql(sqlite_path: str, sql: str, max_rows: int = 200) -> Dict[str, Any]:
+
+def execute_sql(sqlite_path: str, sql: str, max_rows: int = 200, use_cache: bool = True) -> Dict[str, Any]:
+    with span("sql.execute") as current:
+        res = _execute_sql(sqlite_path, sql, max_rows, use_cache)
+        current.set(ok=bool(res.get("ok")))
+        if res.get("ok"):
+            current.set(rows=len(res["rows"]))
+            if use_cache:
+                current.set(cache_hit=bool(res.get("cached")))
+        return res
+
+
+def _execute_sql(sqlite_path: str, sql: str, max_rows: int, use_cache: bool) -> Dict[str, Any]:
     ok, reason = validate_sql(sql)
     if not ok:
         return {"ok": False, "error": reason, "sql": sql}
 
     try:
-        cols, rows = run_query(sqlite_path, sql, max_rows=max_rows)
-        return {"ok": True, "sql": sql, "columns": cols, "rows": rows}
+        cache_key = (normalize_sql_key(sql), max_rows, database_fingerprint(sqlite_path))
+        cached = QUERY_RESULT_CACHE.get(cache_key) if use_cache else None
+        if cached is not None:
+            cols, rows, total_rows = cached
+            log_event(logger, logging.INFO, "sql.result_cache", hit=True, **QUERY_RESULT_CACHE.stats())
+            return {
+                "ok": True,
+                "sql": sql,
+                "columns": list(cols),
+                "rows": rows,
+                "total_rows": total_rows,
+                "truncated": total_rows > len(rows),
+                "cached": True,
+            }
+
+        # The rollup answer is the same result, so it is cached under the original SQL.
+        query = sql
+        if rollup_rewrite_enabled():
+            rewritten = rewrite_for_rollups(sqlite_path, sql)
+            if rewritten is not None:
+                query, rollup = rewritten
+                annotate(rollup=rollup)
+                log_event(logger, logging.INFO, "sql.rollup_rewrite", rollup=rollup, rewritten_sql=query)
+
+        cols, rows = run_query(sqlite_path, query, max_rows=max_rows)
+        if not isinstance(rows, ResultSet):
+            rows = ResultSet(cols, rows)
+        # Only a full page can hide more rows; count them inside SQLite.
+        total_rows = len(rows)
+        truncated = False
+        count_failed = False
+        if max_rows is not None and len(rows) >= max_rows:
+            try:
+                total_rows = count_query_rows(sqlite_path, query)
+                truncated = total_rows > len(rows)
+            except Exception as e:
+                # The page is still good; report it as possibly truncated and leave it uncached.
+                count_failed = truncated = True
+                log_event(logger, logging.WARNING, "sql.count_failed", error=str(e))
+        if use_cache and not count_failed:
+            QUERY_RESULT_CACHE.put(
+                cache_key,
+                # ResultSet is immutable, so hits share it (and its cached arrays).
+                (tuple(cols), rows, total_rows),
+                estimate_result_bytes(cols, rows),
+            )
+            log_event(logger, logging.INFO, "sql.result_cache", hit=False, **QUERY_RESULT_CACHE.stats())
+        return {
+            "ok": True,
+            "sql": sql,
+            "columns": cols,
+            "rows": rows,
+            "total_rows": total_rows,
+            "truncated": truncated,
+        }
     except Exception as e:
         return {"ok": False, "error": f"SQL execution error: {e}", "sql": sql}
+
+
+def export_sql_csv(sqlite_path: str, sql: str, out: TextIO, chunk_size: int = 5000) -> int:
+    """
+    Stream the full (uncapped) result of a validated SELECT into out as CSV.
+
+    Rows are written chunk by chunk, so memory use does not grow with the
+    result size. Returns the number of data rows written.
+    """
+    ok, reason = validate_sql(sql)
+    if not ok:
+        raise ValueError(reason)
+
+    columns, chunks = iter_query(sqlite_path, sql, chunk_size=chunk_size)
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    written = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        written += len(chunk)
+    return written
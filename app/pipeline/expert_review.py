@@ -88,7 +88,7 @@ def run_reviewed_sql(
 
     columns = execution.get("columns", [])
     rows = execution.get("rows", [])
-    formatted = format_response_dict(columns, rows)
+    formatted = format_response_dict(columns, rows, total_rows=execution.get("total_rows"))
     viz = infer_plotly(question, columns, rows)
     result_object = build_result_object(
         columns,
@@ -6,21 +6,28 @@ Connection in flow:
 - This file: maps each agent into a LangGraph node with conditional edges
   and adds a context_resolver node for multi-turn memory (slot filling,
   post-result follow-ups like "plot it").
-- Downstream: compiled graph uses MemorySaver to persist state across turns
-  within the same thread_id.
+- Downstream: compiled graph uses a SQLite checkpointer (app/db/checkpoints.py)
+  to persist state across turns within the same thread_id.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
-from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, TypedDict
 
 from app.agents.analysis_agent import AnalysisAgent
 from app.agents.error_agent import ErrorAgent
 from app.agents.guardrails.agent import GuardrailsAgent
+from app.agents.shared.aio import acall_agent
+from app.agents.shared.registry import agent_settings_fingerprint, get_agent
 from app.agents.sql.agent import SQLAgent
+from app.agents.sql.templates import compile_request_sql, compile_template_sql, templates_enabled
 from app.agents.viz_agent import VizAgent
+from app.db.async_executor import run_in_db_executor
+from app.db.checkpoints import build_checkpointer
+from app.db.result_store import load_result, store_result
 from app.db.corrections import fetch_similar_correction
 from app.db.sqlite import get_prompt_schema_text, get_schema_text
 from app.formatters.format_response import format_response_dict, with_plot_suggestion
@@ -37,7 +44,16 @@ from app.messages import (
     CLARIFY_REQUEST_MESSAGE,
     PIPELINE_NONE_MESSAGE,
     pipeline_error_message,
+    pipeline_timeout_message,
 )
+from app.pipeline.chart_precompute import (
+    alookup_chart,
+    lookup_chart,
+    precompute_enabled,
+    resolved_chart_type,
+    start_chart,
+)
+from app.pipeline import speculative_sql
 from app.pipeline.execute_sql import execute_sql
 from app.pipeline.chatbot_orchestrator import (
     build_direct_assistant_response,
@@ -53,12 +69,15 @@ from app.pipeline.conversation_state import (
 from app.pipeline.response_policy import (
     build_out_of_scope_answer,
     build_viz_no_data_answer,
+    acompose_data_answer,
     compose_data_answer,
 )
+from app.question_features import question_features, vocabulary
 from app.safety.sql_validator import validate_sql
+from app.tracing import span, traced
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
 
 
 # ---------------------------------------------------------------------------
@@ -76,7 +95,10 @@ class AgentState(TypedDict, total=False):
     error: str
     attempts: List[Dict[str, Any]]
     columns: List[str]
+    # Full rows live in the result store under result_handle; rows is only
+    # read back from checkpoints written before handles existed.
     rows: List[Any]
+    result_handle: str
     answer_text: str
     answer_table: str
     preview_rows: List[List[str]]
@@ -98,6 +120,7 @@ class AgentState(TypedDict, total=False):
     sql_source: str
     needs_execute_retry: bool
     memory_fallback_attempted: bool
+    speculative_sql_key: str
     result_object: Dict[str, Any]
     conversation_state: Dict[str, Any]
     normalized_request: Dict[str, Any]
@@ -126,10 +149,22 @@ _YEAR_RE = re.compile(r"\b(20\d{2})\b")
 logger = get_logger(__name__)
 
 
+_MEMORY_DIMENSIONS = ("segment", "commune", "pays", "country", "enseigne", "categorie_achat", "month", "year")
+_CLIENT_COUNT_TERMS = vocabulary("how many clients", "number of clients")
+_TRANSACTION_COUNT_TERMS = vocabulary("how many transactions", "number of transactions")
+_AMOUNT_SUM_TERMS = vocabulary("total amount", "montant total", "sum")
+_AVERAGE_TERMS = vocabulary("average", "avg", "moyenne")
+_TREND_TERMS = vocabulary("trend", "over time")
+_SORT_DESC_TERMS = vocabulary("top", "highest", "best")
+_SORT_ASC_TERMS = vocabulary("lowest", "worst")
+_DESCENDING_TERMS = vocabulary("descending", "desc")
+_ASCENDING_TERMS = vocabulary("ascending", "asc")
+_SCOPE_TERMS = vocabulary("for", "in")
+
+
 def _extract_query_memory(question: str) -> Dict[str, Any]:
     q = (question or "").strip()
-    lower = q.lower()
-    dimensions: List[str] = []
+    features = question_features(q)
     filters: Dict[str, Any] = {}
     metric = ""
     aggregation_intent = ""
@@ -137,44 +172,41 @@ def _extract_query_memory(question: str) -> Dict[str, Any]:
     sort_direction = ""
     time_range: Dict[str, Any] = {}
 
-    for label in ("segment", "commune", "pays", "country", "enseigne", "categorie_achat", "month", "year"):
-        if re.search(r"\b{}\b".format(re.escape(label)), lower):
-            dimensions.append(label)
+    dimensions = [label for label in _MEMORY_DIMENSIONS if label in features.terms]
 
-    year_match = _YEAR_RE.search(q)
-    if year_match:
-        time_range = {"kind": "year", "value": year_match.group(1)}
+    if features.years:
+        time_range = {"kind": "year", "value": features.years[0]}
 
-    if re.search(r"\bhow many clients\b|\bnumber of clients\b", lower):
+    if features.has(_CLIENT_COUNT_TERMS):
         metric = "clients"
         aggregation_intent = "count"
-    elif re.search(r"\bhow many transactions\b|\bnumber of transactions\b", lower):
+    elif features.has(_TRANSACTION_COUNT_TERMS):
         metric = "transactions"
         aggregation_intent = "count"
-    elif re.search(r"\btotal amount\b|\bmontant total\b|\bsum\b", lower):
+    elif features.has(_AMOUNT_SUM_TERMS):
         metric = "amount"
         aggregation_intent = "sum"
-    elif re.search(r"\baverage\b|\bavg\b|\bmoyenne\b", lower):
+    elif features.has(_AVERAGE_TERMS):
         aggregation_intent = "average"
-    elif re.search(r"\bcompare\b", lower):
+    elif "compare" in features.terms:
         aggregation_intent = "comparison"
-    elif re.search(r"\btrend\b|\bover time\b", lower):
+    elif features.has(_TREND_TERMS):
         aggregation_intent = "trend"
 
-    if re.search(r"\btop\b|\bhighest\b|\bbest\b", lower):
+    if features.has(_SORT_DESC_TERMS):
         sort_direction = "desc"
         sort_by = metric or "value"
-    elif re.search(r"\blowest\b|\bworst\b", lower):
+    elif features.has(_SORT_ASC_TERMS):
         sort_direction = "asc"
         sort_by = metric or "value"
-    elif re.search(r"\bdescending\b|\bdesc\b", lower):
+    elif features.has(_DESCENDING_TERMS):
         sort_direction = "desc"
         sort_by = metric or "value"
-    elif re.search(r"\bascending\b|\basc\b", lower):
+    elif features.has(_ASCENDING_TERMS):
         sort_direction = "asc"
         sort_by = metric or "value"
 
-    filter_match = re.search(
+    filter_match = features.has(_SCOPE_TERMS) and re.search(
         r"\b(?:for|in)\s+([A-Z][A-Za-z]+(?:\s+[A-Z][A-Za-z]+)*)\b(?:\s+only)?\??$",
         q,
     )
@@ -192,6 +224,428 @@ def _extract_query_memory(question: str) -> Dict[str, Any]:
     }
 
 
+# ---------------------------------------------------------------------------
+# Node steps shared by the sync and async graph paths
+# ---------------------------------------------------------------------------
+# Each node that waits on an agent or on SQLite is written as plain steps
+# around that call, so invoke() and ainvoke() run the same logic and only
+# differ in how the blocking call is made.
+
+def _remembered_sql_update(state: AgentState, sql: str, speculative_key: str = "") -> AgentState:
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.sql_reused_from_memory",
+        route=state.get("route"),
+        sql=sql,
+    )
+    return {
+        "sql": sql,
+        "sql_source": "expert_memory",
+        "reused_correction": True,
+        "memory_fallback_attempted": False,
+        "speculative_sql_key": speculative_key,
+        "needs_execute_retry": False,
+        "error": "",
+        "attempts": state.get("attempts", []),
+    }
+
+
+def _template_sql(state: AgentState) -> Optional[str]:
+    if not templates_enabled():
+        return None
+    normalized_request = state.get("normalized_request") or {}
+    if normalized_request.get("request_text") == state["question"]:
+        # The context resolver replaced the user's words with the request block.
+        return compile_request_sql(state["db_path"], normalized_request)
+    return compile_template_sql(state["db_path"], state["question"])
+
+
+def _template_sql_update(state: AgentState, sql: str) -> AgentState:
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.sql_compiled_from_template",
+        route=state.get("route"),
+        sql=sql,
+    )
+    return {
+        "sql": sql,
+        "sql_source": "template",
+        "reused_correction": False,
+        "memory_fallback_attempted": False,
+        "speculative_sql_key": "",
+        "needs_execute_retry": False,
+        "error": "",
+        "attempts": state.get("attempts", []),
+    }
+
+
+def _generated_sql_update(state: AgentState, sql: str) -> AgentState:
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.sql_generated",
+        route=state.get("route"),
+        sql=sql,
+    )
+    return {
+        "sql": sql,
+        "sql_source": "llm",
+        "reused_correction": False,
+        "memory_fallback_attempted": False,
+        "speculative_sql_key": "",
+        "needs_execute_retry": False,
+        "error": "",
+        "attempts": state.get("attempts", []),
+    }
+
+
+def _record_sql_failure(attempts: List[Dict[str, Any]], stage: str, sql: str, error: str) -> None:
+    attempts.append({"stage": stage, "sql": sql, "error": error})
+    log_event(
+        logger,
+        logging.WARNING,
+        "graph.sql_{}_failed".format(stage),
+        sql=sql,
+        error=error,
+    )
+
+
+def _needs_memory_fallback(state: AgentState) -> bool:
+    """Memory or template SQL failed: regenerate once with the LLM before repairing."""
+    return state.get("sql_source") in {"expert_memory", "template"} and not state.get("memory_fallback_attempted")
+
+
+def _memory_fallback_update(
+    state: AgentState,
+    attempts: List[Dict[str, Any]],
+    failed_sql: str,
+    error: str,
+    fallback_sql: str,
+) -> AgentState:
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.sql_memory_fallback_to_llm",
+        failed_memory_sql=failed_sql,
+        failed_source=state.get("sql_source"),
+        error=error,
+        replacement_sql=fallback_sql,
+    )
+    return {
+        "sql": fallback_sql,
+        "sql_source": "llm",
+        "memory_fallback_attempted": True,
+        "speculative_sql_key": "",
+        "needs_execute_retry": True,
+        "error": "",
+        "attempts": attempts,
+    }
+
+
+def _end_speculation(state: AgentState) -> None:
+    """Memory SQL ran: the racing LLM generation is no longer needed."""
+    key = state.get("speculative_sql_key")
+    if key:
+        log_event(
+            logger,
+            logging.INFO,
+            "graph.sql_speculation",
+            outcome="memory_won",
+            cancelled=speculative_sql.cancel(key),
+        )
+
+
+def _log_speculation_claimed() -> None:
+    log_event(logger, logging.INFO, "graph.sql_speculation", outcome="llm_used")
+
+
+def _resolve_rows(handle: Optional[str], fallback: Any) -> Any:
+    """Rows behind a result handle, or fallback when the store no longer has them."""
+    rows = load_result(handle)
+    return fallback if rows is None else rows
+
+
+def _state_rows(state: AgentState) -> Any:
+    return _resolve_rows(state.get("result_handle"), state.get("rows") or [])
+
+
+def _with_result_rows(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach the rows behind result_handle to a turn result for the UI and CLI."""
+    handle = result.get("result_handle")
+    if handle and result.get("rows") is None:
+        result["rows"] = _resolve_rows(handle, (result.get("result_object") or {}).get("rows", []))
+    return result
+
+
+def _executed_update(attempts: List[Dict[str, Any]], sql: str, res: Dict[str, Any]) -> AgentState:
+    attempts.append({"stage": "execution", "sql": sql, "error": ""})
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.sql_executed",
+        sql=sql,
+        row_count=len(res.get("rows", [])),
+    )
+    return {
+        "error": "",
+        "attempts": attempts,
+        "columns": res.get("columns", []),
+        "result_handle": store_result(res.get("columns", []), res.get("rows", [])),
+        "total_rows": res.get("total_rows", len(res.get("rows", []))),
+        "needs_execute_retry": False,
+        "speculative_sql_key": "",
+    }
+
+
+def _repaired_sql_update(state: AgentState, sql: str) -> AgentState:
+    attempts = list(state.get("attempts", []))
+    attempts.append({"stage": "repair", "sql": sql, "error": ""})
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.sql_repaired",
+        sql=sql,
+        repair_count=sum(1 for a in attempts if a.get("stage") == "repair"),
+    )
+    return {"sql": sql, "attempts": attempts, "error": ""}
+
+
+def _prepare_analysis(state: AgentState) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Return (formatted response, normalized request, result object) for analysis_node."""
+    cols = state.get("columns", [])
+    rows = _state_rows(state)
+    formatted = format_response_dict(cols, rows, total_rows=state.get("total_rows"))
+    normalized_request = dict(state.get("normalized_request") or {})
+    result_object = build_result_object(
+        cols,
+        rows,
+        sql=state.get("sql", ""),
+        question=state.get("question", ""),
+        summary_text=formatted["text"],
+        context_filters=state.get("filters", {}),
+        current_grouping=state.get("dimensions", []),
+        time_reference=state.get("time_range", {}),
+        entity_focus=state.get("metric", ""),
+        result_handle=state.get("result_handle", ""),
+    )
+    return formatted, normalized_request, result_object
+
+
+def _analysis_answer_kwargs(state: AgentState, formatted: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "question": state.get("question", ""),
+        "sql": state.get("sql", ""),
+        "columns": state.get("columns", []),
+        "rows": _state_rows(state),
+        "fallback_text": formatted["text"],
+    }
+
+
+def _finish_analysis(
+    state: AgentState,
+    formatted: Dict[str, Any],
+    normalized_request: Dict[str, Any],
+    result_object: Dict[str, Any],
+    answer_text: str,
+) -> AgentState:
+    rows = _state_rows(state)
+    change_summary = normalized_request.get("change_summary", "")
+    if change_summary:
+        answer_text = "{} {}".format(change_summary, answer_text).strip()
+    if not rows and state.get("filters"):
+        answer_text = "{} The result is empty for {}.".format(
+            change_summary or "I applied your request.",
+            state.get("filters", {}),
+        ).strip()
+    if result_object.get("chart_ready"):
+        answer_text = with_plot_suggestion(answer_text)
+    conversation_state = build_conversation_state(
+        question=state.get("question", ""),
+        route="DATA",
+        sql=state.get("sql", ""),
+        result_object=result_object,
+        metric=state.get("metric", ""),
+        dimensions=state.get("dimensions", []),
+        time_range=state.get("time_range", {}),
+        filters=state.get("filters", {}),
+        sort_by=state.get("sort_by", ""),
+        sort_direction=state.get("sort_direction", ""),
+        aggregation_intent=state.get("aggregation_intent", ""),
+        last_user_intent=state.get("resolved_intent") or state.get("parsed_intent") or "data_query",
+        prior_state=state.get("prior_conversation_state", {}),
+        normalized_request=normalized_request,
+        answer_text=answer_text,
+        last_filter_field=normalized_request.get("last_filter_field", ""),
+    )
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.analysis_completed",
+        row_count=len(rows),
+        retry_count=max(0, len(state.get("attempts", [])) - 1),
+    )
+
+    return {
+        "answer_text": answer_text,
+        "answer_table": formatted["table"],
+        "preview_rows": formatted["preview_rows"],
+        "preview_row_count": formatted["preview_row_count"],
+        "total_rows": formatted["total_rows"],
+        "retry_count": max(0, len(state.get("attempts", [])) - 1),
+        "result_object": result_object,
+        "conversation_state": conversation_state,
+        "normalized_request": normalized_request,
+    }
+
+
+def _prepare_viz(state: AgentState) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Return (result object, conversation state, normalized request) for viz_node."""
+    result_object = dict(
+        state.get("result_object")
+        or build_result_object(
+            state.get("columns", []),
+            _state_rows(state),
+            sql=state.get("sql", ""),
+            question=state.get("question", ""),
+            context_filters=(state.get("conversation_state") or {}).get("current_filters", {}),
+            current_grouping=(state.get("conversation_state") or {}).get("current_grouping", []),
+            time_reference=(state.get("conversation_state") or {}).get("current_time_reference", {}),
+            entity_focus=(state.get("conversation_state") or {}).get("current_entity_focus", ""),
+            result_handle=state.get("result_handle", ""),
+        )
+    )
+    conversation_state = dict(state.get("conversation_state") or {})
+    normalized_request = dict(state.get("normalized_request") or {})
+    return result_object, conversation_state, normalized_request
+
+
+def _viz_supported(state: AgentState, result_object: Dict[str, Any]) -> bool:
+    if not result_object.get("chart_ready"):
+        return False
+    return supports_visualization_request(state.get("question", ""), state.get("columns", []), _state_rows(state))
+
+
+def _viz_unsupported_update(
+    state: AgentState,
+    result_object: Dict[str, Any],
+    conversation_state: Dict[str, Any],
+    normalized_request: Dict[str, Any],
+) -> AgentState:
+    return {
+        "route": "VIZ_UNSUPPORTED",
+        "answer_text": build_visualization_guidance(
+            state.get("question", ""),
+            state.get("columns", []),
+            _state_rows(state),
+        ),
+        "viz": None,
+        "columns": None,
+        "result_handle": "",
+        "sql": None,
+        "result_object": result_object,
+        "conversation_state": conversation_state,
+        "normalized_request": normalized_request,
+    }
+
+
+def _viz_agent_kwargs(state: AgentState) -> Dict[str, Any]:
+    cols = state.get("columns", [])
+    rows = _state_rows(state)
+    return {
+        "question": state.get("question", ""),
+        "columns": cols,
+        "rows": rows,
+        "fallback_viz": infer_plotly(state.get("question", ""), cols, rows),
+    }
+
+
+def _requested_chart(state: AgentState, result_object: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """(precompute key, chart type) that a follow-up viz turn can be served from."""
+    chart_type = resolved_chart_type(state.get("question", ""), state.get("columns", []), _state_rows(state))
+    return result_object.get("chart_key"), chart_type
+
+
+def _viz_generation_kwargs(question: str, columns: Any, rows: Any) -> Dict[str, Any]:
+    return {"question": question, "columns": columns, "rows": rows}
+
+
+def _start_chart_precompute(state: AgentState, result_object: Dict[str, Any], viz_agent: Any) -> None:
+    """Queue the chart for a chart-ready result so a "plot it" follow-up only looks it up."""
+    question = state.get("question", "")
+    cols = state.get("columns", [])
+    rows = _state_rows(state)
+    if not result_object.get("chart_ready") or not precompute_enabled():
+        return
+    if not supports_visualization_request(question, cols, rows):
+        return
+    kwargs = _viz_generation_kwargs(question, cols, rows)
+    result_object["chart_key"] = start_chart(
+        lambda: infer_plotly(question, cols, rows),
+        lambda fallback: viz_agent.generate(**kwargs, fallback_viz=fallback),
+        chart_type=resolved_chart_type(question, cols, rows),
+    )
+
+
+def _log_precomputed_chart(state: AgentState, result_object: Dict[str, Any], hit: bool) -> None:
+    if result_object.get("chart_key"):
+        log_event(
+            logger,
+            logging.INFO,
+            "graph.viz_precomputed",
+            hit=hit,
+            row_count=len(_state_rows(state)),
+        )
+
+
+def _finish_viz(
+    state: AgentState,
+    viz: Optional[Dict[str, Any]],
+    result_object: Dict[str, Any],
+    conversation_state: Dict[str, Any],
+    normalized_request: Dict[str, Any],
+) -> AgentState:
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.viz_generated",
+        has_viz=bool(viz),
+        row_count=len(_state_rows(state)),
+    )
+    if not viz:
+        return _viz_unsupported_update(state, result_object, conversation_state, normalized_request)
+    chart_label = requested_chart_type(state.get("question", ""))
+    if chart_label == "chart":
+        chart_label = result_object.get("suggested_chart") or "chart"
+    answer_text = "I turned the previous result into a {}.".format(chart_label)
+    conversation_state = build_conversation_state(
+        question=state.get("question", ""),
+        route="VIZ_FOLLOWUP",
+        sql=state.get("sql", ""),
+        result_object=result_object,
+        metric=conversation_state.get("metric", ""),
+        dimensions=conversation_state.get("current_grouping", []),
+        time_range=conversation_state.get("current_time_reference", {}),
+        filters=conversation_state.get("current_filters", {}),
+        sort_by=conversation_state.get("sort_by", ""),
+        sort_direction=conversation_state.get("sort_direction", ""),
+        aggregation_intent=conversation_state.get("aggregation_intent", ""),
+        last_user_intent="visualization_request",
+        prior_state=conversation_state,
+        normalized_request=normalized_request,
+        answer_text=answer_text,
+        last_filter_field=conversation_state.get("last_filter_field", ""),
+    )
+    return {
+        "viz": viz,
+        "answer_text": answer_text,
+        "result_object": result_object,
+        "conversation_state": conversation_state,
+        "normalized_request": normalized_request,
+    }
+
+
 # ---------------------------------------------------------------------------
 # Graph builder
 # ---------------------------------------------------------------------------
@@ -205,11 +659,11 @@ def build_text2sql_graph(max_sql_repair_attempts: int = 3):
     context_resolver can short-circuit to viz_agent for explicit viz follow-ups,
     or to END for blocked/viz_no_data routes.
     """
-    guardrails_agent = GuardrailsAgent()
-    sql_agent = SQLAgent()
-    error_agent = ErrorAgent()
-    analysis_agent = AnalysisAgent()
-    viz_agent = VizAgent()
+    guardrails_agent = get_agent("guardrails_agent", GuardrailsAgent, uses_llm=False)
+    sql_agent = get_agent("sql_agent", SQLAgent)
+    error_agent = get_agent("error_agent", ErrorAgent)
+    analysis_agent = get_agent("analysis_agent", AnalysisAgent)
+    viz_agent = get_agent("viz_agent", VizAgent)
 
     workflow = StateGraph(AgentState)
 
@@ -285,7 +739,10 @@ def build_text2sql_graph(max_sql_repair_attempts: int = 3):
                 or {}
             )
             prior_cols = chart_source.get("columns") or state.get("prior_columns", [])
-            prior_rows = chart_source.get("rows") or state.get("prior_rows", [])
+            prior_rows = _resolve_rows(
+                chart_source.get("result_handle"),
+                chart_source.get("rows") or state.get("prior_rows", []),
+            )
             if chart_source.get("chart_ready") and prior_cols and prior_rows:
                 viz_question = "{} - {}".format(question, prior_question) if prior_question else question
                 log_event(
@@ -302,7 +759,7 @@ def build_text2sql_graph(max_sql_repair_attempts: int = 3):
                 return {
                     "question": viz_question,
                     "columns": prior_cols,
-                    "rows": prior_rows,
+                    "result_handle": store_result(prior_cols, prior_rows),
                     "sql": chart_source.get("sql") or state.get("prior_sql", ""),
                     "result_object": chart_source,
                     "conversation_state": updated_conversation_state,
@@ -317,7 +774,7 @@ def build_text2sql_graph(max_sql_repair_attempts: int = 3):
                     "answer_text": build_visualization_guidance(question, prior_cols, prior_rows),
                     "viz": None,
                     "columns": None,
-                    "rows": None,
+                    "result_handle": "",
                     "sql": None,
                     "result_object": chart_source,
                     "conversation_state": prior_conversation_state,
@@ -418,321 +875,188 @@ def build_text2sql_graph(max_sql_repair_attempts: int = 3):
         )
         return out
 
+    # Schema lookups and rule-based guardrails only block on SQLite.
+    async def acontext_resolver_node(state: AgentState) -> AgentState:
+        return await run_in_db_executor(context_resolver_node, state)
+
+    async def aguardrails_node(state: AgentState) -> AgentState:
+        return await run_in_db_executor(guardrails_node, state)
+
     # ---- Node: sql_agent ----
+    # Expert memory first, then the deterministic templates, then the LLM.
+    # With SPECULATIVE_SQL=on the LLM starts before the memory lookup (unless a
+    # template already matched). On a memory hit it keeps running under
+    # speculative_sql_key until execute_node either cancels it (memory SQL
+    # worked) or uses it as the fallback.
+    def _generate_sql(state: AgentState) -> str:
+        return sql_agent.generate_sql(state["question"], state["schema_text"])
+
+    def _agenerate_sql(state: AgentState) -> Any:
+        return acall_agent(sql_agent, "generate_sql", question=state["question"], schema_text=state["schema_text"])
+
     def sql_node(state: AgentState) -> AgentState:
-        remembered_sql = fetch_similar_correction(state["db_path"], state["question"])
+        template_sql = _template_sql(state)
+        speculate = not template_sql and speculative_sql.speculative_enabled()
+        key = speculative_sql.start(lambda: _generate_sql(state)) if speculate else ""
+        try:
+            remembered_sql = fetch_similar_correction(state["db_path"], state["question"])
+        except BaseException:
+            speculative_sql.cancel(key)
+            raise
         if remembered_sql:
-            log_event(
-                logger,
-                logging.INFO,
-                "graph.sql_reused_from_memory",
-                route=state.get("route"),
-                sql=remembered_sql,
-            )
+            return _remembered_sql_update(state, remembered_sql, key)
+        if template_sql:
+            return _template_sql_update(state, template_sql)
+        sql = speculative_sql.claim(key) if key else _generate_sql(state)
+        return _generated_sql_update(state, sql)
+
+    async def asql_node(state: AgentState) -> AgentState:
+        template_sql = await run_in_db_executor(_template_sql, state)
+        speculate = not template_sql and speculative_sql.speculative_enabled()
+        key = speculative_sql.astart(_agenerate_sql(state)) if speculate else ""
+        try:
+            remembered_sql = await run_in_db_executor(fetch_similar_correction, state["db_path"], state["question"])
+        except BaseException:
+            speculative_sql.cancel(key)
+            raise
+        if remembered_sql:
+            return _remembered_sql_update(state, remembered_sql, key)
+        if template_sql:
+            return _template_sql_update(state, template_sql)
+        sql = await speculative_sql.aclaim(key) if key else await _agenerate_sql(state)
+        return _generated_sql_update(state, sql)
+
+    def _memory_fallback_sql(state: AgentState) -> str:
+        sql = speculative_sql.claim(state.get("speculative_sql_key"))
+        if sql is None:
+            return _generate_sql(state)
+        _log_speculation_claimed()
+        return sql
+
+    async def _amemory_fallback_sql(state: AgentState) -> str:
+        sql = await speculative_sql.aclaim(state.get("speculative_sql_key"))
+        if sql is None:
+            return await _agenerate_sql(state)
+        _log_speculation_claimed()
+        return sql
+
+    # ---- Node: execute_sql ----
+    def execute_node(state: AgentState) -> AgentState:
+        sql = state.get("sql", "")
+        attempts = list(state.get("attempts", []))
+
+        ok, reason = validate_sql(sql)
+        if not ok:
+            _record_sql_failure(attempts, "validation", sql, reason)
+            if _needs_memory_fallback(state):
+                fallback_sql = _memory_fallback_sql(state)
+                return _memory_fallback_update(state, attempts, sql, reason, fallback_sql)
             return {
-                "sql": remembered_sql,
-                "sql_source": "expert_memory",
-                "reused_correction": True,
-                "memory_fallback_attempted": False,
+                "error": "SQL validation failed: {}".format(reason),
+                "attempts": attempts,
                 "needs_execute_retry": False,
-                "error": "",
-                "attempts": state.get("attempts", []),
             }
 
-        sql = sql_agent.generate_sql(state["question"], state["schema_text"])
-        log_event(
-            logger,
-            logging.INFO,
-            "graph.sql_generated",
-            route=state.get("route"),
-            sql=sql,
-        )
-        return {
-            "sql": sql,
-            "sql_source": "llm",
-            "reused_correction": False,
-            "memory_fallback_attempted": False,
-            "needs_execute_retry": False,
-            "error": "",
-            "attempts": state.get("attempts", []),
-        }
+        res = execute_sql(state["db_path"], sql)
+        if not res.get("ok"):
+            err = res.get("error", "Unknown SQL execution error.")
+            _record_sql_failure(attempts, "execution", sql, err)
+            if _needs_memory_fallback(state):
+                fallback_sql = _memory_fallback_sql(state)
+                return _memory_fallback_update(state, attempts, sql, err, fallback_sql)
+            return {"error": err, "attempts": attempts, "needs_execute_retry": False}
 
-    # ---- Node: execute_sql ----
-    def execute_node(state: AgentState) -> AgentState:
+        _end_speculation(state)
+        return _executed_update(attempts, sql, res)
+
+    async def aexecute_node(state: AgentState) -> AgentState:
         sql = state.get("sql", "")
         attempts = list(state.get("attempts", []))
 
         ok, reason = validate_sql(sql)
         if not ok:
-            attempts.append({"stage": "validation", "sql": sql, "error": reason})
-            log_event(
-                logger,
-                logging.WARNING,
-                "graph.sql_validation_failed",
-                sql=sql,
-                error=reason,
-            )
-            if state.get("sql_source") == "expert_memory" and not state.get("memory_fallback_attempted"):
-                fallback_sql = sql_agent.generate_sql(state["question"], state["schema_text"])
-                log_event(
-                    logger,
-                    logging.INFO,
-                    "graph.sql_memory_fallback_to_llm",
-                    failed_memory_sql=sql,
-                    error=reason,
-                    replacement_sql=fallback_sql,
-                )
-                return {
-                    "sql": fallback_sql,
-                    "sql_source": "llm",
-                    "memory_fallback_attempted": True,
-                    "needs_execute_retry": True,
-                    "error": "",
-                    "attempts": attempts,
-                }
+            _record_sql_failure(attempts, "validation", sql, reason)
+            if _needs_memory_fallback(state):
+                fallback_sql = await _amemory_fallback_sql(state)
+                return _memory_fallback_update(state, attempts, sql, reason, fallback_sql)
             return {
                 "error": "SQL validation failed: {}".format(reason),
                 "attempts": attempts,
                 "needs_execute_retry": False,
             }
 
-        res = execute_sql(state["db_path"], sql)
+        res = await run_in_db_executor(execute_sql, state["db_path"], sql)
         if not res.get("ok"):
             err = res.get("error", "Unknown SQL execution error.")
-            attempts.append({"stage": "execution", "sql": sql, "error": err})
-            log_event(
-                logger,
-                logging.WARNING,
-                "graph.sql_execution_failed",
-                sql=sql,
-                error=err,
-            )
-            if state.get("sql_source") == "expert_memory" and not state.get("memory_fallback_attempted"):
-                fallback_sql = sql_agent.generate_sql(state["question"], state["schema_text"])
-                log_event(
-                    logger,
-                    logging.INFO,
-                    "graph.sql_memory_fallback_to_llm",
-                    failed_memory_sql=sql,
-                    error=err,
-                    replacement_sql=fallback_sql,
-                )
-                return {
-                    "sql": fallback_sql,
-                    "sql_source": "llm",
-                    "memory_fallback_attempted": True,
-                    "needs_execute_retry": True,
-                    "error": "",
-                    "attempts": attempts,
-                }
+            _record_sql_failure(attempts, "execution", sql, err)
+            if _needs_memory_fallback(state):
+                fallback_sql = await _amemory_fallback_sql(state)
+                return _memory_fallback_update(state, attempts, sql, err, fallback_sql)
             return {"error": err, "attempts": attempts, "needs_execute_retry": False}
 
-        attempts.append({"stage": "execution", "sql": sql, "error": ""})
-        log_event(
-            logger,
-            logging.INFO,
-            "graph.sql_executed",
-            sql=sql,
-            row_count=len(res.get("rows", [])),
-        )
-        return {
-            "error": "",
-            "attempts": attempts,
-            "columns": res.get("columns", []),
-            "rows": res.get("rows", []),
-            "needs_execute_retry": False,
-        }
+        _end_speculation(state)
+        return _executed_update(attempts, sql, res)
 
     # ---- Node: error_agent ----
     def error_node(state: AgentState) -> AgentState:
-        attempts = list(state.get("attempts", []))
         sql = error_agent.repair_sql(
             question=state["question"],
             schema_text=state["schema_text"],
             failed_sql=state.get("sql", ""),
             error_message=state.get("error", ""),
         )
-        attempts.append({"stage": "repair", "sql": sql, "error": ""})
-        log_event(
-            logger,
-            logging.INFO,
-            "graph.sql_repaired",
-            sql=sql,
-            repair_count=sum(1 for a in attempts if a.get("stage") == "repair"),
+        return _repaired_sql_update(state, sql)
+
+    async def aerror_node(state: AgentState) -> AgentState:
+        sql = await acall_agent(
+            error_agent,
+            "repair_sql",
+            question=state["question"],
+            schema_text=state["schema_text"],
+            failed_sql=state.get("sql", ""),
+            error_message=state.get("error", ""),
         )
-        return {"sql": sql, "attempts": attempts, "error": ""}
+        return _repaired_sql_update(state, sql)
 
     # ---- Node: analysis_agent ----
     def analysis_node(state: AgentState) -> AgentState:
-        cols = state.get("columns", [])
-        rows = state.get("rows", [])
-        formatted = format_response_dict(cols, rows)
-        normalized_request = dict(state.get("normalized_request") or {})
-        result_object = build_result_object(
-            cols,
-            rows,
-            sql=state.get("sql", ""),
-            question=state.get("question", ""),
-            summary_text=formatted["text"],
-            context_filters=state.get("filters", {}),
-            current_grouping=state.get("dimensions", []),
-            time_reference=state.get("time_range", {}),
-            entity_focus=state.get("metric", ""),
-        )
+        formatted, normalized_request, result_object = _prepare_analysis(state)
+        _start_chart_precompute(state, result_object, viz_agent)
         answer_text = compose_data_answer(
-            question=state.get("question", ""),
-            sql=state.get("sql", ""),
-            columns=cols,
-            rows=rows,
-            fallback_text=formatted["text"],
+            **_analysis_answer_kwargs(state, formatted),
             analysis_agent=analysis_agent,
         )
-        change_summary = normalized_request.get("change_summary", "")
-        if change_summary:
-            answer_text = "{} {}".format(change_summary, answer_text).strip()
-        if not rows and state.get("filters"):
-            answer_text = "{} The result is empty for {}.".format(
-                change_summary or "I applied your request.",
-                state.get("filters", {}),
-            ).strip()
-        if result_object.get("chart_ready"):
-            answer_text = with_plot_suggestion(answer_text)
-        conversation_state = build_conversation_state(
-            question=state.get("question", ""),
-            route="DATA",
-            sql=state.get("sql", ""),
-            result_object=result_object,
-            metric=state.get("metric", ""),
-            dimensions=state.get("dimensions", []),
-            time_range=state.get("time_range", {}),
-            filters=state.get("filters", {}),
-            sort_by=state.get("sort_by", ""),
-            sort_direction=state.get("sort_direction", ""),
-            aggregation_intent=state.get("aggregation_intent", ""),
-            last_user_intent=state.get("resolved_intent") or state.get("parsed_intent") or "data_query",
-            prior_state=state.get("prior_conversation_state", {}),
-            normalized_request=normalized_request,
-            answer_text=answer_text,
-            last_filter_field=normalized_request.get("last_filter_field", ""),
-        )
-        log_event(
-            logger,
-            logging.INFO,
-            "graph.analysis_completed",
-            row_count=len(rows),
-            retry_count=max(0, len(state.get("attempts", [])) - 1),
-        )
+        return _finish_analysis(state, formatted, normalized_request, result_object, answer_text)
 
-        return {
-            "answer_text": answer_text,
-            "answer_table": formatted["table"],
-            "preview_rows": formatted["preview_rows"],
-            "preview_row_count": formatted["preview_row_count"],
-            "total_rows": formatted["total_rows"],
-            "retry_count": max(0, len(state.get("attempts", [])) - 1),
-            "result_object": result_object,
-            "conversation_state": conversation_state,
-            "normalized_request": normalized_request,
-        }
+    async def aanalysis_node(state: AgentState) -> AgentState:
+        formatted, normalized_request, result_object = _prepare_analysis(state)
+        _start_chart_precompute(state, result_object, viz_agent)
+        answer_text = await acompose_data_answer(
+            **_analysis_answer_kwargs(state, formatted),
+            analysis_agent=analysis_agent,
+        )
+        return _finish_analysis(state, formatted, normalized_request, result_object, answer_text)
 
     # ---- Node: viz_agent ----
     def viz_node(state: AgentState) -> AgentState:
-        cols = state.get("columns", [])
-        rows = state.get("rows", [])
-        result_object = dict(
-            state.get("result_object")
-            or build_result_object(
-                cols,
-                rows,
-                sql=state.get("sql", ""),
-                question=state.get("question", ""),
-                context_filters=(state.get("conversation_state") or {}).get("current_filters", {}),
-                current_grouping=(state.get("conversation_state") or {}).get("current_grouping", []),
-                time_reference=(state.get("conversation_state") or {}).get("current_time_reference", {}),
-                entity_focus=(state.get("conversation_state") or {}).get("current_entity_focus", ""),
-            )
-        )
-        conversation_state = dict(state.get("conversation_state") or {})
-        normalized_request = dict(state.get("normalized_request") or {})
-        if not result_object.get("chart_ready"):
-            return {
-                "route": "VIZ_UNSUPPORTED",
-                "answer_text": build_visualization_guidance(state.get("question", ""), cols, rows),
-                "viz": None,
-                "columns": None,
-                "rows": None,
-                "sql": None,
-                "result_object": result_object,
-                "conversation_state": conversation_state,
-                "normalized_request": normalized_request,
-            }
-        if not supports_visualization_request(state.get("question", ""), cols, rows):
-            return {
-                "route": "VIZ_UNSUPPORTED",
-                "answer_text": build_visualization_guidance(state.get("question", ""), cols, rows),
-                "viz": None,
-                "columns": None,
-                "rows": None,
-                "sql": None,
-                "result_object": result_object,
-                "conversation_state": conversation_state,
-                "normalized_request": normalized_request,
-            }
-        fallback = infer_plotly(state.get("question", ""), cols, rows)
-        viz = viz_agent.generate(
-            question=state.get("question", ""),
-            columns=cols,
-            rows=rows,
-            fallback_viz=fallback,
-        )
-        log_event(
-            logger,
-            logging.INFO,
-            "graph.viz_generated",
-            has_viz=bool(viz),
-            row_count=len(rows),
-        )
-        if not viz:
-            return {
-                "route": "VIZ_UNSUPPORTED",
-                "answer_text": build_visualization_guidance(state.get("question", ""), cols, rows),
-                "viz": None,
-                "columns": None,
-                "rows": None,
-                "sql": None,
-                "result_object": result_object,
-                "conversation_state": conversation_state,
-                "normalized_request": normalized_request,
-            }
-        chart_label = requested_chart_type(state.get("question", ""))
-        if chart_label == "chart":
-            chart_label = result_object.get("suggested_chart") or "chart"
-        answer_text = "I turned the previous result into a {}.".format(chart_label)
-        conversation_state = build_conversation_state(
-            question=state.get("question", ""),
-            route="VIZ_FOLLOWUP",
-            sql=state.get("sql", ""),
-            result_object=result_object,
-            metric=conversation_state.get("metric", ""),
-            dimensions=conversation_state.get("current_grouping", []),
-            time_range=conversation_state.get("current_time_reference", {}),
-            filters=conversation_state.get("current_filters", {}),
-            sort_by=conversation_state.get("sort_by", ""),
-            sort_direction=conversation_state.get("sort_direction", ""),
-            aggregation_intent=conversation_state.get("aggregation_intent", ""),
-            last_user_intent="visualization_request",
-            prior_state=conversation_state,
-            normalized_request=normalized_request,
-            answer_text=answer_text,
-            last_filter_field=conversation_state.get("last_filter_field", ""),
-        )
-        return {
-            "viz": viz,
-            "answer_text": answer_text,
-            "result_object": result_object,
-            "conversation_state": conversation_state,
-            "normalized_request": normalized_request,
-        }
+        result_object, conversation_state, normalized_request = _prepare_viz(state)
+        if not _viz_supported(state, result_object):
+            return _viz_unsupported_update(state, result_object, conversation_state, normalized_request)
+        hit, viz = lookup_chart(*_requested_chart(state, result_object))
+        _log_precomputed_chart(state, result_object, hit)
+        if not hit:
+            viz = viz_agent.generate(**_viz_agent_kwargs(state))
+        return _finish_viz(state, viz, result_object, conversation_state, normalized_request)
+
+    async def aviz_node(state: AgentState) -> AgentState:
+        result_object, conversation_state, normalized_request = _prepare_viz(state)
+        if not _viz_supported(state, result_object):
+            return _viz_unsupported_update(state, result_object, conversation_state, normalized_request)
+        hit, viz = await alookup_chart(*_requested_chart(state, result_object))
+        _log_precomputed_chart(state, result_object, hit)
+        if not hit:
+            viz = await acall_agent(viz_agent, "generate", **_viz_agent_kwargs(state))
+        return _finish_viz(state, viz, result_object, conversation_state, normalized_request)
 
     # ---- Routing functions ----
     def check_context(state: AgentState) -> str:
@@ -773,13 +1097,18 @@ def build_text2sql_graph(max_sql_repair_attempts: int = 3):
         return "end"
 
     # ---- Wire nodes ----
-    workflow.add_node("context_resolver", context_resolver_node)
-    workflow.add_node("guardrails_agent", guardrails_node)
-    workflow.add_node("sql_agent", sql_node)
-    workflow.add_node("execute_sql", execute_node)
-    workflow.add_node("error_agent", error_node)
-    workflow.add_node("analysis_agent", analysis_node)
-    workflow.add_node("viz_agent", viz_node)
+    # Each node carries a sync and an async implementation: invoke() runs the
+    # former, ainvoke() the latter.
+    def _node(name: str, func: Any, afunc: Any) -> RunnableLambda:
+        return RunnableLambda(traced(f"node.{name}")(func), afunc=traced(f"node.{name}")(afunc), name=name)
+
+    workflow.add_node("context_resolver", _node("context_resolver", context_resolver_node, acontext_resolver_node))
+    workflow.add_node("guardrails_agent", _node("guardrails_agent", guardrails_node, aguardrails_node))
+    workflow.add_node("sql_agent", _node("sql_agent", sql_node, asql_node))
+    workflow.add_node("execute_sql", _node("execute_sql", execute_node, aexecute_node))
+    workflow.add_node("error_agent", _node("error_agent", error_node, aerror_node))
+    workflow.add_node("analysis_agent", _node("analysis_agent", analysis_node, aanalysis_node))
+    workflow.add_node("viz_agent", _node("viz_agent", viz_node, aviz_node))
 
     # ---- Wire edges ----
     workflow.set_entry_point("context_resolver")
@@ -824,15 +1153,25 @@ def build_text2sql_graph(max_sql_repair_attempts: int = 3):
 
 _app_instance = None
 _memory_instance = None
+_app_fingerprint = None
 
 
 def get_graph_app():
-    """Return a compiled LangGraph app with MemorySaver for multi-turn memory."""
-    global _app_instance, _memory_instance
-    if _app_instance is None:
-        _memory_instance = MemorySaver()
+    """Return a compiled LangGraph app with a checkpointer for multi-turn memory.
+
+    Checkpoints go to the bounded SQLite store from build_checkpointer()
+    (CHECKPOINT_DB_PATH). The app is rebuilt (keeping the same memory) only
+    when the LLM settings change, so agents and their clients are shared
+    across requests.
+    """
+    global _app_instance, _memory_instance, _app_fingerprint
+    fingerprint = agent_settings_fingerprint()
+    if _app_instance is None or fingerprint != _app_fingerprint:
+        if _memory_instance is None:
+            _memory_instance = build_checkpointer()
         workflow = build_text2sql_graph()
         _app_instance = workflow.compile(checkpointer=_memory_instance)
+        _app_fingerprint = fingerprint
     return _app_instance
 
 
@@ -847,43 +1186,8 @@ def _get_prior_state(graph_app, config: dict) -> dict:
     return {}
 
 
-def invoke_graph_pipeline(
-    *,
-    db_path: str,
-    question: str,
-    thread_id: str,
-    graph_app=None,
-) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    """
-    Invoke the canonical LangGraph runtime used by the UI.
-
-    Returns a tuple of:
-    - result: final graph state/result payload
-    - prior: previous checkpoint state used as memory context
-    """
-    try:
-        graph_app = graph_app or get_graph_app()
-    except LLMConfigurationError as exc:
-        log_event(
-            logger,
-            logging.ERROR,
-            "graph.setup_failed",
-            thread_id=thread_id,
-            error=str(exc),
-        )
-        return {"route": "ERROR", "answer_text": str(exc)}, {}
-
-    config = {"configurable": {"thread_id": thread_id}}
-    prior = _get_prior_state(graph_app, config)
-    log_event(
-        logger,
-        logging.INFO,
-        "graph.invoke_started",
-        thread_id=thread_id,
-        question_preview=question[:120],
-        prior_route=prior.get("route", ""),
-    )
-
+def _build_input_state(*, db_path: str, question: str, prior: Dict[str, Any]) -> AgentState:
+    """Turn the previous checkpoint into the prior_* memory fields of a new turn."""
     prior_result_object = prior.get("result_object")
     if not prior_result_object and (prior.get("columns") or prior.get("preview_rows") or prior.get("rows")):
         prior_result_object = build_result_object(
@@ -914,7 +1218,7 @@ def invoke_graph_pipeline(
             last_user_intent=prior.get("resolved_intent") or prior.get("parsed_intent") or "",
         )
 
-    input_state = {
+    return {
         "question": question,
         "db_path": db_path,
         "route": "",
@@ -939,16 +1243,35 @@ def invoke_graph_pipeline(
         "prior_conversation_state": prior_conversation_state or {},
     }
 
-    error_message = ""
-    try:
-        result = graph_app.invoke(input_state, config=config)
-        if result is None:
-            error_message = PIPELINE_NONE_MESSAGE
-            result = {"route": "ERROR", "answer_text": PIPELINE_NONE_MESSAGE}
-    except Exception as e:
-        error_message = str(e)
-        result = {"route": "ERROR", "answer_text": pipeline_error_message(e)}
 
+def _setup_failed(thread_id: str, exc: LLMConfigurationError) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    log_event(
+        logger,
+        logging.ERROR,
+        "graph.setup_failed",
+        thread_id=thread_id,
+        error=str(exc),
+    )
+    return {"route": "ERROR", "answer_text": str(exc)}, {}
+
+
+def _log_invoke_started(thread_id: str, question: str, prior: Dict[str, Any]) -> None:
+    log_event(
+        logger,
+        logging.INFO,
+        "graph.invoke_started",
+        thread_id=thread_id,
+        question_preview=question[:120],
+        prior_route=prior.get("route", ""),
+    )
+
+
+def _log_invoke_finished(
+    thread_id: str,
+    prior: Dict[str, Any],
+    result: Dict[str, Any],
+    error_message: str,
+) -> None:
     if error_message:
         log_event(
             logger,
@@ -972,4 +1295,248 @@ def invoke_graph_pipeline(
             sql_source=result.get("sql_source", ""),
         )
 
+
+def invoke_graph_pipeline(
+    *,
+    db_path: str,
+    question: str,
+    thread_id: str,
+    graph_app=None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Invoke the canonical LangGraph runtime used by the UI.
+
+    Returns a tuple of:
+    - result: final graph state/result payload
+    - prior: previous checkpoint state used as memory context
+    """
+    try:
+        graph_app = graph_app or get_graph_app()
+    except LLMConfigurationError as exc:
+        return _setup_failed(thread_id, exc)
+
+    config = {"configurable": {"thread_id": thread_id}}
+    prior = _get_prior_state(graph_app, config)
+    _log_invoke_started(thread_id, question, prior)
+    input_state = _build_input_state(db_path=db_path, question=question, prior=prior)
+
+    error_message = ""
+    with span("turn", pipeline="graph", thread_id=thread_id) as turn:
+        try:
+            result = graph_app.invoke(input_state, config=config)
+            if result is None:
+                error_message = PIPELINE_NONE_MESSAGE
+                result = {"route": "ERROR", "answer_text": PIPELINE_NONE_MESSAGE}
+            else:
+                result = _with_result_rows(result)
+        except Exception as e:
+            error_message = str(e)
+            result = {"route": "ERROR", "answer_text": pipeline_error_message(e)}
+        turn.set(route=str(result.get("route", "")))
+
+    _log_invoke_finished(thread_id, prior, result, error_message)
+    return result, prior
+
+
+async def _aget_prior_state(graph_app, config: dict) -> dict:
+    """Async twin of _get_prior_state for checkpointers with async readers."""
+    try:
+        snapshot = await graph_app.aget_state(config)
+        if snapshot and snapshot.values:
+            return dict(snapshot.values)
+    except Exception:
+        pass
+    return {}
+
+
+async def ainvoke_graph_pipeline(
+    *,
+    db_path: str,
+    question: str,
+    thread_id: str,
+    graph_app=None,
+    timeout_s: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Async counterpart of invoke_graph_pipeline, for serving many conversations
+    from one event loop.
+
+    Agents are awaited through their chains' ainvoke and SQLite work runs on
+    the bounded pool in app.db.async_executor. When timeout_s elapses the run
+    is cancelled (including a query in flight) and an ERROR result is
+    returned; cancelling the calling task cancels the run the same way and
+    re-raises CancelledError.
+    """
+    try:
+        graph_app = graph_app or get_graph_app()
+    except LLMConfigurationError as exc:
+        return _setup_failed(thread_id, exc)
+
+    config = {"configurable": {"thread_id": thread_id}}
+    prior = await _aget_prior_state(graph_app, config)
+    _log_invoke_started(thread_id, question, prior)
+    input_state = _build_input_state(db_path=db_path, question=question, prior=prior)
+
+    error_message = ""
+    with span("turn", pipeline="graph_async", thread_id=thread_id) as turn:
+        try:
+            result = await asyncio.wait_for(graph_app.ainvoke(input_state, config=config), timeout=timeout_s)
+            if result is None:
+                error_message = PIPELINE_NONE_MESSAGE
+                result = {"route": "ERROR", "answer_text": PIPELINE_NONE_MESSAGE}
+            else:
+                result = _with_result_rows(result)
+        except asyncio.TimeoutError:
+            error_message = "timed out after {}s".format(timeout_s)
+            result = {"route": "ERROR", "answer_text": pipeline_timeout_message(timeout_s)}
+        except Exception as e:
+            error_message = str(e)
+            result = {"route": "ERROR", "answer_text": pipeline_error_message(e)}
+        turn.set(route=str(result.get("route", "")))
+
+    _log_invoke_finished(thread_id, prior, result, error_message)
     return result, prior
+
+
+# ---------------------------------------------------------------------------
+# Streaming  (used by streamlit_app.py)
+# ---------------------------------------------------------------------------
+# stream_graph_pipeline yields plain dict events while the graph runs:
+#   {"type": "progress", "stage": ..., ...}  after each node finishes
+#   {"type": "token", "text": ...}           answer tokens from analysis_agent
+#   {"type": "result", "result": ..., "prior": ...}  once, at the end
+# Tokens come from LangGraph's "messages" mode, which taps the LLM callbacks of
+# the normal chain.invoke/ainvoke calls, so the agents and the LLM cache are
+# unchanged: a cached completion arrives as a single token event.
+
+_STREAM_MODES = ["updates", "messages"]
+_ANSWER_NODES = {"analysis_agent"}
+
+
+def _progress_events(node: str, update: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    update = update or {}
+    if node == "context_resolver":
+        return [{"type": "progress", "stage": "context_resolved", "intent": update.get("resolved_intent", "")}]
+    if node == "guardrails_agent":
+        return [{"type": "progress", "stage": "guardrails_decided", "route": update.get("route", "")}]
+    if node == "sql_agent":
+        return [
+            {
+                "type": "progress",
+                "stage": "sql_ready",
+                "sql": update.get("sql", ""),
+                "sql_source": update.get("sql_source", ""),
+            }
+        ]
+    if node == "execute_sql":
+        if update.get("error") or "columns" not in update:
+            return [{"type": "progress", "stage": "sql_failed", "error": update.get("error", "")}]
+        return [
+            {
+                "type": "progress",
+                "stage": "rows_ready",
+                "columns": update.get("columns", []),
+                "rows": _resolve_rows(update.get("result_handle"), []),
+                "total_rows": update.get("total_rows", 0),
+            }
+        ]
+    if node == "error_agent":
+        return [{"type": "progress", "stage": "sql_repaired", "sql": update.get("sql", "")}]
+    if node == "analysis_agent":
+        return [{"type": "progress", "stage": "answer_ready", "answer_text": update.get("answer_text", "")}]
+    if node == "viz_agent":
+        return [{"type": "progress", "stage": "chart_ready", "has_viz": bool(update.get("viz"))}]
+    return []
+
+
+def _stream_events(mode: str, chunk: Any) -> List[Dict[str, Any]]:
+    if mode == "updates":
+        events: List[Dict[str, Any]] = []
+        for node, update in (chunk or {}).items():
+            events.extend(_progress_events(node, update))
+        return events
+    message, metadata = chunk
+    content = getattr(message, "content", "")
+    if metadata.get("langgraph_node") in _ANSWER_NODES and isinstance(content, str) and content:
+        return [{"type": "token", "text": content}]
+    return []
+
+
+def _streamed_result(values: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], str]:
+    if not values:
+        return {"route": "ERROR", "answer_text": PIPELINE_NONE_MESSAGE}, PIPELINE_NONE_MESSAGE
+    return _with_result_rows(dict(values)), ""
+
+
+def stream_graph_pipeline(
+    *,
+    db_path: str,
+    question: str,
+    thread_id: str,
+    graph_app=None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run one turn like invoke_graph_pipeline, yielding progress and answer-token
+    events as they happen. The last event is {"type": "result", ...} carrying
+    the same (result, prior) pair invoke_graph_pipeline returns.
+    """
+    try:
+        graph_app = graph_app or get_graph_app()
+    except LLMConfigurationError as exc:
+        result, prior = _setup_failed(thread_id, exc)
+        yield {"type": "result", "result": result, "prior": prior}
+        return
+
+    config = {"configurable": {"thread_id": thread_id}}
+    prior = _get_prior_state(graph_app, config)
+    _log_invoke_started(thread_id, question, prior)
+    input_state = _build_input_state(db_path=db_path, question=question, prior=prior)
+
+    with span("turn", pipeline="graph_stream", thread_id=thread_id) as turn:
+        try:
+            for mode, chunk in graph_app.stream(input_state, config=config, stream_mode=_STREAM_MODES):
+                yield from _stream_events(mode, chunk)
+            result, error_message = _streamed_result(graph_app.get_state(config).values)
+        except Exception as e:
+            error_message = str(e)
+            result = {"route": "ERROR", "answer_text": pipeline_error_message(e)}
+        turn.set(route=str(result.get("route", "")))
+
+    _log_invoke_finished(thread_id, prior, result, error_message)
+    yield {"type": "result", "result": result, "prior": prior}
+
+
+async def astream_graph_pipeline(
+    *,
+    db_path: str,
+    question: str,
+    thread_id: str,
+    graph_app=None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of stream_graph_pipeline built on astream and the async nodes."""
+    try:
+        graph_app = graph_app or get_graph_app()
+    except LLMConfigurationError as exc:
+        result, prior = _setup_failed(thread_id, exc)
+        yield {"type": "result", "result": result, "prior": prior}
+        return
+
+    config = {"configurable": {"thread_id": thread_id}}
+    prior = await _aget_prior_state(graph_app, config)
+    _log_invoke_started(thread_id, question, prior)
+    input_state = _build_input_state(db_path=db_path, question=question, prior=prior)
+
+    with span("turn", pipeline="graph_astream", thread_id=thread_id) as turn:
+        try:
+            async for mode, chunk in graph_app.astream(input_state, config=config, stream_mode=_STREAM_MODES):
+                for event in _stream_events(mode, chunk):
+                    yield event
+            snapshot = await graph_app.aget_state(config)
+            result, error_message = _streamed_result(snapshot.values)
+        except Exception as e:
+            error_message = str(e)
+            result = {"route": "ERROR", "answer_text": pipeline_error_message(e)}
+        turn.set(route=str(result.get("route", "")))
+
+    _log_invoke_finished(thread_id, prior, result, error_message)
+    yield {"type": "result", "result": result, "prior": prior}
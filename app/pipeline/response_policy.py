@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any, Sequence
 
+from app.agents.shared.aio import acall_agent
 from app.formatters.viz_plotly import describe_result_set
 from app.messages import (
     GREETING_RESPONSES,
@@ -77,4 +78,26 @@ def compose_data_answer(
         columns=columns,
         rows=rows,
         fallback_text=fallback_text,
-    )
\ No newline at end of file
+    )
+
+
+async def acompose_data_answer(
+    *,
+    question: str,
+    sql: str,
+    columns: Sequence[str],
+    rows: Any,
+    fallback_text: str,
+    analysis_agent: Any,
+) -> str:
+    if should_use_deterministic_data_summary(columns, rows):
+        return fallback_text
+    return await acall_agent(
+        analysis_agent,
+        "summarize",
+        question=question,
+        sql=sql,
+        columns=columns,
+        rows=rows,
+        fallback_text=fallback_text,
+    )
@@ -0,0 +1,112 @@
+"""
+Speculative LLM SQL generation that races expert memory.
+
+Connection in flow:
+- Upstream: sql_node starts SQLAgent generation before it looks up
+  corrections_log, so both run at the same time.
+- This file: keeps the in-flight generation under a random key that can be
+  stored in the graph state (futures themselves are not checkpointable).
+- Downstream: execute_node cancels the generation once memory SQL has run,
+  or claims its result when memory SQL fails. That fallback then costs no
+  extra serial LLM call.
+
+Opt-in with SPECULATIVE_SQL=on: every memory hit still spends (part of) one
+LLM call. On the async path, cancelling aborts the provider request; a
+thread that is already running on the sync path is left to finish, and its
+result is dropped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional, Union
+
+_WORKERS = 4
+_MAX_PENDING = 64
+
+Pending = Union[Future, "asyncio.Task[str]"]
+
+_PENDING: "OrderedDict[str, Pending]" = OrderedDict()
+_PENDING_LOCK = threading.Lock()
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def speculative_enabled() -> bool:
+    return os.getenv("SPECULATIVE_SQL", "off").strip().lower() in {"on", "1", "true", "yes"}
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="speculative-sql")
+    return _EXECUTOR
+
+
+def _cancel(pending: Pending) -> None:
+    if isinstance(pending, Future):
+        pending.cancel()
+    else:
+        # Tasks may only be cancelled from their own loop's thread.
+        loop = pending.get_loop()
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(pending.cancel)
+
+
+def _register(pending: Pending) -> str:
+    key = uuid.uuid4().hex
+    with _PENDING_LOCK:
+        _PENDING[key] = pending
+        while len(_PENDING) > _MAX_PENDING:
+            # Runs abandoned by a failed turn; nobody will claim them.
+            _cancel(_PENDING.popitem(last=False)[1])
+    return key
+
+
+def _pop(key: Optional[str]) -> Optional[Pending]:
+    if not key:
+        return None
+    with _PENDING_LOCK:
+        return _PENDING.pop(key, None)
+
+
+def start(generate: Callable[[], str]) -> str:
+    """Run generate() on a worker thread (keeping tracing context) and return its key."""
+    context = contextvars.copy_context()
+    return _register(_executor().submit(context.run, generate))
+
+
+def astart(generate: Awaitable[str]) -> str:
+    """Schedule the coroutine as a task on the running loop and return its key."""
+    return _register(asyncio.ensure_future(generate))
+
+
+def claim(key: Optional[str]) -> Optional[str]:
+    """Wait for the generation behind key and return its SQL (None if unknown)."""
+    pending = _pop(key)
+    if pending is None:
+        return None
+    return pending.result()
+
+
+async def aclaim(key: Optional[str]) -> Optional[str]:
+    pending = _pop(key)
+    if pending is None:
+        return None
+    if isinstance(pending, Future):
+        return await asyncio.wrap_future(pending)
+    return await pending
+
+
+def cancel(key: Optional[str]) -> bool:
+    """Drop the generation behind key; True if it was still pending."""
+    pending = _pop(key)
+    if pending is None:
+        return False
+    _cancel(pending)
+    return True
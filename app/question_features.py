@@ -0,0 +1,124 @@
+"""Shared lexical front end for the deterministic (pre-LLM) question checks.
+
+The gatekeeper, the router, turn-intent classification, follow-up detection
+and query-memory extraction all look at the same question. Instead of each
+running its own list of regexes, the question is tokenized once by a single
+named-group scanner and turned into a QuestionFeatures record, cached per
+question text. Keyword rules are then set lookups against ``terms``: every
+word plus every whitespace-separated run of up to _MAX_PHRASE_WORDS words.
+A rule costs a hash lookup per term, so adding vocabulary does not add a
+pass over the text.
+
+Rules that extract a value (a capitalised place name, a grouping column) keep
+their own regex, gated by a keyword check on the record.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+
+_MAX_PHRASE_WORDS = 5
+_CACHE_SIZE = 1024
+
+# SQL comment / statement markers; any of them sets has_sql_marker.
+SQL_MARKERS = ("--", "/*", "*/", ";")
+
+# One pass over the text: word tokens, and SQL markers.
+_TOKEN_RE = re.compile(r"(?P<word>\w+)|(?P<marker>{})".format("|".join(map(re.escape, SQL_MARKERS))))
+
+
+def vocabulary(*terms: str) -> FrozenSet[str]:
+    """Lower-cased word/phrase set for QuestionFeatures.has().
+
+    Phrases are words separated by single spaces; they match any whitespace
+    between the words of the question.
+    """
+    normalized = frozenset(" ".join(term.lower().split()) for term in terms)
+    too_long = [term for term in normalized if len(term.split()) > _MAX_PHRASE_WORDS]
+    if too_long:
+        raise ValueError(f"Phrases longer than {_MAX_PHRASE_WORDS} words: {sorted(too_long)}")
+    return normalized
+
+
+@dataclass(frozen=True)
+class QuestionFeatures:
+    text: str
+    words: Tuple[str, ...]
+    terms: FrozenSet[str]
+    # Terms that start at the first character of the question.
+    leading_terms: FrozenSet[str]
+    # Text between the first and second word ("" when there is no second word).
+    leading_separator: str
+    years: Tuple[str, ...]
+    top_k: Optional[int]
+    has_sql_marker: bool
+
+    @property
+    def leading_word(self) -> str:
+        return self.words[0] if self.leading_terms else ""
+
+    def has(self, vocab: FrozenSet[str]) -> bool:
+        """True when any word or phrase of vocab occurs in the question."""
+        return not self.terms.isdisjoint(vocab)
+
+    def starts_with(self, vocab: FrozenSet[str]) -> bool:
+        return not self.leading_terms.isdisjoint(vocab)
+
+
+def _is_year(word: str) -> bool:
+    return len(word) == 4 and word.startswith("20") and word[2:].isdecimal()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _features(text: str) -> QuestionFeatures:
+    words: list[str] = []
+    spans: list[tuple[int, int]] = []
+    has_marker = False
+    for match in _TOKEN_RE.finditer(text):
+        if match.lastgroup == "marker":
+            has_marker = True
+            continue
+        words.append(match.group().lower())
+        spans.append(match.span())
+
+    # joined[i]: only whitespace separates word i from word i - 1, so phrases
+    # may run across it ("by segment" but not "by, segment").
+    joined = [i > 0 and text[spans[i - 1][1]:spans[i][0]].isspace() for i in range(len(words))]
+    terms: set[str] = set()
+    leading: set[str] = set()
+    for start in range(len(words)):
+        phrase = words[start]
+        found = [phrase]
+        for end in range(start + 1, min(start + _MAX_PHRASE_WORDS, len(words))):
+            if not joined[end]:
+                break
+            phrase = f"{phrase} {words[end]}"
+            found.append(phrase)
+        terms.update(found)
+        if start == 0 and spans[0][0] == 0:
+            leading.update(found)
+
+    top_k = None
+    for i in range(len(words) - 1):
+        if words[i] == "top" and joined[i + 1] and words[i + 1].isdecimal():
+            top_k = int(words[i + 1])
+            break
+
+    return QuestionFeatures(
+        text=text,
+        words=tuple(words),
+        terms=frozenset(terms),
+        leading_terms=frozenset(leading),
+        leading_separator=text[spans[0][1]:spans[1][0]] if len(spans) > 1 else "",
+        years=tuple(word for word in words if _is_year(word)),
+        top_k=top_k,
+        has_sql_marker=has_marker,
+    )
+
+
+def question_features(question: str) -> QuestionFeatures:
+    """Feature record for question (surrounding whitespace ignored), cached per text."""
+    return _features((question or "").strip())
@@ -0,0 +1,363 @@
+"""Spans around graph nodes, LLM chain calls and SQL queries.
+
+Tracing is off unless one of its exporters is configured:
+
+- ``TRACE_EXPORT_PATH``: every finished turn is appended to this file as one
+  OTLP/JSON ``ExportTraceServiceRequest`` per line (the layout of the
+  OpenTelemetry collector's file exporter), so the file can be replayed into
+  any OTLP backend or read with jq.
+- ``METRICS_PORT``: span metrics are aggregated in-process and served as
+  Prometheus text on ``http://127.0.0.1:<port>/metrics`` once an entry point
+  calls start_metrics_server().
+
+A span records wall time, CPU time of the running thread and whatever
+attributes the instrumented code sets: ``rows``, ``prompt_tokens``,
+``completion_tokens``, ``cache_hit``... The current span lives in a context
+variable, so spans opened inside a graph node, an awaited chain or a
+``run_in_db_executor`` call become its children. CPU time is per thread: for
+async spans it also counts other tasks that ran on the loop while awaiting.
+
+When tracing is off, span() yields a shared no-op span and costs one
+environment lookup.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_SERVICE_NAME = "statapp"
+_DURATION_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Numeric span attributes that are summed into Prometheus counters.
+_COUNTED_ATTRIBUTES = ("rows", "prompt_tokens", "completion_tokens")
+
+
+def _export_path() -> str:
+    return os.getenv("TRACE_EXPORT_PATH", "").strip()
+
+
+def _metrics_port() -> Optional[int]:
+    raw = os.getenv("METRICS_PORT", "").strip()
+    return int(raw) if raw.isdigit() else None
+
+
+def tracing_enabled() -> bool:
+    return bool(_export_path()) or _metrics_port() is not None
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_unix_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    error: str = ""
+    # Finished spans of the whole trace, shared by every span in it.
+    trace: List["Span"] = field(default_factory=list, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+
+class _NoopSpan:
+    trace_id = ""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: float) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_CURRENT: ContextVar[Optional[Span]] = ContextVar("statapp_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _CURRENT.get()
+
+
+def current_trace_id() -> str:
+    span = _CURRENT.get()
+    return span.trace_id if span is not None else ""
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the current span, if any."""
+    span = _CURRENT.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time the block as a child of the current span (a new trace when there is none)."""
+    if not tracing_enabled():
+        yield _NOOP_SPAN
+        return
+    parent = _CURRENT.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        start_unix_ns=time.time_ns(),
+        attributes=dict(attributes),
+        trace=parent.trace if parent else [],
+    )
+    # Restore by value rather than with a reset token: streaming generators
+    # may close this span from another context.
+    _CURRENT.set(current)
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current.wall_s = time.perf_counter() - started
+        current.cpu_s = time.thread_time() - cpu_started
+        _CURRENT.set(parent)
+        _finish(current, is_root=parent is None)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator form of span() for plain and async functions."""
+
+    def _decorate(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def _async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return _async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return func(*args, **kwargs)
+
+        return _wrapper  # type: ignore[return-value]
+
+    return _decorate
+
+
+# ---------------------------------------------------------------------------
+# Exporters
+# ---------------------------------------------------------------------------
+
+_EXPORT_LOCK = threading.Lock()
+
+
+def _finish(finished: Span, *, is_root: bool) -> None:
+    finished.trace.append(finished)
+    if _metrics_port() is not None:
+        METRICS.observe(finished)
+    if is_root:
+        path = _export_path()
+        if path:
+            export_otlp_json(finished.trace, path)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(item: Span) -> Dict[str, Any]:
+    attributes = dict(item.attributes, wall_s=round(item.wall_s, 6), cpu_s=round(item.cpu_s, 6))
+    payload: Dict[str, Any] = {
+        "traceId": item.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": 1,
+        "startTimeUnixNano": str(item.start_unix_ns),
+        "endTimeUnixNano": str(item.start_unix_ns + int(item.wall_s * 1e9)),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in sorted(attributes.items())],
+        "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+    }
+    if item.parent_id:
+        payload["parentSpanId"] = item.parent_id
+    return payload
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """One trace as an OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": _SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [_otlp_span(item) for item in spans]}],
+            }
+        ]
+    }
+
+
+def export_otlp_json(spans: List[Span], path: str) -> None:
+    line = json.dumps(otlp_payload(spans), ensure_ascii=False, separators=(",", ":"))
+    with _EXPORT_LOCK:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+class SpanMetrics:
+    """Per-span-name duration histograms and attribute counters, rendered as Prometheus text."""
+
+    def __init__(self, buckets: Tuple[float, ...] = _DURATION_BUCKETS_S):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._durations: Dict[str, List[float]] = {}
+        self._cpu: Dict[str, float] = {}
+        self._errors: Dict[str, int] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._cache: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, item: Span) -> None:
+        with self._lock:
+            # [bucket counts..., +Inf count, sum]
+            stats = self._durations.setdefault(item.name, [0.0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if item.wall_s <= bound:
+                    stats[index] += 1
+            stats[-2] += 1
+            stats[-1] += item.wall_s
+            self._cpu[item.name] = self._cpu.get(item.name, 0.0) + item.cpu_s
+            if item.error:
+                self._errors[item.name] = self._errors.get(item.name, 0) + 1
+            for key in _COUNTED_ATTRIBUTES:
+                value = item.attributes.get(key)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._counters[(item.name, key)] = self._counters.get((item.name, key), 0.0) + value
+            hit = item.attributes.get("cache_hit")
+            if isinstance(hit, bool):
+                outcome = (item.name, "hit" if hit else "miss")
+                self._cache[outcome] = self._cache.get(outcome, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+            self._cpu.clear()
+            self._errors.clear()
+            self._counters.clear()
+            self._cache.clear()
+
+    def render(self) -> str:
+        lines = [
+            "# HELP statapp_span_duration_seconds Wall time of traced spans.",
+            "# TYPE statapp_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, stats in sorted(self._durations.items()):
+                for bound, count in zip(self.buckets, stats):
+                    lines.append(f'statapp_span_duration_seconds_bucket{{span="{name}",le="{bound:g}"}} {count:g}')
+                lines.append(f'statapp_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {stats[-2]:g}')
+                lines.append(f'statapp_span_duration_seconds_sum{{span="{name}"}} {stats[-1]:.6f}')
+                lines.append(f'statapp_span_duration_seconds_count{{span="{name}"}} {stats[-2]:g}')
+            lines += [
+                "# HELP statapp_span_cpu_seconds_total Thread CPU time spent in traced spans.",
+                "# TYPE statapp_span_cpu_seconds_total counter",
+            ]
+            lines += [f'statapp_span_cpu_seconds_total{{span="{n}"}} {v:.6f}' for n, v in sorted(self._cpu.items())]
+            lines += [
+                "# HELP statapp_span_errors_total Spans that ended with an exception.",
+                "# TYPE statapp_span_errors_total counter",
+            ]
+            lines += [f'statapp_span_errors_total{{span="{n}"}} {v}' for n, v in sorted(self._errors.items())]
+            for key in _COUNTED_ATTRIBUTES:
+                metric = f"statapp_{key}_total"
+                lines += [f"# HELP {metric} Sum of the {key} span attribute.", f"# TYPE {metric} counter"]
+                lines += [
+                    f'{metric}{{span="{n}"}} {v:g}' for (n, k), v in sorted(self._counters.items()) if k == key
+                ]
+            lines += [
+                "# HELP statapp_cache_lookups_total Cache lookups recorded on spans, by outcome.",
+                "# TYPE statapp_cache_lookups_total counter",
+            ]
+            lines += [
+                f'statapp_cache_lookups_total{{span="{n}",outcome="{o}"}} {v}'
+                for (n, o), v in sorted(self._cache.items())
+            ]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = SpanMetrics()
+
+
+def _metrics_handler() -> type:
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = METRICS.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return _MetricsHandler
+
+
+_SERVER: Optional["ThreadingHTTPServer"] = None
+_SERVER_LOCK = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional["ThreadingHTTPServer"]:
+    """Serve /metrics on 127.0.0.1 from a daemon thread (once per process); None when METRICS_PORT is unset."""
+    global _SERVER
+    port = port if port is not None else _metrics_port()
+    if port is None:
+        return None
+    with _SERVER_LOCK:
+        if _SERVER is None:
+            from http.server import ThreadingHTTPServer
+
+            _SERVER = ThreadingHTTPServer(("127.0.0.1", port), _metrics_handler())
+            threading.Thread(target=_SERVER.serve_forever, name="metrics", daemon=True).start()
+        return _SERVER
+
+
+def stop_metrics_server() -> None:
+    global _SERVER
+    with _SERVER_LOCK:
+        if _SERVER is not None:
+            _SERVER.shutdown()
+            _SERVER.server_close()
+            _SERVER = None
@@ -0,0 +1 @@
+"""Offline latency/throughput benchmarks for the chatbot pipelines (see benchmarks/run.py)."""
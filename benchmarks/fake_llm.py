@@ -0,0 +1,96 @@
+"""Scripted chat model standing in for the LLM provider during benchmarks.
+
+Every agent gets a ScriptedChatModel whose reply is a pure function of the
+agent name and the prompt, after a fixed sleep (``latency_s``) that models
+provider round-trip time. Replies are deterministic, so runs are comparable.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.workload import sql_for_question
+
+_QUESTION_RE = re.compile(r"(?:USER QUESTION|QUESTION):\s*\n(.*?)\n\n", re.DOTALL)
+
+_PLOTLY_CODE = "fig = px.bar(df, x=df.columns[0], y=df.columns[1])"
+
+
+def _question(prompt: str) -> str:
+    match = _QUESTION_RE.search(prompt)
+    return match.group(1).strip() if match else ""
+
+
+def default_reply(agent: str, prompt: str) -> str:
+    """Canned answer per agent: workload SQL, a one-line summary, or Plotly code."""
+    if agent in {"sql_agent", "error_agent"}:
+        return sql_for_question(_question(prompt))
+    if agent == "viz_agent":
+        return _PLOTLY_CODE
+    return "Here is the result of your question."
+
+
+class ScriptedChatModel(BaseChatModel):
+    agent: str = ""
+    latency_s: float = 0.0
+    reply: Callable[[str, str], str] = default_reply
+    on_call: Optional[Callable[[str, float], None]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-benchmark"
+
+    def _text(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _result(self, messages: List[BaseMessage], started: float) -> ChatResult:
+        content = self.reply(self.agent, self._text(messages))
+        if self.on_call is not None:
+            self.on_call(f"llm:{self.agent}", time.perf_counter() - started)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self._result(messages, started)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return self._result(messages, started)
+
+
+@contextmanager
+def scripted_llm(
+    latency_s: float = 0.0, on_call: Optional[Callable[[str, float], None]] = None
+) -> Iterator[Dict[str, ScriptedChatModel]]:
+    """Route app.llm.factory.get_llm to scripted models and reset shared agents around the block."""
+    from app.agents.shared import registry
+    from app.llm import factory
+
+    models: Dict[str, ScriptedChatModel] = {}
+
+    def _get_llm(agent: Optional[str] = None) -> ScriptedChatModel:
+        name = agent or "default"
+        if name not in models:
+            models[name] = ScriptedChatModel(agent=name, latency_s=latency_s, on_call=on_call)
+        return models[name]
+
+    original = factory.get_llm
+    factory.get_llm = _get_llm
+    registry.reset_agents()
+    try:
+        yield models
+    finally:
+        factory.get_llm = original
+        registry.reset_agents()
@@ -0,0 +1,118 @@
+"""Benchmark the graph and data pipelines against a synthetic database.
+
+Builds a synthetic clients/dossiers/transactions database, replays the
+workload with a scripted LLM (fixed per-call latency) on N threads and prints
+per-stage p50/p95/p99, throughput and allocation peaks. Reports are compared
+with benchmarks/baselines/<pipeline>.json when it exists, e.g.:
+
+    python -m benchmarks.run --pipeline both
+    python -m benchmarks.run --pipeline graph --threads 8 --save-baseline
+
+Exit status is 1 when a pipeline regresses past --tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+def _isolate_state(workdir: Path) -> None:
+    # Checkpoints, result handles, corrections and the LLM cache go to the
+    # scratch directory so runs neither read nor pollute data/; per-question
+    # INFO logs would otherwise dominate the timings. The query result cache is
+    # off: the warm-up would otherwise turn every measured execute_sql into a
+    # cache hit and hide SQL-side regressions (and gains).
+    os.environ["RESULT_CACHE_MAX_ENTRIES"] = "0"
+    os.environ["CHECKPOINT_DB_PATH"] = str(workdir / "checkpoints.sqlite")
+    os.environ["RESULT_STORE_PATH"] = str(workdir / "results.sqlite")
+    os.environ["CORRECTIONS_DB_PATH"] = str(workdir / "corrections.sqlite")
+    os.environ["LLM_CACHE"] = "off"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    config = report["config"]
+    lines = [
+        f"{report['pipeline']}: {config['questions']} questions, {config['threads']} threads, "
+        f"LLM latency {config['llm_latency_ms']:g} ms",
+        f"  throughput {report['throughput_qps']:.1f} q/s  (wall {report['wall_s']:.2f} s)  routes {report['routes']}",
+        f"  {'stage':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}",
+    ]
+    rows = [("total", report["latency"]["total"])] + list(report["latency"]["stages"].items())
+    for stage, stats in rows:
+        lines.append(
+            f"  {stage:<28}{stats['count']:>7}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        )
+    allocations = report["allocations"]
+    lines.append(
+        f"  allocation peak per question: p50 {allocations['peak_kib_p50']:.0f} KiB, "
+        f"p95 {allocations['peak_kib_p95']:.0f} KiB"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pipeline", choices=("graph", "data", "both"), default="both")
+    parser.add_argument("--questions", type=int, default=200, help="Measured questions per pipeline.")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent worker threads.")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Scripted LLM latency per call.")
+    parser.add_argument("--clients", type=int, default=2000, help="Synthetic database size (clients).")
+    parser.add_argument("--rounds", type=int, default=3, help="Measured runs; the fastest is reported.")
+    parser.add_argument("--alloc-questions", type=int, default=20, help="Questions in the tracemalloc pass.")
+    parser.add_argument("--baseline-dir", type=Path, default=BASELINE_DIR)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the reports as the new baselines.")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative regression.")
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON.")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="statapp-bench-"))
+    _isolate_state(workdir)
+
+    from benchmarks.harness import compare, run_benchmark
+    from benchmarks.synthetic_db import build_synthetic_db
+
+    db_path = str(build_synthetic_db(workdir / "synthetic.db", clients=args.clients))
+    pipelines = ("graph", "data") if args.pipeline == "both" else (args.pipeline,)
+    failed = False
+    reports = []
+    for pipeline in pipelines:
+        report = run_benchmark(
+            pipeline,
+            db_path=db_path,
+            questions=args.questions,
+            threads=args.threads,
+            latency_s=args.latency_ms / 1000.0,
+            alloc_questions=args.alloc_questions,
+            rounds=args.rounds,
+        )
+        report["config"]["clients"] = args.clients
+        reports.append(report)
+        if not args.json:
+            print(format_report(report))
+
+        baseline_path = args.baseline_dir / f"{pipeline}.json"
+        if args.save_baseline:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            print(f"  baseline saved to {baseline_path}", file=sys.stderr)
+        elif baseline_path.exists():
+            problems = compare(report, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+            for problem in problems:
+                print(f"  REGRESSION {pipeline} {problem}", file=sys.stderr)
+            failed = failed or bool(problems)
+    if args.json:
+        print(json.dumps(reports, indent=2, sort_keys=True))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+"""Deterministic SQLite database shaped like the production clients/dossiers/transactions tables."""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SEGMENTS = ("Premium", "Standard", "Jeune", "Senior")
+COMMUNES = ("Paris", "Lyon", "Marseille", "Toulouse", "Nice", "Nantes", "Lille", "Rennes", "Bordeaux", "Strasbourg")
+PAYS = ("France", "Espagne", "Italie", "Belgique", "Allemagne")
+PRODUITS = ("Credit conso", "Credit auto", "Carte", "Pret perso")
+CANAUX = ("Agence", "Web", "Mobile", "Telephone")
+CATEGORIES = ("Alimentation", "Mode", "Electronique", "Voyage", "Maison", "Loisirs")
+ENSEIGNES = ("Carrefour", "Fnac", "Decathlon", "Ikea", "Sephora")
+
+
+def build_synthetic_db(path: str | Path, *, clients: int = 2000, seed: int = 7) -> Path:
+    """(Re)create path with `clients` clients, ~2 dossiers and ~10 transactions each."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1)
+
+    con = sqlite3.connect(str(path))
+    try:
+        con.executescript(
+            """
+            CREATE TABLE clients (
+                client_id INTEGER PRIMARY KEY,
+                segment_client TEXT,
+                commune TEXT,
+                pays TEXT,
+                anciennete_mois INTEGER,
+                score_client_fragile REAL,
+                carte_fidelite_carrefour INTEGER
+            );
+            CREATE TABLE dossiers (
+                dossier_id INTEGER PRIMARY KEY,
+                client_id INTEGER,
+                type_produit TEXT,
+                canal_souscription TEXT,
+                statut_acceptation TEXT,
+                montant REAL,
+                nombre_incidents_paiement INTEGER,
+                date_dossier TEXT
+            );
+            CREATE TABLE transactions (
+                transaction_id INTEGER PRIMARY KEY,
+                client_id INTEGER,
+                dossier_id INTEGER,
+                montant REAL,
+                categorie_achat TEXT,
+                enseigne TEXT,
+                pays TEXT,
+                statut_transaction TEXT,
+                date_transaction TEXT,
+                datetime_transaction TEXT
+            );
+            """
+        )
+        con.executemany(
+            "INSERT INTO clients VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    cid,
+                    rng.choice(SEGMENTS),
+                    rng.choice(COMMUNES),
+                    rng.choice(PAYS),
+                    rng.randint(1, 240),
+                    round(rng.random(), 3),
+                    int(rng.random() < 0.3),
+                )
+                for cid in range(1, clients + 1)
+            ),
+        )
+        dossiers = []
+        transactions = []
+        for cid in range(1, clients + 1):
+            for _ in range(rng.randint(1, 3)):
+                did = len(dossiers) + 1
+                opened = start + timedelta(days=rng.randint(0, 1000))
+                dossiers.append(
+                    (
+                        did,
+                        cid,
+                        rng.choice(PRODUITS),
+                        rng.choice(CANAUX),
+                        "ACCEPTE" if rng.random() < 0.7 else "REFUSE",
+                        round(rng.uniform(500, 30000), 2),
+                        rng.choice((0, 0, 0, 1, 2, 5)),
+                        opened.date().isoformat(),
+                    )
+                )
+                for _ in range(rng.randint(2, 8)):
+                    moment = opened + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+                    transactions.append(
+                        (
+                            len(transactions) + 1,
+                            cid,
+                            did,
+                            round(rng.uniform(2, 900), 2),
+                            rng.choice(CATEGORIES),
+                            rng.choice(ENSEIGNES),
+                            rng.choice(PAYS),
+                            "REJETEE" if rng.random() < 0.05 else "ACCEPTEE",
+                            moment.date().isoformat(),
+                            moment.isoformat(sep=" "),
+                        )
+                    )
+        con.executemany("INSERT INTO dossiers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", dossiers)
+        con.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", transactions)
+        for table, column in (("dossiers", "client_id"), ("transactions", "client_id"), ("transactions", "dossier_id")):
+            con.execute(f"CREATE INDEX idx_{table}_{column} ON {table}({column})")
+        con.commit()
+    finally:
+        con.close()
+    return path
@@ -0,0 +1,72 @@
+"""Analyst questions replayed by the benchmarks, with the SQL the scripted LLM answers."""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+# Mostly DATA questions (SQL + execution + analysis + chart), plus one
+# greeting and one ranking question that the router sends back for clarification.
+WORKLOAD: List[Dict[str, str]] = [
+    {
+        "question": "How many clients by segment?",
+        "sql": "SELECT segment_client, COUNT(*) AS nb FROM clients GROUP BY segment_client ORDER BY nb DESC",
+    },
+    {
+        "question": "Average client seniority by segment",
+        "sql": "SELECT segment_client, AVG(anciennete_mois) AS anciennete_moyenne FROM clients GROUP BY segment_client",
+    },
+    {
+        "question": "Acceptance rate by product type",
+        "sql": (
+            "SELECT type_produit, ROUND(100.0 * SUM(CASE WHEN statut_acceptation = 'ACCEPTE' THEN 1 ELSE 0 END)"
+            " / COUNT(*), 2) AS taux_acceptation FROM dossiers GROUP BY type_produit ORDER BY taux_acceptation DESC"
+        ),
+    },
+    {
+        "question": "Total transaction amount by country in 2023",
+        "sql": (
+            "SELECT pays, SUM(montant) AS montant_total FROM transactions "
+            "WHERE strftime('%Y', date_transaction) = '2023' GROUP BY pays ORDER BY montant_total DESC"
+        ),
+    },
+    {
+        "question": "Monthly number of transactions in 2023",
+        "sql": (
+            "SELECT strftime('%Y-%m', date_transaction) AS mois, COUNT(*) AS nb FROM transactions "
+            "WHERE strftime('%Y', date_transaction) = '2023' GROUP BY mois ORDER BY mois"
+        ),
+    },
+    {
+        "question": "Average transaction amount by client segment in 2024",
+        "sql": (
+            "SELECT c.segment_client, AVG(t.montant) AS montant_moyen FROM transactions t "
+            "JOIN clients c ON t.client_id = c.client_id "
+            "WHERE strftime('%Y', t.date_transaction) = '2024' GROUP BY c.segment_client"
+        ),
+    },
+    {
+        "question": "Top 10 communes by number of clients in 2024",
+        "sql": "SELECT commune, COUNT(*) AS nb FROM clients GROUP BY commune ORDER BY nb DESC LIMIT 10",
+    },
+    {
+        "question": "How many dossiers by subscription channel in 2024?",
+        "sql": (
+            "SELECT canal_souscription, COUNT(*) AS nb FROM dossiers "
+            "WHERE strftime('%Y', date_dossier) = '2024' GROUP BY canal_souscription ORDER BY nb DESC"
+        ),
+    },
+    {"question": "hello", "sql": ""},
+    {"question": "Top 5 enseignes", "sql": ""},
+]
+
+_SQL_BY_QUESTION = {item["question"]: item["sql"] for item in WORKLOAD if item["sql"]}
+_DEFAULT_SQL = WORKLOAD[0]["sql"]
+
+
+def sql_for_question(question: str) -> str:
+    return _SQL_BY_QUESTION.get(question.strip(), _DEFAULT_SQL)
+
+
+def questions(count: int) -> List[str]:
+    """count questions cycling through the workload in a fixed order."""
+    return [WORKLOAD[i % len(WORKLOAD)]["question"] for i in range(count)]
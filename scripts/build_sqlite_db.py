@@ -1,11 +1,21 @@
 from __future__ import annotations
 import argparse
+import csv
 import hashlib
 import json
+import os
 import sqlite3
+import sys
+import time
 from pathlib import Path
 import pandas as pd
 
+# Allow running from project root without installing the package
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.rollups import build_rollups
+from app.db.sqlite import invalidate_connection_pool
+
 def sha256_file(path: Path):
     h = hashlib.sha256()
     with open(path, "rb") as f:
@@ -13,14 +23,72 @@ def sha256_file(path: Path):
             h.update(chunk)
     return h.hexdigest()
 
-def read_csv_auto(path: Path):
-    # auto delimiter + encoding
-    for enc in ["utf-8", "latin1"]:
-        try:
-            return pd.read_csv(path, sep=None, engine="python", encoding=enc)
-        except Exception:
-            pass
-    return pd.read_csv(path, sep=",", encoding="latin1")
+# Bulk loading: the delimiter, encoding and column types come from a small
+# sample; the file is then parsed in chunks by pandas' C engine as strings and
+# inserted with executemany. SQLite's column affinity (INTEGER/REAL/TEXT, as
+# DataFrame.to_sql declared them) converts the numeric strings on insert.
+SNIFF_BYTES = 64 * 1024
+SAMPLE_ROWS = 10_000
+CHUNK_ROWS = 100_000
+_SQL_TYPES = {"i": "INTEGER", "u": "INTEGER", "b": "INTEGER", "f": "REAL"}
+
+def sniff_csv(path: Path):
+    # (encoding, delimiter) from the first SNIFF_BYTES, cut at the last full line
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    if len(sample) == SNIFF_BYTES and b"\n" in sample:
+        sample = sample[: sample.rfind(b"\n") + 1]
+    try:
+        text, encoding = sample.decode("utf-8-sig"), "utf-8-sig"
+    except UnicodeDecodeError:
+        text, encoding = sample.decode("latin1"), "latin1"
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    return encoding, delimiter
+
+def sample_kinds(path: Path, encoding: str, delimiter: str):
+    # {column: numpy dtype kind} as pandas infers it on the first SAMPLE_ROWS rows
+    sample = pd.read_csv(path, sep=delimiter, encoding=encoding, nrows=SAMPLE_ROWS)
+    return {str(col): dtype.kind for col, dtype in sample.dtypes.items()}
+
+def _quote(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+def _load_csv(con: sqlite3.Connection, table: str, path: Path, encoding: str, delimiter: str, chunk_rows: int):
+    kinds = sample_kinds(path, encoding, delimiter)
+    columns = ", ".join(f"{_quote(col)} {_SQL_TYPES.get(kind, 'TEXT')}" for col, kind in kinds.items())
+    con.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+    con.execute(f"CREATE TABLE {_quote(table)} ({columns})")
+    insert = f"INSERT INTO {_quote(table)} VALUES ({', '.join('?' * len(kinds))})"
+    # Booleans keep pandas' True/False parsing (stored as 1/0, as to_sql did); the rest stay strings.
+    dtypes = {col: "boolean" if kind == "b" else str for col, kind in kinds.items()}
+    rows = 0
+    reader = pd.read_csv(path, sep=delimiter, encoding=encoding, dtype=dtypes, chunksize=chunk_rows)
+    for chunk in reader:
+        con.executemany(insert, _chunk_rows(chunk))
+        rows += len(chunk)
+    return rows
+
+def _chunk_rows(chunk: pd.DataFrame):
+    # Row tuples with missing values as None, built column by column
+    columns = []
+    for _, series in chunk.items():
+        values = series.tolist()
+        if series.hasnans:
+            values = [None if missing else value for value, missing in zip(values, series.isna().tolist())]
+        columns.append(values)
+    return zip(*columns)
+
+def load_csv(con: sqlite3.Connection, table: str, path: Path, chunk_rows: int = CHUNK_ROWS):
+    # (Re)create table from path in the caller's transaction; returns the row count
+    encoding, delimiter = sniff_csv(path)
+    try:
+        return _load_csv(con, table, path, encoding, delimiter, chunk_rows)
+    except UnicodeDecodeError:
+        # Non-UTF-8 bytes past the sniffed sample: reload the whole file as latin1.
+        return _load_csv(con, table, path, "latin1", delimiter, chunk_rows)
 
 def create_index_if_exists(cur: sqlite3.Cursor, table: str, col: str):
     cur.execute(f"PRAGMA table_info({table});")
@@ -28,6 +96,100 @@ def create_index_if_exists(cur: sqlite3.Cursor, table: str, col: str):
     if col in cols:
         cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{col} ON {table}({col});")
 
+# (table, input name): the name prefixes the --<name>_csv option and the meta keys.
+INPUTS = (("clients", "client"), ("dossiers", "dossier"), ("transactions", "transaction"))
+DEFAULT_INDEXES = (
+    ("dossiers", "client_id"),
+    ("transactions", "client_id"),
+    ("transactions", "dossier_id"),
+    ("transactions", "date_transaction"),
+)
+
+def changed_inputs(previous_meta: dict, hashes: dict):
+    # Tables whose CSV sha256 differs from the one recorded by the last build
+    recorded = previous_meta.get("inputs", {})
+    return [table for table, name in INPUTS if recorded.get(f"{name}_sha256") != hashes[table]]
+
+def copy_database(source: Path, target: Path):
+    # Consistent copy through the backup API (safe while the app reads source)
+    src = sqlite3.connect(f"file:{source.resolve().as_posix()}?mode=ro", uri=True)
+    dst = sqlite3.connect(str(target))
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+def table_index_sql(con: sqlite3.Connection, table: str):
+    rows = con.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def append_csv(con: sqlite3.Connection, table: str, path: Path):
+    # Insert the CSV rows whose <singular>_id is not in table yet; None when the
+    # table cannot be appended to (no id column, different columns) and must be reloaded
+    key = f"{table.rstrip('s')}_id"
+    staging = f"_staging_{table}"
+    load_csv(con, staging, path)
+    existing = [row[1] for row in con.execute(f"PRAGMA table_info({_quote(table)})")]
+    incoming = [row[1] for row in con.execute(f"PRAGMA table_info({_quote(staging)})")]
+    appended = None
+    if key in existing and existing == incoming:
+        columns = ", ".join(_quote(col) for col in existing)
+        cur = con.execute(
+            f"INSERT INTO {_quote(table)} ({columns}) SELECT {columns} FROM {_quote(staging)} "
+            f"WHERE {_quote(key)} NOT IN (SELECT {_quote(key)} FROM {_quote(table)} WHERE {_quote(key)} IS NOT NULL)"
+        )
+        appended = cur.rowcount
+    con.execute(f"DROP TABLE {_quote(staging)}")
+    return appended
+
+# Tables the app appends to in the live file (corrections_log lives there unless
+# CORRECTIONS_DB_PATH is set). Rows added while an incremental build runs are
+# copied into the shadow file just before the swap.
+APP_APPEND_TABLES = ("corrections_log",)
+
+def max_ids(con: sqlite3.Connection):
+    # {table: highest id} for the APP_APPEND_TABLES present in con
+    ids = {}
+    for table in APP_APPEND_TABLES:
+        try:
+            ids[table] = con.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_quote(table)}").fetchone()[0]
+        except sqlite3.OperationalError:
+            continue
+    return ids
+
+def swap_in(shadow: Path, sqlite_path: Path, copied_ids: dict):
+    # Replace sqlite_path with shadow, first copying app rows newer than copied_ids.
+    # The live file's write lock is held from that copy to os.replace, so no
+    # write can land in the old file in between. Returns {table: rows copied}.
+    caught_up = {}
+    live = sqlite3.connect(str(sqlite_path), timeout=30.0, isolation_level=None)
+    try:
+        live.execute("BEGIN IMMEDIATE")
+        target = sqlite3.connect(str(shadow))
+        try:
+            for table, since in copied_ids.items():
+                cur = live.execute(f"SELECT * FROM {_quote(table)} WHERE id > ? ORDER BY id", (since,))
+                columns = ", ".join(_quote(d[0]) for d in cur.description)
+                rows = cur.fetchall()
+                if rows:
+                    target.executemany(
+                        f"INSERT OR IGNORE INTO {_quote(table)} ({columns}) VALUES ({', '.join('?' * len(cur.description))})",
+                        rows,
+                    )
+                caught_up[table] = len(rows)
+            target.commit()
+        finally:
+            target.close()
+        os.replace(shadow, sqlite_path)
+    finally:
+        if live.in_transaction:
+            live.execute("ROLLBACK")
+        live.close()
+    return caught_up
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--client_csv", required=True)
@@ -35,69 +197,111 @@ def main():
     ap.add_argument("--transaction_csv", required=True)
     ap.add_argument("--sqlite", required=True)
     ap.add_argument("--out_meta", default="logs/build_db_meta.json")
+    ap.add_argument("--index_sql", default=None, help="Extra CREATE INDEX statements (scripts/index_advisor.py --ddl-out).")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Reload only the tables whose CSV changed since the build recorded in --out_meta.")
+    ap.add_argument("--append", action="store_true",
+                    help="With --incremental: insert only rows with a new <table>_id instead of reloading.")
     args = ap.parse_args()
 
-    client_csv = Path(args.client_csv)
-    dossier_csv = Path(args.dossier_csv)
-    transaction_csv = Path(args.transaction_csv)
+    csv_paths = {table: Path(getattr(args, f"{name}_csv")) for table, name in INPUTS}
     sqlite_path = Path(args.sqlite)
     out_meta = Path(args.out_meta)
 
     sqlite_path.parent.mkdir(parents=True, exist_ok=True)
     out_meta.parent.mkdir(parents=True, exist_ok=True)
 
-    # Load CSVs
-    clients = read_csv_auto(client_csv)
-    dossiers = read_csv_auto(dossier_csv)
-    transactions = read_csv_auto(transaction_csv)
+    hashes = {table: sha256_file(path) for table, path in csv_paths.items()}
+    previous_meta = None
+    if args.incremental and sqlite_path.exists() and out_meta.exists():
+        previous_meta = json.loads(out_meta.read_text(encoding="utf-8"))
+    changed = changed_inputs(previous_meta, hashes) if previous_meta else [table for table, _ in INPUTS]
+    if previous_meta and not changed:
+        print(f"Up to date: {sqlite_path} (no CSV changed since the last build)")
+        return
 
-    # Rebuild DB from scratch for reproducibility
-    if sqlite_path.exists():
-        sqlite_path.unlink()
+    # Build next to the live file and swap it in with os.replace: readers keep the
+    # old file until they reopen, and the app reopens when the file signature changes.
+    shadow = sqlite_path.with_name(sqlite_path.name + ".building")
+    if shadow.exists():
+        shadow.unlink()
+    copied_ids = {}
+    if previous_meta:
+        copy_database(sqlite_path, shadow)
+        with sqlite3.connect(str(shadow)) as copy:
+            copied_ids = max_ids(copy)
 
-    con = sqlite3.connect(str(sqlite_path))
+    started = time.perf_counter()
+    reloaded, appended = [], {}
+    con = sqlite3.connect(str(shadow))
     try:
-        clients.to_sql("clients", con, if_exists="replace", index=False)
-        dossiers.to_sql("dossiers", con, if_exists="replace", index=False)
-        transactions.to_sql("transactions", con, if_exists="replace", index=False)
+        # No journal and no fsync while building: a failed build leaves a file to rebuild, not to recover.
+        con.execute("PRAGMA journal_mode=OFF")
+        con.execute("PRAGMA synchronous=OFF")
+        con.execute("BEGIN")
+        kept_indexes = []
+        for table in changed:
+            if previous_meta and args.append:
+                added = append_csv(con, table, csv_paths[table])
+                if added is not None:
+                    appended[table] = added
+                    continue
+            kept_indexes.extend(table_index_sql(con, table))
+            load_csv(con, table, csv_paths[table])
+            reloaded.append(table)
 
+        # Indexes of reloaded tables (advised ones included) went with the old table.
+        for sql in kept_indexes:
+            try:
+                con.execute(sql)
+            except sqlite3.OperationalError as exc:
+                print(f"Dropped index ({exc}): {sql}")
         cur = con.cursor()
-        create_index_if_exists(cur, "dossiers", "client_id")
-        create_index_if_exists(cur, "transactions", "client_id")
-        create_index_if_exists(cur, "transactions", "dossier_id")
-        create_index_if_exists(cur, "transactions", "date_transaction")
+        for table, col in DEFAULT_INDEXES:
+            create_index_if_exists(cur, table, col)
+        rollups = build_rollups(con)
         con.commit()
+        if args.index_sql:
+            con.executescript(Path(args.index_sql).read_text(encoding="utf-8"))
+        con.execute("PRAGMA journal_mode=DELETE")
 
         # Sanity counts
-        cur.execute("SELECT COUNT(*) FROM clients"); c_clients = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM dossiers"); c_dossiers = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM transactions"); c_tx = cur.fetchone()[0]
+        row_counts = {table: int(cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]) for table, _ in INPUTS}
     finally:
         con.close()
+    if previous_meta:
+        caught_up = swap_in(shadow, sqlite_path, copied_ids)
+    else:
+        caught_up = {}
+        os.replace(shadow, sqlite_path)
+    # Same-process readers; other processes see the new file signature on their next query.
+    invalidate_connection_pool(sqlite_path)
+    build_s = time.perf_counter() - started
 
+    inputs = {f"{name}_csv": str(csv_paths[table]) for table, name in INPUTS}
+    inputs.update({f"{name}_sha256": hashes[table] for table, name in INPUTS})
     meta = {
-        "inputs": {
-            "client_csv": str(client_csv),
-            "dossier_csv": str(dossier_csv),
-            "transaction_csv": str(transaction_csv),
-            "client_sha256": sha256_file(client_csv),
-            "dossier_sha256": sha256_file(dossier_csv),
-            "transaction_sha256": sha256_file(transaction_csv),
-        },
+        "inputs": inputs,
         "output": {
             "sqlite": str(sqlite_path),
             "sqlite_sha256": sha256_file(sqlite_path),
-            "row_counts": {
-                "clients": int(c_clients),
-                "dossiers": int(c_dossiers),
-                "transactions": int(c_tx),
-            },
+            "row_counts": row_counts,
+            "rollups": rollups,
+            "index_sql": args.index_sql,
+        },
+        "refresh": {
+            "mode": "incremental" if previous_meta else "full",
+            "reloaded": reloaded,
+            "appended": appended,
+            "caught_up": caught_up,
         },
     }
     out_meta.write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
 
-    print("Built DB:", sqlite_path)
+    print(f"Built DB: {sqlite_path} ({build_s:.1f} s)")
+    print("Refresh:", meta["refresh"])
     print("Row counts:", meta["output"]["row_counts"])
+    print("Rollups:", meta["output"]["rollups"])
     print("DB sha256:", meta["output"]["sqlite_sha256"])
     print("Wrote metadata:", out_meta)
 
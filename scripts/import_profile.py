@@ -0,0 +1,67 @@
+"""Import-time profile of an app module in a fresh interpreter.
+
+Runs ``python -X importtime -c "import <module>"`` and prints the wall time
+plus the packages that dominate cumulative import time, e.g.:
+
+    python scripts/import_profile.py app.pipeline.langgraph_flow --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def profile_import(module: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """(wall seconds, [(module, self_us, cumulative_us)]) for importing module."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - started
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return wall, entries
+
+
+def top_level_totals(entries: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Self time summed per top-level package (what each dependency costs)."""
+    totals: Dict[str, int] = {}
+    for name, self_us, _cumulative in entries:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="app.pipeline.langgraph_flow")
+    parser.add_argument("--top", type=int, default=12, help="Packages to list.")
+    args = parser.parse_args()
+
+    wall, entries = profile_import(args.module)
+    print(f"import {args.module}: {wall:.3f} s wall, {len(entries)} modules")
+    totals = sorted(top_level_totals(entries).items(), key=lambda item: item[1], reverse=True)
+    for package, self_us in totals[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    main()
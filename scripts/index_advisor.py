@@ -0,0 +1,437 @@
+"""Propose (and optionally create) indexes for the SQL users actually run.
+
+The workload is every executed statement found in the app's JSON log lines
+(``graph.sql_executed`` / ``sql.executed`` events) plus the expert SQL in
+``corrections_log``. Each distinct statement goes through EXPLAIN QUERY PLAN;
+full table scans and temporary B-trees (GROUP BY / ORDER BY / DISTINCT sorts)
+are flagged. For each flagged table the advisor builds one candidate index:
+
+- equality filters and join columns first,
+- then the GROUP BY (or ORDER BY) terms, with ``strftime(...)`` terms kept as
+  expression-index terms,
+- then the other columns the query reads from that table, so the index
+  covers the query (up to _MAX_INDEX_COLUMNS).
+
+A candidate is kept only if SQLite's planner uses it, and it removes a flagged
+step, on a schema-only copy of the database. A candidate whose terms prefix a
+longer one on the same table is folded into it, and the rest are ranked by how
+many logged executions they serve.
+
+    python scripts/index_advisor.py --sqlite data/statapp.sqlite --log logs/app.log
+    python scripts/index_advisor.py --sqlite data/statapp.sqlite --log logs/app.log \\
+        --apply --ddl-out data/advised_indexes.sql
+
+--apply creates the indexes and re-times every workload query before and
+after. Pass the --ddl-out file to ``scripts/build_sqlite_db.py --index_sql``
+so a rebuild keeps them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+# Allow running from project root without installing the package
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.corrections import corrections_db_path
+from app.db.sqlite import invalidate_connection_pool
+from app.safety.sql_validator import validate_sql
+
+SQL_EVENTS = ("graph.sql_executed", "sql.executed")
+_MAX_INDEX_COLUMNS = 6
+_TIMING_RUNS = 3
+
+_STRFTIME_RE = re.compile(r"strftime\(\s*'[^']*'\s*,\s*(?:\w+\.)?\w+\s*\)", re.IGNORECASE)
+_TERM_RE = re.compile(rf"(?P<term>{_STRFTIME_RE.pattern}|(?:\w+\.)?[A-Za-z_]\w*)", re.IGNORECASE)
+_EQUALITY_RE = re.compile(rf"{_TERM_RE.pattern}\s*(?:=|\bIN\b)(?!\s*(?:\w+\.)?[A-Za-z_])", re.IGNORECASE)
+_JOIN_ON_RE = re.compile(r"\bON\s+(?P<left>(?:\w+\.)?\w+)\s*=\s*(?P<right>(?:\w+\.)?\w+)", re.IGNORECASE)
+_SOURCE_RE = re.compile(
+    r"\b(?:FROM|JOIN)\s+(?P<table>\w+)"
+    r"(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|INNER|LEFT|CROSS|GROUP|ORDER|LIMIT|HAVING)\b)(?P<alias>\w+))?",
+    re.IGNORECASE,
+)
+_CLAUSE_END = r"(?=\s+(?:WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT)\b|$)"
+_CLAUSES = {
+    "select": re.compile(r"^\s*SELECT\s+(?P<body>.+?)\s+FROM\b", re.IGNORECASE | re.DOTALL),
+    "where": re.compile(rf"\bWHERE\s+(?P<body>.+?){_CLAUSE_END}", re.IGNORECASE | re.DOTALL),
+    "group": re.compile(rf"\bGROUP\s+BY\s+(?P<body>.+?){_CLAUSE_END}", re.IGNORECASE | re.DOTALL),
+    "order": re.compile(rf"\bORDER\s+BY\s+(?P<body>.+?){_CLAUSE_END}", re.IGNORECASE | re.DOTALL),
+}
+_ALIASED_RE = re.compile(r"^(?P<expr>.+?)\s+AS\s+(?P<alias>\w+)$", re.IGNORECASE | re.DOTALL)
+
+
+# ---------------------------------------------------------------------------
+# Workload
+# ---------------------------------------------------------------------------
+
+def iter_logged_sql(paths: Iterable[Path]) -> Iterator[str]:
+    """SQL of executed-statement events in log files (JSON after the logger name)."""
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            for line in handle:
+                start = line.find("{")
+                if start < 0 or "sql" not in line:
+                    continue
+                try:
+                    payload = json.loads(line[start:])
+                except ValueError:
+                    continue
+                if isinstance(payload, dict) and payload.get("event") in SQL_EVENTS and payload.get("sql"):
+                    yield str(payload["sql"])
+
+
+def corrections_sql(path: str) -> List[str]:
+    """Expert-corrected SQL stored in corrections_log (empty when there is none)."""
+    if not Path(path).exists():
+        return []
+    con = sqlite3.connect(f"file:{Path(path).resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        return [row[0] for row in con.execute("SELECT corrected_sql FROM corrections_log")]
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        con.close()
+
+
+def load_workload(log_paths: Sequence[Path], corrections_path: Optional[str]) -> Counter:
+    """Valid SELECT statements (whitespace-normalized) -> number of executions."""
+    statements = list(iter_logged_sql(log_paths))
+    if corrections_path:
+        statements.extend(corrections_sql(corrections_path))
+    workload: Counter = Counter()
+    for sql in statements:
+        normalized = " ".join(sql.split()).rstrip(";").strip()
+        if normalized and validate_sql(normalized)[0]:
+            workload[normalized] += 1
+    return workload
+
+
+# ---------------------------------------------------------------------------
+# Plans
+# ---------------------------------------------------------------------------
+
+def schema_clone(con: sqlite3.Connection) -> sqlite3.Connection:
+    """Empty in-memory copy of the tables and indexes, for what-if plans."""
+    clone = sqlite3.connect(":memory:")
+    rows = con.execute(
+        "SELECT type, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+        "ORDER BY CASE type WHEN 'table' THEN 0 ELSE 1 END"
+    ).fetchall()
+    for kind, sql in rows:
+        if kind in {"table", "index", "view"}:
+            clone.execute(sql)
+    return clone
+
+
+def explain(con: sqlite3.Connection, sql: str) -> List[str]:
+    return [row[3] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def plan_problems(details: Sequence[str]) -> List[str]:
+    """Plan steps worth an index: full scans and temporary B-tree sorts."""
+    problems = []
+    for detail in details:
+        if detail.startswith("USE TEMP B-TREE"):
+            problems.append(detail)
+        elif detail.startswith("SCAN ") and "COVERING INDEX" not in detail and not detail.startswith("SCAN CONSTANT"):
+            problems.append(detail)
+        elif "AUTOMATIC" in detail and "INDEX" in detail:
+            problems.append(detail)
+    return problems
+
+
+def _columns_read(clone: sqlite3.Connection, sql: str) -> Dict[str, Set[str]]:
+    """{table: columns} the statement reads, as reported by SQLite's authorizer."""
+    reads: Dict[str, Set[str]] = {}
+
+    def _authorizer(action, table, column, _db, _trigger):
+        if action == sqlite3.SQLITE_READ and table and column and not table.startswith("sqlite_"):
+            reads.setdefault(table, set()).add(column)
+        return sqlite3.SQLITE_OK
+
+    clone.set_authorizer(_authorizer)
+    try:
+        clone.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    finally:
+        clone.set_authorizer(None)
+    return reads
+
+
+# ---------------------------------------------------------------------------
+# Candidates
+# ---------------------------------------------------------------------------
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, quoted, start = [], 0, False, 0
+    for index, char in enumerate(text):
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char in "()":
+            depth += 1 if char == "(" else -1
+        elif not quoted and char == "," and depth == 0:
+            parts.append(text[start:index].strip())
+            start = index + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def _clause(sql: str, name: str) -> str:
+    match = _CLAUSES[name].search(sql)
+    return match.group("body") if match else ""
+
+
+def _unqualified(term: str) -> str:
+    """Index form of a term: qualifiers dropped, whitespace normalized."""
+    return re.sub(r"\b\w+\.(?=[A-Za-z_])", "", " ".join(term.split()))
+
+
+@dataclass
+class _Terms:
+    sql: str
+    reads: Dict[str, Set[str]]
+    aliases: Dict[str, str] = field(default_factory=dict)
+
+    def table_of(self, term: str) -> Optional[str]:
+        """Table a column or strftime(column) term reads from."""
+        ref = term[term.rfind(",") + 1:].strip(" )") if "(" in term else term
+        qualifier, _, column = ref.rpartition(".")
+        if qualifier:
+            return self.aliases.get(qualifier.lower())
+        owners = [table for table, columns in self.reads.items() if column in columns]
+        return owners[0] if len(owners) == 1 else None
+
+
+def candidate_indexes(sql: str, reads: Dict[str, Set[str]], tables: Set[str]) -> Dict[str, List[str]]:
+    """{table: index terms} for the tables in ``tables`` that sql reads."""
+    terms = _Terms(sql, reads)
+    for match in _SOURCE_RE.finditer(sql):
+        table = match.group("table")
+        terms.aliases[table.lower()] = table
+        if match.group("alias"):
+            terms.aliases[match.group("alias").lower()] = table
+
+    select_aliases = {}
+    for item in _split_top_level(_clause(sql, "select")):
+        aliased = _ALIASED_RE.match(item)
+        if aliased:
+            select_aliases[aliased.group("alias").lower()] = aliased.group("expr").strip()
+
+    leading: List[str] = [match.group("term") for match in _EQUALITY_RE.finditer(_clause(sql, "where"))]
+    for match in _JOIN_ON_RE.finditer(sql):
+        leading.extend([match.group("left"), match.group("right")])
+    ordering: List[str] = []
+    for item in _split_top_level(_clause(sql, "group") or _clause(sql, "order")):
+        item = re.sub(r"\s+(?:ASC|DESC)$", "", item, flags=re.IGNORECASE)
+        item = select_aliases.get(item.lower(), item)
+        if _TERM_RE.fullmatch(item):
+            ordering.append(item)
+
+    candidates: Dict[str, List[str]] = {}
+    for table in tables & set(reads):
+        key: List[str] = []
+        for term in leading + ordering:
+            index_term = _unqualified(term)
+            if terms.table_of(term) == table and index_term not in key:
+                key.append(index_term)
+        extra = sorted(reads[table] - set(key))
+        if len(key) + len(extra) <= _MAX_INDEX_COLUMNS:
+            key.extend(extra)
+        if key:
+            candidates[table] = key
+    return candidates
+
+
+def index_name(table: str, terms: Sequence[str]) -> str:
+    slug = "_".join(re.sub(r"\W+", "_", term).strip("_") for term in terms)
+    digest = hashlib.sha1(f"{table}({', '.join(terms)})".encode()).hexdigest()[:6]
+    return f"idx_adv_{table}_{slug}"[:48].rstrip("_") + f"_{digest}"
+
+
+def index_ddl(table: str, terms: Sequence[str]) -> str:
+    return f"CREATE INDEX IF NOT EXISTS {index_name(table, terms)} ON {table} ({', '.join(terms)})"
+
+
+@dataclass
+class Proposal:
+    table: str
+    terms: List[str]
+    executions: int = 0
+    queries: List[str] = field(default_factory=list)
+    fixes: List[str] = field(default_factory=list)
+
+    @property
+    def ddl(self) -> str:
+        return index_ddl(self.table, self.terms)
+
+
+def advise(db_path: str, workload: Mapping[str, int]) -> Tuple[List[Proposal], Dict[str, List[str]]]:
+    """(ranked proposals, {sql: remaining plan problems}) for the workload."""
+    source = sqlite3.connect(f"file:{Path(db_path).resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        clone = schema_clone(source)
+    finally:
+        source.close()
+    proposals: Dict[Tuple[str, Tuple[str, ...]], Proposal] = {}
+    unresolved: Dict[str, List[str]] = {}
+    try:
+        for sql, executions in sorted(workload.items(), key=lambda item: -item[1]):
+            try:
+                problems = plan_problems(explain(clone, sql))
+                if not problems:
+                    continue
+                reads = _columns_read(clone, sql)
+            except sqlite3.Error:
+                continue
+            flagged = {table for table in reads if any(_mentions(problem, table, sql) for problem in problems)}
+            fixed_any = False
+            for table, terms in candidate_indexes(sql, reads, flagged).items():
+                name = index_name(table, terms)
+                clone.execute(index_ddl(table, terms))
+                try:
+                    details = explain(clone, sql)
+                finally:
+                    clone.execute(f"DROP INDEX {name}")
+                remaining = plan_problems(details)
+                if not any(name in detail for detail in details) or len(remaining) >= len(problems):
+                    continue
+                proposal = proposals.setdefault((table, tuple(terms)), Proposal(table, list(terms)))
+                proposal.executions += executions
+                proposal.queries.append(sql)
+                proposal.fixes.extend(problem for problem in problems if problem not in remaining)
+                fixed_any = True
+            if not fixed_any:
+                unresolved[sql] = problems
+    finally:
+        clone.close()
+    ranked = sorted(
+        consolidate(proposals.values()),
+        key=lambda proposal: (-proposal.executions, proposal.table, proposal.terms),
+    )
+    return ranked, unresolved
+
+
+def consolidate(proposals: Iterable[Proposal]) -> List[Proposal]:
+    """Fold each proposal whose terms prefix a longer one on the same table into it.
+
+    An index on (a, b, c) serves every lookup and ordering (a) or (a, b) does,
+    so only the longest of a prefix chain is kept, with the executions,
+    statements and fixes of the ones it replaces.
+    """
+    survivors: List[Proposal] = []
+    for proposal in sorted(proposals, key=lambda item: (-len(item.terms), -item.executions)):
+        size = len(proposal.terms)
+        wider = next(
+            (kept for kept in survivors if kept.table == proposal.table and kept.terms[:size] == proposal.terms),
+            None,
+        )
+        if wider is None:
+            survivors.append(proposal)
+            continue
+        wider.executions += proposal.executions
+        wider.queries.extend(proposal.queries)
+        wider.fixes.extend(proposal.fixes)
+    return survivors
+
+
+def _mentions(problem: str, table: str, sql: str) -> bool:
+    """Whether a plan step is about table (plans name tables by their alias)."""
+    if problem.startswith("USE TEMP B-TREE"):
+        return True
+    names = {table.lower()}
+    names.update(
+        (match.group("alias") or "").lower()
+        for match in _SOURCE_RE.finditer(sql)
+        if match.group("table").lower() == table.lower()
+    )
+    words = problem.lower().split()
+    return len(words) > 1 and words[1] in names
+
+
+# ---------------------------------------------------------------------------
+# Apply + re-benchmark
+# ---------------------------------------------------------------------------
+
+def time_queries(db_path: str, queries: Iterable[str], runs: int = _TIMING_RUNS) -> Dict[str, float]:
+    """Best-of-runs wall time (ms) of each query, rows fully fetched."""
+    con = sqlite3.connect(f"file:{Path(db_path).resolve().as_posix()}?mode=ro", uri=True)
+    timings = {}
+    try:
+        for sql in queries:
+            best = float("inf")
+            for _ in range(runs):
+                started = time.perf_counter()
+                con.execute(sql).fetchall()
+                best = min(best, time.perf_counter() - started)
+            timings[sql] = best * 1000.0
+    finally:
+        con.close()
+    return timings
+
+
+def apply_proposals(db_path: str, proposals: Sequence[Proposal]) -> None:
+    con = sqlite3.connect(db_path)
+    try:
+        for proposal in proposals:
+            con.execute(proposal.ddl)
+        con.commit()
+    finally:
+        con.close()
+    invalidate_connection_pool(db_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sqlite", default="data/statapp.sqlite")
+    parser.add_argument("--log", type=Path, action="append", default=[], help="Log file with JSON events (repeatable).")
+    parser.add_argument("--corrections", default=None, help="Corrections store (default: CORRECTIONS_DB_PATH or --sqlite).")
+    parser.add_argument("--no-corrections", action="store_true", help="Ignore corrections_log.")
+    parser.add_argument("--top", type=int, default=10, help="Proposals to report / apply.")
+    parser.add_argument("--apply", action="store_true", help="Create the proposed indexes and re-time the workload.")
+    parser.add_argument("--ddl-out", type=Path, default=None, help="Write the proposed CREATE INDEX statements here.")
+    args = parser.parse_args()
+
+    corrections = None if args.no_corrections else (args.corrections or corrections_db_path(args.sqlite))
+    workload = load_workload(args.log, corrections)
+    print(f"workload: {len(workload)} distinct statements, {sum(workload.values())} executions")
+    proposals, unresolved = advise(args.sqlite, workload)
+    proposals = proposals[: args.top]
+
+    for proposal in proposals:
+        print(f"\n{proposal.ddl};")
+        print(f"  serves {proposal.executions} executions of {len(proposal.queries)} statements")
+        for fix in sorted(set(proposal.fixes)):
+            print(f"  removes: {fix}")
+    if unresolved:
+        print(f"\n{len(unresolved)} statements still scan or sort with no index to propose:")
+        for sql, problems in unresolved.items():
+            print(f"  {sql[:100]}  [{'; '.join(problems)}]")
+    if args.ddl_out and proposals:
+        args.ddl_out.parent.mkdir(parents=True, exist_ok=True)
+        args.ddl_out.write_text("".join(f"{proposal.ddl};\n" for proposal in proposals), encoding="utf-8")
+        print(f"\nwrote {args.ddl_out}")
+
+    if args.apply and proposals:
+        before = time_queries(args.sqlite, workload)
+        apply_proposals(args.sqlite, proposals)
+        after = time_queries(args.sqlite, workload)
+        print(f"\napplied {len(proposals)} indexes")
+        print(f"  {'before ms':>10} {'after ms':>10}  statement")
+        for sql in workload:
+            print(f"  {before[sql]:10.2f} {after[sql]:10.2f}  {sql[:80]}")
+        weighted_before = sum(before[sql] * count for sql, count in workload.items())
+        weighted_after = sum(after[sql] * count for sql, count in workload.items())
+        print(f"  workload total (weighted by executions): {weighted_before:.1f} ms -> {weighted_after:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
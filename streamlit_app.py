@@ -1,29 +1,56 @@
 from __future__ import annotations
 
+import io
 import os
+import tempfile
+import time
 import uuid
 import streamlit as st
 import pandas as pd
 from dotenv import load_dotenv
 import plotly.graph_objects as go
 
+from app.db.result_set import ResultSet
 from app.logging_utils import configure_logging
 from app.messages import (
     CLARIFICATION_ACK_PREFIX,
     CLARIFY_REQUEST_MESSAGE,
     DONE_MESSAGE,
     GENERIC_ERROR_MESSAGE,
+    STREAM_STAGE_MESSAGES,
     VIZ_FOLLOWUP_MESSAGE,
 )
-from app.pipeline import invoke_graph_pipeline, run_reviewed_sql
+from app.pipeline import run_reviewed_sql, stream_graph_pipeline
+from app.pipeline.execute_sql import export_sql_csv
+from app.tracing import start_metrics_server
 
 load_dotenv()
+# No-op unless METRICS_PORT is set; started once per process across reruns.
+start_metrics_server()
+
+# Redraw the streamed answer at most this often; each redraw is a websocket
+# message, so drawing every token would slow long answers down.
+_TOKEN_RENDER_INTERVAL_S = 0.05
 
 
 def _msg_id(m: dict) -> str:
     return str(m.get("id") or "noid")
 
 
+def _result_frame(cols, rows) -> pd.DataFrame:
+    if isinstance(rows, ResultSet) and list(rows.columns) == list(cols):
+        return rows.to_frame()
+    return pd.DataFrame(rows, columns=cols) if rows else pd.DataFrame(columns=cols)
+
+
+def _result_csv(df: pd.DataFrame, rows) -> bytes:
+    def _encode() -> bytes:
+        return df.to_csv(index=False).encode("utf-8")
+
+    # Every rerun redraws the whole history; encode each result only once.
+    return rows.memo("csv", _encode) if isinstance(rows, ResultSet) else _encode()
+
+
 def render_plotly(viz: dict, key: str):
     """Render Plotly dict produced by the pipeline."""
     if not viz or viz.get("type") != "plotly":
@@ -36,6 +63,61 @@ def render_plotly(viz: dict, key: str):
         st.warning("Could not render Plotly figure: {}: {}".format(type(e).__name__, e))
 
 
+def _full_csv_export(db_path: str, sql: str):
+    """Deferred download callback: stream the uncapped result to a spooled temp file."""
+
+    def _export():
+        spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode="w+b")
+        text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        export_sql_csv(db_path, sql, text)
+        text.flush()
+        text.detach()
+        spool.seek(0)
+        return spool
+
+    return _export
+
+
+def _stream_turn(db_path: str, question: str, thread_id: str):
+    """
+    Run one graph turn with live feedback: a progress caption, the result
+    table as soon as the query has run, then the answer token by token.
+    The live block is removed once the final (result, prior) pair arrives.
+    """
+    box = st.empty()
+    with box.container():
+        with st.chat_message("assistant"):
+            status = st.empty()
+            table = st.empty()
+            answer = st.empty()
+
+    result, prior = {}, {}
+    text, last_render = "", 0.0
+    for event in stream_graph_pipeline(db_path=db_path, question=question, thread_id=thread_id):
+        kind = event.get("type")
+        if kind == "progress":
+            stage = event.get("stage", "")
+            if stage in STREAM_STAGE_MESSAGES:
+                status.caption(STREAM_STAGE_MESSAGES[stage])
+            if stage == "rows_ready" and event.get("columns"):
+                table.dataframe(
+                    _result_frame(event["columns"], event.get("rows") or []),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+        elif kind == "token":
+            text += event.get("text", "")
+            now = time.monotonic()
+            if now - last_render >= _TOKEN_RENDER_INTERVAL_S:
+                answer.markdown(text + "▌")
+                last_render = now
+        elif kind == "result":
+            result, prior = event.get("result") or {}, event.get("prior") or {}
+
+    box.empty()
+    return result, prior
+
+
 def render_assistant_payload(m: dict, show_debug: bool, show_technical_details: bool, db_path: str):
     """Render assistant extras: SQL, dataframe, download, viz, debug."""
     mid = _msg_id(m)
@@ -79,6 +161,7 @@ def render_assistant_payload(m: dict, show_debug: bool, show_technical_details:
                         "sql": review_result.get("sql"),
                         "columns": review_result.get("columns"),
                         "rows": review_result.get("rows"),
+                        "total_rows": review_result.get("total_rows"),
                         "viz": review_result.get("viz"),
                         "reviewed_from_sql": m["sql"],
                         "review_user": review_result.get("review_user"),
@@ -104,10 +187,10 @@ def render_assistant_payload(m: dict, show_debug: bool, show_technical_details:
     cols = m.get("columns")
     rows = m.get("rows")
     if cols is not None and rows is not None:
-        df = pd.DataFrame(rows, columns=cols) if rows else pd.DataFrame(columns=cols)
+        df = _result_frame(cols, rows)
         st.dataframe(df, use_container_width=True, hide_index=True)
 
-        csv = df.to_csv(index=False).encode("utf-8")
+        csv = _result_csv(df, rows)
         st.download_button(
             "Download CSV",
             data=csv,
@@ -116,6 +199,18 @@ def render_assistant_payload(m: dict, show_debug: bool, show_technical_details:
             key="dl_{}".format(mid),
         )
 
+        total_rows = m.get("total_rows") or 0
+        if m.get("sql") and total_rows > len(rows or []):
+            st.caption("Showing {} of {} rows.".format(len(rows or []), total_rows))
+            st.download_button(
+                "Download full result ({} rows)".format(total_rows),
+                data=_full_csv_export(db_path, m["sql"]),
+                file_name="result_full.csv",
+                mime="text/csv",
+                on_click="ignore",
+                key="dl_full_{}".format(mid),
+            )
+
     # Viz
     if m.get("viz"):
         render_plotly(m["viz"], key="plt_{}".format(mid))
@@ -194,11 +289,7 @@ def main():
     with st.chat_message("user"):
         st.markdown(user_q)
 
-    result, prior = invoke_graph_pipeline(
-        db_path=db_path,
-        question=user_q,
-        thread_id=st.session_state.thread_id,
-    )
+    result, prior = _stream_turn(db_path, user_q, st.session_state.thread_id)
 
     route = result.get("route", "")
 
@@ -231,6 +322,7 @@ def main():
         "sql": result.get("sql") if show_data else None,
         "columns": result.get("columns") if show_data else None,
         "rows": result.get("rows") if show_data else None,
+        "total_rows": result.get("total_rows") if show_data else None,
         "viz": result.get("viz") if show_data else None,
         "result_object": result.get("result_object"),
         "conversation_state": result.get("conversation_state"),
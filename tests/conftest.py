@@ -0,0 +1,16 @@
+import pytest
+
+from app.agents.sql import retrieval
+from app.db import result_store
+
+
+@pytest.fixture(autouse=True)
+def _isolate_state(monkeypatch, tmp_path):
+    # Checkpoints, result handles, corrections, the LLM cache and the
+    # retrieval store default to files under data/; keep test runs out of it.
+    monkeypatch.setenv("CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setenv("RESULT_STORE_PATH", ":memory:")
+    monkeypatch.setenv("CORRECTIONS_DB_PATH", str(tmp_path / "corrections.sqlite"))
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.setattr(retrieval, "_STORE_PATH", tmp_path / "rag_examples.json")
+    monkeypatch.setattr(result_store, "_STORE", None)
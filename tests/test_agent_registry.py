@@ -0,0 +1,51 @@
+from app.agents.shared.registry import get_agent, reset_agents
+from app.llm.factory import get_llm
+
+
+def _use_ollama(monkeypatch, tmp_path, model="llama3.1"):
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    monkeypatch.setenv("LLM_MODEL", model)
+    monkeypatch.setenv("LLM_TEMPERATURE", "0")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+
+
+class _CountingAgent:
+    built = 0
+
+    def __init__(self):
+        type(self).built += 1
+
+
+def test_get_agent_reuses_instance_until_settings_change(monkeypatch, tmp_path):
+    reset_agents()
+    _CountingAgent.built = 0
+    _use_ollama(monkeypatch, tmp_path)
+
+    first = get_agent("sql_agent", _CountingAgent)
+    assert get_agent("sql_agent", _CountingAgent) is first
+    assert _CountingAgent.built == 1
+
+    monkeypatch.setenv("LLM_MODEL", "mistral")
+    assert get_agent("sql_agent", _CountingAgent) is not first
+    assert _CountingAgent.built == 2
+
+
+def test_get_agent_rebuilds_when_factory_is_replaced(monkeypatch, tmp_path):
+    reset_agents()
+    _use_ollama(monkeypatch, tmp_path)
+    stub = object()
+
+    get_agent("viz_agent", _CountingAgent)
+
+    assert get_agent("viz_agent", lambda: stub) is stub
+
+
+def test_get_llm_reuses_client_per_settings_and_agent(monkeypatch, tmp_path):
+    _use_ollama(monkeypatch, tmp_path)
+
+    llm = get_llm(agent="sql_agent")
+
+    assert get_llm(agent="sql_agent") is llm
+    assert get_llm(agent="analysis_agent") is not llm
+    monkeypatch.setenv("LLM_TEMPERATURE", "0.2")
+    assert get_llm(agent="sql_agent") is not llm
@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.db import async_executor
+from app.db.async_executor import run_in_db_executor
+from app.db.sqlite import run_query
+
+_SLOW_SQL = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000000) "
+    "SELECT COUNT(*) FROM n"
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "app.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE clients (client_id INTEGER, segment TEXT)")
+    conn.executemany("INSERT INTO clients VALUES (?, ?)", [(1, "A"), (2, "B")])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor(monkeypatch):
+    monkeypatch.setenv("SQLITE_EXECUTOR_WORKERS", "2")
+    async_executor.shutdown_db_executor()
+    yield
+    async_executor.shutdown_db_executor()
+
+
+def test_run_in_db_executor_runs_queries_on_bounded_pool(db_path):
+    def _count():
+        _columns, rows = run_query(db_path, "SELECT COUNT(*) FROM clients")
+        return threading.current_thread().name, rows[0][0]
+
+    async def _main():
+        return await asyncio.gather(*(run_in_db_executor(_count) for _ in range(6)))
+
+    results = asyncio.run(_main())
+
+    assert {count for _, count in results} == {2}
+    assert len({name for name, _ in results}) <= 2
+    assert all(name.startswith("sqlite") for name, _ in results)
+
+
+def test_timeout_interrupts_running_query_and_frees_worker(db_path):
+    async def _main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(run_in_db_executor(run_query, db_path, _SLOW_SQL), timeout=0.1)
+        started = time.perf_counter()
+        # Both workers must be free again: the interrupted query no longer holds one.
+        counts = await asyncio.gather(
+            run_in_db_executor(run_query, db_path, "SELECT COUNT(*) FROM clients"),
+            run_in_db_executor(run_query, db_path, "SELECT COUNT(*) FROM clients"),
+        )
+        return time.perf_counter() - started, counts
+
+    elapsed, counts = asyncio.run(_main())
+
+    assert elapsed < 1.0
+    assert [rows[0][0] for _, rows in counts] == [2, 2]
@@ -0,0 +1,56 @@
+import copy
+
+from app.llm import factory
+from benchmarks.harness import compare, percentile, run_benchmark
+from benchmarks.synthetic_db import build_synthetic_db
+from benchmarks.workload import WORKLOAD
+
+
+def test_percentile_interpolates_between_samples():
+    assert percentile([], 95) == 0.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 100) == 5.0
+
+
+def test_data_pipeline_benchmark_reports_stages_and_restores_the_llm(tmp_path, monkeypatch):
+    monkeypatch.setenv("CORRECTIONS_DB_PATH", str(tmp_path / "corrections.sqlite"))
+    monkeypatch.setenv("LLM_CACHE", "off")
+    db_path = str(build_synthetic_db(tmp_path / "synthetic.db", clients=50))
+    original_get_llm = factory.get_llm
+
+    report = run_benchmark(
+        "data", db_path=db_path, questions=len(WORKLOAD), threads=2, latency_s=0.0, alloc_questions=2, rounds=1
+    )
+
+    assert factory.get_llm is original_get_llm
+    assert report["routes"] == {"CHAT": 1, "CLARIFY": 1, "DATA": 8}
+    assert report["latency"]["total"]["count"] == len(WORKLOAD)
+    stages = report["latency"]["stages"]
+    assert stages["execute_sql"]["count"] == 8
+    # Six of the eight DATA questions compile from SQL templates without the LLM.
+    assert stages["compile_template_sql"]["count"] == 8
+    assert stages["llm:sql_agent"]["count"] == 2
+    assert report["throughput_qps"] > 0
+    assert compare(report, report) == []
+
+
+def test_compare_flags_latency_throughput_and_config_changes():
+    baseline = {
+        "config": {"questions": 10},
+        "throughput_qps": 50.0,
+        "latency": {
+            "total": {"p95_ms": 100.0},
+            "stages": {"execute_sql": {"p50_ms": 10.0}, "validate_sql": {"p50_ms": 0.1}},
+        },
+        "allocations": {"peak_kib_p50": 200.0},
+    }
+    report = copy.deepcopy(baseline)
+    report["latency"]["total"]["p95_ms"] = 180.0
+    report["latency"]["stages"]["execute_sql"]["p50_ms"] = 30.0
+    report["latency"]["stages"]["validate_sql"]["p50_ms"] = 0.5  # 5x, but below the noise floor
+    report["throughput_qps"] = 20.0
+
+    problems = compare(report, baseline)
+
+    assert [problem.split(" ")[0] for problem in problems] == ["total:", "execute_sql:", "throughput"]
+    assert compare({**report, "config": {"questions": 20}}, baseline)[0].startswith("config differs")
@@ -0,0 +1,195 @@
+import json
+import sqlite3
+import sys
+
+import pytest
+
+from app.db.sqlite import run_query
+from scripts import build_sqlite_db
+from scripts.build_sqlite_db import load_csv, sniff_csv
+
+
+def _write(path, text, encoding="utf-8"):
+    path.write_text(text, encoding=encoding)
+    return path
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    _write(
+        tmp_path / "client.csv",
+        "client_id;segment_client;commune;anciennete_mois;score_client_fragile\n"
+        "1;Premium;Paris;12;0.5\n"
+        "2;Standard;Lyon;;0.25\n"
+        "3;Jeune;Nice;3;\n",
+    )
+    _write(
+        tmp_path / "dossier.csv",
+        "dossier_id,client_id,type_produit,montant,date_dossier\n"
+        "10,1,Carte,1000,2023-01-02\n"
+        "11,2,Pret perso,2500.5,2023-02-03\n",
+    )
+    _write(
+        tmp_path / "transaction.csv",
+        "transaction_id,client_id,dossier_id,montant,categorie_achat,pays,statut_transaction,date_transaction\n"
+        "100,1,10,12.5,Mode,France,acceptee,2023-01-05\n"
+        "101,1,10,30,Voyage,Espagne,refusee,2023-01-06\n"
+        "102,2,11,7.25,Mode,France,acceptee,2023-02-07\n",
+    )
+    return tmp_path
+
+
+def test_sniff_csv_detects_delimiter_and_encoding(tmp_path):
+    assert sniff_csv(_write(tmp_path / "a.csv", "a;b\n1;2\n")) == ("utf-8-sig", ";")
+    assert sniff_csv(_write(tmp_path / "b.csv", "a\tb\n1\t2\n")) == ("utf-8-sig", "\t")
+    assert sniff_csv(_write(tmp_path / "c.csv", "commune,pays\nSète,France\n", "latin1")) == ("latin1", ",")
+    assert sniff_csv(_write(tmp_path / "d.csv", "single\n1\n")) == ("utf-8-sig", ",")
+
+
+def test_load_csv_keeps_types_and_missing_values(tmp_path):
+    path = _write(
+        tmp_path / "clients.csv",
+        "\ufeffclient_id;commune;score;carte\n1;Paris;0.5;True\n2;;;False\n3;Lyon;2;True\n",
+    )
+    con = sqlite3.connect(":memory:")
+
+    assert load_csv(con, "clients", path, chunk_rows=2) == 3
+
+    columns = [(row[1], row[2]) for row in con.execute("PRAGMA table_info(clients)")]
+    assert columns == [("client_id", "INTEGER"), ("commune", "TEXT"), ("score", "REAL"), ("carte", "INTEGER")]
+    assert con.execute("SELECT * FROM clients ORDER BY client_id").fetchall() == [
+        (1, "Paris", 0.5, 1),
+        (2, None, None, 0),
+        (3, "Lyon", 2.0, 1),
+    ]
+
+
+def test_load_csv_falls_back_to_latin1_past_the_sample(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_sqlite_db, "SNIFF_BYTES", 16)
+    path = tmp_path / "clients.csv"
+    path.write_bytes(b"client_id,commune\n1,Paris\n2,Lyon\n3,S\xe8te\n")
+    con = sqlite3.connect(":memory:")
+
+    assert load_csv(con, "clients", path) == 3
+    assert con.execute("SELECT commune FROM clients WHERE client_id = 3").fetchone() == ("Sète",)
+
+
+def _build(csv_dir, monkeypatch, *extra):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "build_sqlite_db.py",
+            "--client_csv", str(csv_dir / "client.csv"),
+            "--dossier_csv", str(csv_dir / "dossier.csv"),
+            "--transaction_csv", str(csv_dir / "transaction.csv"),
+            "--sqlite", str(csv_dir / "statapp.sqlite"),
+            "--out_meta", str(csv_dir / "meta.json"),
+            *extra,
+        ],
+    )
+    build_sqlite_db.main()
+    return json.loads((csv_dir / "meta.json").read_text(encoding="utf-8"))
+
+
+def test_main_builds_tables_indexes_and_metadata(csv_dir, monkeypatch, capsys):
+    meta = _build(csv_dir, monkeypatch)
+
+    assert meta["output"]["row_counts"] == {"clients": 3, "dossiers": 2, "transactions": 3}
+    assert meta["output"]["rollups"]["rollup_transactions_monthly"] > 0
+    assert meta["refresh"] == {
+        "mode": "full",
+        "reloaded": ["clients", "dossiers", "transactions"],
+        "appended": {},
+        "caught_up": {},
+    }
+    with sqlite3.connect(csv_dir / "statapp.sqlite") as con:
+        assert con.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+        indexes = {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_transactions_client_id", "idx_transactions_date_transaction"} <= indexes
+        assert con.execute("SELECT SUM(montant) FROM transactions WHERE client_id = 1").fetchone() == (42.5,)
+    assert "Built DB:" in capsys.readouterr().out
+    assert not (csv_dir / "statapp.sqlite.building").exists()
+
+
+def test_incremental_without_changes_leaves_the_database_alone(csv_dir, monkeypatch, capsys):
+    _build(csv_dir, monkeypatch)
+    before = (csv_dir / "statapp.sqlite").stat()
+
+    _build(csv_dir, monkeypatch, "--incremental")
+
+    after = (csv_dir / "statapp.sqlite").stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert "Up to date" in capsys.readouterr().out
+
+
+def test_incremental_append_swaps_in_new_rows_and_keeps_other_tables(csv_dir, monkeypatch):
+    _build(csv_dir, monkeypatch)
+    db_path = csv_dir / "statapp.sqlite"
+    with sqlite3.connect(db_path) as con:
+        con.execute("CREATE TABLE corrections_log (id INTEGER PRIMARY KEY, corrected_sql TEXT)")
+        con.execute("INSERT INTO corrections_log (corrected_sql) VALUES ('SELECT 1')")
+        con.execute("CREATE INDEX idx_adv_transactions_pays ON transactions (pays, montant)")
+    assert run_query(str(db_path), "SELECT COUNT(*) FROM transactions")[1] == [(3,)]
+    inode = db_path.stat().st_ino
+    with open(csv_dir / "transaction.csv", "a", encoding="utf-8") as handle:
+        handle.write("102,2,11,7.25,Mode,France,acceptee,2023-02-07\n103,3,11,5,Maison,Italie,acceptee,2023-03-01\n")
+
+    meta = _build(csv_dir, monkeypatch, "--incremental", "--append")
+
+    assert meta["refresh"] == {
+        "mode": "incremental",
+        "reloaded": [],
+        "appended": {"transactions": 1},
+        "caught_up": {"corrections_log": 0},
+    }
+    assert db_path.stat().st_ino != inode
+    assert run_query(str(db_path), "SELECT COUNT(*) FROM transactions")[1] == [(4,)]
+    with sqlite3.connect(db_path) as con:
+        assert con.execute("SELECT corrected_sql FROM corrections_log").fetchall() == [("SELECT 1",)]
+        assert con.execute("SELECT nb FROM rollup_transactions_monthly WHERE mois = '2023-03'").fetchall() == [(1,)]
+        indexes = {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_adv_transactions_pays" in indexes
+
+
+def test_incremental_reloads_only_the_changed_table(csv_dir, monkeypatch):
+    _build(csv_dir, monkeypatch)
+    db_path = csv_dir / "statapp.sqlite"
+    with sqlite3.connect(db_path) as con:
+        con.execute("CREATE INDEX idx_adv_clients_commune ON clients (commune)")
+    _write(csv_dir / "client.csv", "client_id;segment_client;commune;anciennete_mois;score_client_fragile\n1;Senior;Lille;40;0.1\n")
+
+    meta = _build(csv_dir, monkeypatch, "--incremental")
+
+    assert meta["refresh"]["reloaded"] == ["clients"]
+    assert meta["output"]["row_counts"] == {"clients": 1, "dossiers": 2, "transactions": 3}
+    with sqlite3.connect(db_path) as con:
+        assert con.execute("SELECT segment_client FROM clients").fetchall() == [("Senior",)]
+        indexes = {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'clients'")}
+    assert "idx_adv_clients_commune" in indexes
+
+
+def test_incremental_keeps_corrections_written_during_the_build(csv_dir, monkeypatch):
+    _build(csv_dir, monkeypatch)
+    db_path = csv_dir / "statapp.sqlite"
+    with sqlite3.connect(db_path) as con:
+        con.execute("CREATE TABLE corrections_log (id INTEGER PRIMARY KEY AUTOINCREMENT, corrected_sql TEXT)")
+        con.execute("INSERT INTO corrections_log (corrected_sql) VALUES ('SELECT 1')")
+    build_rollups = build_sqlite_db.build_rollups
+
+    def _rollups_while_an_expert_saves(con):
+        with sqlite3.connect(db_path) as live:
+            live.execute("INSERT INTO corrections_log (corrected_sql) VALUES ('SELECT 2')")
+        return build_rollups(con)
+
+    monkeypatch.setattr(build_sqlite_db, "build_rollups", _rollups_while_an_expert_saves)
+    _write(csv_dir / "client.csv", "client_id;segment_client;commune;anciennete_mois;score_client_fragile\n1;Senior;Lille;40;0.1\n")
+
+    meta = _build(csv_dir, monkeypatch, "--incremental")
+
+    assert meta["refresh"]["caught_up"] == {"corrections_log": 1}
+    with sqlite3.connect(db_path) as con:
+        assert con.execute("SELECT id, corrected_sql FROM corrections_log ORDER BY id").fetchall() == [
+            (1, "SELECT 1"),
+            (2, "SELECT 2"),
+        ]
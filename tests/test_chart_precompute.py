@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+from app.pipeline import chart_precompute
+from app.pipeline.chart_precompute import alookup_chart, lookup_chart, start_chart
+
+
+def test_lookup_returns_generated_chart_for_matching_type_only():
+    key = start_chart(lambda: {"kind": "fallback"}, lambda fallback: {"kind": "llm", "base": fallback}, "bar chart")
+
+    assert lookup_chart(key, "bar chart") == (True, {"kind": "llm", "base": {"kind": "fallback"}})
+    assert lookup_chart(key, "pie chart") == (False, None)
+    assert lookup_chart("unknown", "bar chart") == (False, None)
+
+
+def test_slow_or_failed_llm_chart_settles_for_deterministic_fallback():
+    release = threading.Event()
+
+    def _slow(fallback):
+        release.wait(5)
+        return {"kind": "llm"}
+
+    def _broken(fallback):
+        raise RuntimeError("model down")
+
+    slow_key = start_chart(lambda: {"kind": "fallback"}, _slow, "bar chart")
+    broken_key = start_chart(lambda: {"kind": "fallback"}, _broken, "bar chart")
+    try:
+        chart_precompute._JOBS[slow_key].fallback_ready.wait(5)
+        assert lookup_chart(slow_key, "bar chart", timeout_s=0.05) == (True, {"kind": "fallback"})
+        assert asyncio.run(alookup_chart(slow_key, "bar chart", timeout_s=0.05)) == (True, {"kind": "fallback"})
+        assert lookup_chart(broken_key, "bar chart") == (True, {"kind": "fallback"})
+    finally:
+        release.set()
+
+    assert asyncio.run(alookup_chart(slow_key, "bar chart")) == (True, {"kind": "llm"})
+
+
+def test_precompute_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("CHART_PRECOMPUTE", "off")
+
+    assert chart_precompute.precompute_enabled() is False
+
+
+def test_queued_and_evicted_jobs_are_cancelled_instead_of_awaited(monkeypatch):
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def _busy(fallback):
+        started.release()
+        release.wait(5)
+        return {"kind": "llm"}
+
+    chart_precompute.clear_precomputed_charts()
+    monkeypatch.setattr(chart_precompute, "_MAX_JOBS", chart_precompute._WORKERS + 1)
+    busy = [start_chart(lambda: None, _busy, "bar chart") for _ in range(chart_precompute._WORKERS)]
+    try:
+        for _ in busy:
+            assert started.acquire(timeout=5)
+        queued = start_chart(lambda: {"kind": "fallback"}, lambda fallback: {"kind": "llm"}, "bar chart")
+        queued_job = chart_precompute._JOBS[queued]
+
+        assert lookup_chart(queued, "bar chart", timeout_s=5) == (False, None)
+        assert queued_job.future.cancelled()
+        assert queued not in chart_precompute._JOBS
+
+        evicted = start_chart(lambda: None, lambda fallback: None, "pie chart")
+        evicted_job = chart_precompute._JOBS[evicted]
+        for _ in range(3):
+            start_chart(lambda: None, lambda fallback: None, "pie chart")
+
+        assert evicted not in chart_precompute._JOBS
+        assert evicted_job.future.cancelled()
+    finally:
+        release.set()
+        chart_precompute.clear_precomputed_charts()
@@ -0,0 +1,114 @@
+import asyncio
+import operator
+import sqlite3
+import time
+from pathlib import Path
+from typing import Annotated, List, TypedDict
+
+from langgraph.graph import END, StateGraph
+
+from app.db.checkpoints import SQLiteCheckpointSaver, build_checkpointer, checkpoint_db_path
+
+
+class _State(TypedDict, total=False):
+    question: str
+    rows: List[List[str]]
+    history: Annotated[List[str], operator.add]
+
+
+def _answer(state):
+    return {"rows": [[state["question"], "x" * 40]] * 50, "history": [state["question"]]}
+
+
+def _compile(saver):
+    workflow = StateGraph(_State)
+    workflow.add_node("answer", _answer)
+    workflow.set_entry_point("answer")
+    workflow.add_edge("answer", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def _config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _count(path, table, thread_id):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+def test_conversation_survives_reopening_the_store(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SQLiteCheckpointSaver(path)
+    _compile(saver).invoke({"question": "first"}, _config("t1"))
+    _compile(saver).invoke({"question": "second"}, _config("t1"))
+    saver.close()
+
+    reopened = SQLiteCheckpointSaver(path)
+    values = _compile(reopened).get_state(_config("t1")).values
+
+    assert values["history"] == ["first", "second"]
+    assert values["rows"][0] == ["second", "x" * 40]
+
+
+def test_retention_keeps_last_checkpoints_and_their_values_only(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SQLiteCheckpointSaver(path, keep_last=3)
+    app = _compile(saver)
+    for turn in range(6):
+        app.invoke({"question": f"q{turn}"}, _config("t1"))
+
+    assert _count(path, "checkpoints", "t1") == 3
+    with sqlite3.connect(path) as conn:
+        types = [row[0] for row in conn.execute("SELECT type FROM checkpoint_blobs WHERE channel = 'rows'")]
+    # Only the row sets the kept checkpoints point to; large ones are compressed.
+    assert 1 <= len(types) <= 2
+    assert all(t.endswith("+zlib") for t in types)
+    assert app.get_state(_config("t1")).values["history"] == [f"q{turn}" for turn in range(6)]
+
+
+def test_prune_expired_deletes_idle_threads_only(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SQLiteCheckpointSaver(path, ttl_s=60)
+    app = _compile(saver)
+    app.invoke({"question": "old"}, _config("idle"))
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE checkpoints SET created_at = ? WHERE thread_id = 'idle'", (time.time() - 120,))
+    app.invoke({"question": "new"}, _config("active"))
+
+    assert saver.prune_expired() == 1
+    assert _count(path, "checkpoints", "idle") == 0
+    assert _count(path, "checkpoint_blobs", "idle") == 0
+    assert app.get_state(_config("idle")).values == {}
+    assert app.get_state(_config("active")).values["history"] == ["new"]
+
+
+def test_async_graph_uses_the_same_store(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    app = _compile(SQLiteCheckpointSaver(path))
+
+    asyncio.run(app.ainvoke({"question": "async"}, _config("t1")))
+    state = asyncio.run(app.aget_state(_config("t1")))
+
+    assert state.values["history"] == ["async"]
+
+
+def test_build_checkpointer_honours_memory_setting(monkeypatch, tmp_path):
+    monkeypatch.setenv("CHECKPOINT_DB_PATH", ":memory:")
+    assert not isinstance(build_checkpointer(), SQLiteCheckpointSaver)
+
+    monkeypatch.setenv("CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setenv("CHECKPOINT_KEEP_LAST", "5")
+    saver = build_checkpointer()
+    assert isinstance(saver, SQLiteCheckpointSaver)
+    assert saver.keep_last == 5
+
+
+def test_default_checkpoint_path_does_not_depend_on_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("CHECKPOINT_DB_PATH", raising=False)
+    monkeypatch.chdir(tmp_path)
+
+    path = Path(checkpoint_db_path())
+
+    assert path.is_absolute()
+    assert path == Path(__file__).resolve().parent.parent / "data" / "checkpoints.sqlite"
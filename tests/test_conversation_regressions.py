@@ -2,6 +2,7 @@ import json
 from pathlib import Path
 
 import pytest
+from langgraph.checkpoint.memory import MemorySaver
 
 from app.agents.guardrails.router import route_message
 from app.agents.guardrails.schemas import GatekeeperResult
@@ -115,7 +116,7 @@ def _install_graph_regression_stubs(
     monkeypatch.setattr(langgraph_flow, "execute_sql", _execute_sql)
     monkeypatch.setattr(langgraph_flow, "fetch_similar_correction", lambda db_path, question: None)
 
-    return langgraph_flow.build_text2sql_graph().compile(checkpointer=langgraph_flow.MemorySaver())
+    return langgraph_flow.build_text2sql_graph().compile(checkpointer=MemorySaver())
 
 
 def _run_graph_case(monkeypatch, case):
@@ -0,0 +1,90 @@
+import sqlite3
+
+from app.db import corrections
+from app.db.corrections import fetch_similar_correction, log_correction
+
+
+def test_fetch_similar_correction_prefers_latest_exact_match(tmp_path):
+    db_path = str(tmp_path / "corrections.sqlite")
+    log_correction(db_path, "Clients by segment", "SELECT 1", "SELECT segment FROM clients")
+    log_correction(db_path, "clients  by SEGMENT", "SELECT 1", "SELECT segment_client FROM clients")
+
+    assert fetch_similar_correction(db_path, "clients by segment") == "SELECT segment_client FROM clients"
+
+
+def test_fetch_similar_correction_matches_rephrased_question_only_above_threshold(tmp_path):
+    db_path = str(tmp_path / "corrections.sqlite")
+    log_correction(db_path, "average transaction amount by client segment", "SELECT 1", "SELECT AVG(montant)")
+
+    assert fetch_similar_correction(db_path, "average transaction amount per client segment") == "SELECT AVG(montant)"
+    assert fetch_similar_correction(db_path, "number of incidents by commune") is None
+
+
+def test_correction_index_picks_up_rows_written_by_other_connections(tmp_path):
+    db_path = str(tmp_path / "corrections.sqlite")
+    log_correction(db_path, "clients by commune", "SELECT 1", "SELECT commune FROM clients")
+    assert fetch_similar_correction(db_path, "loyalty cards by pays") is None
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO corrections_log (question, normalized_question, generated_sql, corrected_sql, timestamp) "
+        "VALUES (?, ?, ?, ?, '2099-01-01 00:00:00')",
+        ("loyalty cards by pays", "loyalty cards by pays", "SELECT 1", "SELECT pays FROM cartes"),
+    )
+    conn.commit()
+    conn.close()
+
+    assert fetch_similar_correction(db_path, "loyalty cards by pays") == "SELECT pays FROM cartes"
+    index = corrections._INDEXES[str((tmp_path / "corrections.sqlite").resolve())]
+    assert len(index.entries) == 2
+
+
+def test_legacy_corrections_table_is_migrated_once(tmp_path, monkeypatch):
+    monkeypatch.delenv("CORRECTIONS_DB_PATH")
+    db_path = str(tmp_path / "legacy.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE corrections_log (id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT NOT NULL, "
+        "generated_sql TEXT NOT NULL, corrected_sql TEXT NOT NULL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, user TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO corrections_log (question, generated_sql, corrected_sql) VALUES ('Clients by commune', 'x', 'SELECT commune')"
+    )
+    conn.commit()
+    conn.close()
+
+    calls = []
+    monkeypatch.setattr(
+        corrections,
+        "_MIGRATIONS",
+        tuple(lambda cur, step=step: (calls.append(step.__name__), step(cur)) for step in corrections._MIGRATIONS),
+    )
+
+    assert fetch_similar_correction(db_path, "clients by commune") == "SELECT commune"
+    log_correction(db_path, "clients by segment", "x", "SELECT segment")
+    assert fetch_similar_correction(db_path, "clients by segment") == "SELECT segment"
+
+    assert calls == ["_create_corrections_log", "_index_normalized_question"]
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    conn.close()
+
+
+def test_corrections_can_live_in_separate_wal_store(tmp_path, monkeypatch):
+    analytics_path = tmp_path / "analytics.sqlite"
+    conn = sqlite3.connect(analytics_path)
+    conn.execute("CREATE TABLE clients (client_id INTEGER)")
+    conn.commit()
+    conn.close()
+    store_path = tmp_path / "corrections.sqlite"
+    monkeypatch.setenv("CORRECTIONS_DB_PATH", str(store_path))
+
+    log_correction(str(analytics_path), "clients by commune", "x", "SELECT commune")
+
+    assert fetch_similar_correction(str(analytics_path), "clients by commune") == "SELECT commune"
+    conn = sqlite3.connect(store_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    conn = sqlite3.connect(analytics_path)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'corrections_log'").fetchone() is None
+    conn.close()
@@ -64,7 +64,7 @@ def _patch_pipeline(
     monkeypatch.setattr(
         data_pipeline,
         "format_response_dict",
-        lambda columns, rows: {
+        lambda columns, rows, **kwargs: {
             "text": "Fallback text",
             "table": "table",
             "preview_rows": rows,
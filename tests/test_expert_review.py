@@ -16,7 +16,7 @@ def test_run_reviewed_sql_executes_and_logs_correction(monkeypatch):
     monkeypatch.setattr(
         expert_review,
         "format_response_dict",
-        lambda columns, rows: {
+        lambda columns, rows, **kwargs: {
             "text": "Results: 2 rows. Preview: 2 rows.",
             "table": "table",
             "preview_rows": rows,
@@ -61,7 +61,7 @@ def test_run_reviewed_sql_skips_correction_log_when_sql_is_unchanged(monkeypatch
     monkeypatch.setattr(
         expert_review,
         "format_response_dict",
-        lambda columns, rows: {
+        lambda columns, rows, **kwargs: {
             "text": "Results: 1 rows. Preview: 1 rows.",
             "table": "table",
             "preview_rows": rows,
@@ -39,3 +39,12 @@ def test_with_plot_suggestion_is_idempotent():
 
     assert once == twice
     assert "I can plot this data for you" in once
+
+
+def test_format_response_reports_total_rows_of_capped_result():
+    rows = [[f"commune_{i}", i] for i in range(200)]
+
+    result = format_response(["commune", "count"], rows, max_preview_rows=20, total_rows=5000)
+
+    assert result.total_rows == 5000
+    assert "first 20 rows out of 5000" in result.text
@@ -1,4 +1,12 @@
-from app.agents.guardrails.gatekeeper import gatekeep, is_unsafe_user_input
+import re
+
+from app.agents.guardrails.gatekeeper import (
+    FORBIDDEN_INPUT_PATTERNS,
+    PII_PATTERN,
+    SQL_LIKE_START,
+    gatekeep,
+    is_unsafe_user_input,
+)
 from app.agents.guardrails.router import route_message
 
 
@@ -9,6 +17,27 @@ def test_gatekeep_blocks_sql_like_input():
     assert result.parsed_intent == "unsafe_sql_or_injection"
 
 
+def test_exported_patterns_agree_with_the_checks():
+    samples = [
+        "drop the clients table",
+        "clients; rm",
+        "clients -- note",
+        "/* hint */ clients",
+        "select the best segment",
+        "detach the archive",
+        "count clients by nom",
+        "How many clients by segment?",
+        "Clients updated in 2024",
+    ]
+    for text in samples:
+        regex_unsafe = re.search(SQL_LIKE_START, text, re.IGNORECASE) is not None or any(
+            re.search(pattern, text, re.IGNORECASE) for pattern in FORBIDDEN_INPUT_PATTERNS
+        )
+        assert regex_unsafe == is_unsafe_user_input(text), text
+        regex_pii = re.search(PII_PATTERN, text, re.IGNORECASE) is not None
+        assert regex_pii == (gatekeep(text).parsed_intent == "pii_request"), text
+
+
 def test_gatekeep_blocks_pii_requests():
     result = gatekeep("Show nom and prenom for all clients")
 
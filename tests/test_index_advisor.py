@@ -0,0 +1,100 @@
+import json
+import sqlite3
+
+import pytest
+
+from benchmarks.synthetic_db import build_synthetic_db
+from scripts.index_advisor import advise, apply_proposals, explain, load_workload, plan_problems
+
+_MONTHLY = (
+    "SELECT strftime('%Y-%m', date_transaction) AS mois, COUNT(*) AS nb "
+    "FROM transactions GROUP BY mois ORDER BY mois"
+)
+_REFUSED = (
+    "SELECT client_id, SUM(montant) AS total FROM transactions "
+    "WHERE statut_transaction = 'refusee' GROUP BY client_id"
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(build_synthetic_db(tmp_path / "synthetic.db", clients=200))
+
+
+def _write_log(path, statements):
+    lines = ["2026-01-01 10:00:00 INFO app.pipeline.langgraph_flow not json"]
+    for event, sql in statements:
+        lines.append("2026-01-01 10:00:00 INFO app.pipeline " + json.dumps({"event": event, "sql": sql, "row_count": 1}))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def _plan(db_path, sql):
+    with sqlite3.connect(db_path) as con:
+        return explain(con, sql)
+
+
+def test_load_workload_counts_logged_and_corrected_sql(db_path, tmp_path):
+    log = _write_log(
+        tmp_path / "app.log",
+        [
+            ("graph.sql_executed", _MONTHLY),
+            ("sql.executed", "  " + _MONTHLY.replace(" FROM", "\n FROM") + ";"),
+            ("graph.sql_executed", "DELETE FROM clients"),
+            ("graph.route", _REFUSED),
+        ],
+    )
+    with sqlite3.connect(db_path) as con:
+        con.execute(
+            "CREATE TABLE corrections_log (id INTEGER PRIMARY KEY, question TEXT, normalized_question TEXT, "
+            "generated_sql TEXT, corrected_sql TEXT, timestamp TEXT, user TEXT)"
+        )
+        con.execute("INSERT INTO corrections_log (corrected_sql) VALUES (?)", (_REFUSED,))
+
+    workload = load_workload([log], db_path)
+
+    assert workload == {_MONTHLY: 2, _REFUSED: 1}
+
+
+def test_advise_proposes_indexes_that_remove_scans_and_sorts(db_path, tmp_path):
+    log = _write_log(tmp_path / "app.log", [("graph.sql_executed", _MONTHLY)] * 3 + [("sql.executed", _REFUSED)])
+    workload = load_workload([log], None)
+    assert plan_problems(_plan(db_path, _MONTHLY))
+
+    proposals, unresolved = advise(db_path, workload)
+
+    assert not unresolved
+    assert [proposal.executions for proposal in proposals] == [3, 1]
+    monthly, refused = proposals
+    assert monthly.terms[0] == "strftime('%Y-%m', date_transaction)"
+    assert "USE TEMP B-TREE FOR GROUP BY" in monthly.fixes
+    assert refused.terms[:2] == ["statut_transaction", "client_id"]
+
+    apply_proposals(db_path, proposals)
+
+    for sql in workload:
+        details = _plan(db_path, sql)
+        assert not [detail for detail in details if detail.startswith("SCAN ") and "COVERING INDEX" not in detail]
+        assert "USE TEMP B-TREE FOR GROUP BY" not in details
+    assert advise(db_path, workload)[0] == []
+
+
+def test_advise_reports_queries_no_index_can_help(db_path):
+    proposals, unresolved = advise(db_path, {"SELECT * FROM clients": 1})
+
+    assert proposals == []
+    assert unresolved == {"SELECT * FROM clients": ["SCAN clients"]}
+
+
+def test_advise_folds_prefix_indexes_into_the_widest_one(db_path):
+    workload = {
+        "SELECT segment_client, COUNT(*) AS nb FROM clients GROUP BY segment_client": 3,
+        "SELECT segment_client, AVG(anciennete_mois) FROM clients GROUP BY segment_client": 2,
+    }
+
+    proposals, _unresolved = advise(db_path, workload)
+
+    clients = [proposal for proposal in proposals if proposal.table == "clients"]
+    assert [proposal.terms for proposal in clients] == [["segment_client", "anciennete_mois"]]
+    assert clients[0].executions == 5
+    assert sorted(clients[0].queries) == sorted(workload)
@@ -1,5 +1,13 @@
+import asyncio
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langgraph.checkpoint.memory import MemorySaver
+
 from app.agents.guardrails.schemas import GatekeeperResult
-from app.pipeline import langgraph_flow
+from app.pipeline import langgraph_flow, speculative_sql
 
 
 class _StubGuardrailsAgent:
@@ -160,10 +168,11 @@ def _install_graph_stubs(
 
 def _build_test_graph_app():
     workflow = langgraph_flow.build_text2sql_graph()
-    return workflow.compile(checkpointer=langgraph_flow.MemorySaver())
+    return workflow.compile(checkpointer=MemorySaver())
 
 
-def test_invoke_graph_pipeline_returns_data_payload(monkeypatch):
+def test_invoke_graph_pipeline_returns_data_payload(monkeypatch, tmp_path):
+    monkeypatch.setenv("CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
     monkeypatch.setattr(langgraph_flow, "_app_instance", None)
     monkeypatch.setattr(langgraph_flow, "_memory_instance", None)
     monkeypatch.setattr(langgraph_flow, "GuardrailsAgent", lambda: _StubGuardrailsAgent())
@@ -185,7 +194,7 @@ def test_invoke_graph_pipeline_returns_data_payload(monkeypatch):
     monkeypatch.setattr(
         langgraph_flow,
         "format_response_dict",
-        lambda columns, rows: {
+        lambda columns, rows, **kwargs: {
             "text": "Fallback text",
             "table": "table",
             "preview_rows": rows,
@@ -209,7 +218,8 @@ def test_invoke_graph_pipeline_returns_data_payload(monkeypatch):
     assert result["answer_text"].startswith("Fallback text")
 
 
-def test_get_graph_app_returns_singleton(monkeypatch):
+def test_get_graph_app_returns_singleton(monkeypatch, tmp_path):
+    monkeypatch.setenv("CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
     monkeypatch.setattr(langgraph_flow, "_app_instance", None)
     monkeypatch.setattr(langgraph_flow, "_memory_instance", None)
     monkeypatch.setattr(langgraph_flow, "GuardrailsAgent", lambda: _StubGuardrailsAgent())
@@ -227,7 +237,7 @@ def test_get_graph_app_returns_singleton(monkeypatch):
     monkeypatch.setattr(
         langgraph_flow,
         "format_response_dict",
-        lambda columns, rows: {
+        lambda columns, rows, **kwargs: {
             "text": "Fallback text",
             "table": "table",
             "preview_rows": rows,
@@ -380,8 +390,81 @@ def test_invoke_graph_pipeline_routes_viz_followup_without_requerying_sql(monkey
     assert "bar chart" in second_result["answer_text"]
     assert len(patched["sql_agent"].calls) == 1
     assert len(patched["guardrails_agent"].seen_questions) == 1
-    assert "plot a bar chart" in patched["viz_agent"].calls[0]["question"]
+    # The chart was generated in the background during the first turn.
+    assert len(patched["viz_agent"].calls) == 1
     assert "How many clients by segment?" in patched["viz_agent"].calls[0]["question"]
+    assert first_result["result_object"]["chart_key"]
+
+
+def test_viz_followup_for_another_chart_type_skips_precomputed_chart(monkeypatch):
+    patched = _install_graph_stubs(
+        monkeypatch,
+        guardrails_agent=_SequenceGuardrailsAgent(
+            GatekeeperResult(status="READY_FOR_SQL", parsed_intent="sql_query", notes="Allowed")
+        ),
+        sql_agent=_RecordingSQLAgent("SELECT segment, COUNT(*) AS count FROM clients GROUP BY segment"),
+        viz_agent=_RecordingVizAgent({"kind": "pie"}),
+    )
+    graph_app = _build_test_graph_app()
+
+    langgraph_flow.invoke_graph_pipeline(
+        db_path="data/statapp.sqlite",
+        question="How many clients by segment?",
+        thread_id="viz-followup-pie",
+        graph_app=graph_app,
+    )
+    second_result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path="data/statapp.sqlite",
+        question="show me a pie chart",
+        thread_id="viz-followup-pie",
+        graph_app=graph_app,
+    )
+
+    assert second_result["route"] == "VIZ_FOLLOWUP"
+    assert len(patched["viz_agent"].calls) == 2
+    assert "show me a pie chart" in patched["viz_agent"].calls[1]["question"]
+
+
+def test_checkpoint_keeps_result_handle_and_viz_followup_resolves_full_rows(monkeypatch):
+    monkeypatch.setenv("CHART_PRECOMPUTE", "off")
+    rows = [["20{}-{:02d}".format(22 + i // 12, i % 12 + 1), i] for i in range(30)]
+    patched = _install_graph_stubs(
+        monkeypatch,
+        guardrails_agent=_SequenceGuardrailsAgent(
+            GatekeeperResult(status="READY_FOR_SQL", parsed_intent="sql_query", notes="Allowed")
+        ),
+        sql_agent=_RecordingSQLAgent("SELECT month, COUNT(*) AS count FROM transactions GROUP BY month"),
+        viz_agent=_RecordingVizAgent({"kind": "line"}),
+        execute_results=[{"ok": True, "columns": ["month", "count"], "rows": rows}],
+    )
+    graph_app = _build_test_graph_app()
+    config = {"configurable": {"thread_id": "result-handle"}}
+
+    first_result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path="data/statapp.sqlite",
+        question="How many transactions per month?",
+        thread_id="result-handle",
+        graph_app=graph_app,
+    )
+    stored = graph_app.get_state(config).values
+
+    assert first_result["rows"] == rows
+    assert "rows" not in stored
+    assert stored["result_handle"] == stored["result_object"]["result_handle"]
+    assert len(stored["result_object"]["rows"]) == 20
+    assert stored["result_object"]["row_count"] == 30
+    assert len(stored["conversation_state"]["last_chartable_result"]["rows"]) == 20
+
+    second_result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path="data/statapp.sqlite",
+        question="plot it",
+        thread_id="result-handle",
+        graph_app=graph_app,
+    )
+
+    assert second_result["route"] == "VIZ_FOLLOWUP"
+    assert patched["viz_agent"].calls[0]["rows"] == rows
+    assert second_result["rows"] == rows
 
 
 def test_invoke_graph_pipeline_returns_viz_no_data_when_visualization_cannot_be_built(monkeypatch):
@@ -727,3 +810,304 @@ def test_invoke_graph_pipeline_resets_context(monkeypatch):
     assert "cleared the current analysis context" in reset_result["answer_text"]
     assert third_result["route"] == "DATA"
     assert len(patched["sql_agent"].calls) == 2
+
+
+class _AsyncSQLAgent(_RecordingSQLAgent):
+    def __init__(self, *sql_values, delay_s: float = 0.0):
+        super().__init__(*sql_values)
+        self.delay_s = delay_s
+        self.async_calls = 0
+
+    async def agenerate_sql(self, question: str, schema_text: str) -> str:
+        self.async_calls += 1
+        await asyncio.sleep(self.delay_s)
+        return self.generate_sql(question, schema_text)
+
+
+def test_ainvoke_graph_pipeline_matches_sync_run_and_keeps_memory(monkeypatch):
+    patched = _install_graph_stubs(
+        monkeypatch,
+        guardrails_agent=_SequenceGuardrailsAgent(
+            GatekeeperResult(status="READY_FOR_SQL", parsed_intent="sql_query", notes="Allowed")
+        ),
+        sql_agent=_RecordingSQLAgent("BROKEN SQL"),
+        error_agent=_RecordingErrorAgent("SELECT commune, COUNT(*) AS count FROM clients GROUP BY commune"),
+        validate_results=[(False, "Only SELECT queries are allowed."), (True, "OKAY")],
+        execute_results=[
+            {"ok": True, "columns": ["commune", "count"], "rows": [["A", 3], ["B", 2]]}
+        ],
+    )
+    graph_app = _build_test_graph_app()
+
+    result, prior = asyncio.run(
+        langgraph_flow.ainvoke_graph_pipeline(
+            db_path="data/statapp.sqlite",
+            question="How many clients by commune?",
+            thread_id="async-repair",
+            graph_app=graph_app,
+        )
+    )
+    _, second_prior = asyncio.run(
+        langgraph_flow.ainvoke_graph_pipeline(
+            db_path="data/statapp.sqlite",
+            question="hello",
+            thread_id="async-repair",
+            graph_app=graph_app,
+        )
+    )
+
+    assert prior == {}
+    assert result["route"] == "DATA"
+    assert [attempt["stage"] for attempt in result["attempts"]] == ["validation", "repair", "execution"]
+    assert patched["error_agent"].calls[0]["failed_sql"] == "BROKEN SQL"
+    assert second_prior["sql"].startswith("SELECT commune")
+
+
+def test_ainvoke_graph_pipeline_awaits_native_async_agents_and_times_out(monkeypatch):
+    sql_agent = _AsyncSQLAgent("SELECT segment FROM clients", delay_s=5.0)
+    _install_graph_stubs(
+        monkeypatch,
+        guardrails_agent=_SequenceGuardrailsAgent(
+            GatekeeperResult(status="READY_FOR_SQL", parsed_intent="sql_query", notes="Allowed")
+        ),
+        sql_agent=sql_agent,
+    )
+    graph_app = _build_test_graph_app()
+
+    started = time.perf_counter()
+    result, _ = asyncio.run(
+        langgraph_flow.ainvoke_graph_pipeline(
+            db_path="data/statapp.sqlite",
+            question="How many clients by segment?",
+            thread_id="async-timeout",
+            graph_app=graph_app,
+            timeout_s=0.2,
+        )
+    )
+
+    assert time.perf_counter() - started < 2.0
+    assert result["route"] == "ERROR"
+    assert "cancelled" in result["answer_text"]
+    assert sql_agent.async_calls == 1
+    assert sql_agent.calls == []
+
+
+def _install_speculative_memory(monkeypatch, sql_agent, execute_results=None):
+    monkeypatch.setenv("SPECULATIVE_SQL", "on")
+    _install_graph_stubs(
+        monkeypatch,
+        guardrails_agent=_SequenceGuardrailsAgent(
+            GatekeeperResult(status="READY_FOR_SQL", parsed_intent="sql_query", notes="Allowed")
+        ),
+        sql_agent=sql_agent,
+        execute_results=execute_results,
+    )
+    monkeypatch.setattr(
+        langgraph_flow,
+        "fetch_similar_correction",
+        lambda db_path, question: "SELECT segment, COUNT(*) AS count FROM clients GROUP BY segment",
+    )
+    return _build_test_graph_app()
+
+
+def test_speculative_llm_sql_is_reused_when_memory_sql_fails(monkeypatch):
+    sql_agent = _RecordingSQLAgent("SELECT segment, COUNT(*) AS n FROM clients GROUP BY segment")
+    graph_app = _install_speculative_memory(
+        monkeypatch,
+        sql_agent,
+        execute_results=[
+            {"ok": False, "error": "no such column: segment"},
+            {"ok": True, "columns": ["segment", "n"], "rows": [["A", 3]]},
+        ],
+    )
+
+    result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path="data/statapp.sqlite",
+        question="How many clients by segment?",
+        thread_id="speculative-fallback",
+        graph_app=graph_app,
+    )
+
+    assert result["route"] == "DATA"
+    assert result["sql_source"] == "llm"
+    assert result["sql"].endswith("AS n FROM clients GROUP BY segment")
+    assert len(sql_agent.calls) == 1
+    assert speculative_sql._PENDING == {}
+
+
+def test_speculative_llm_call_is_cancelled_when_memory_sql_succeeds(monkeypatch):
+    sql_agent = _AsyncSQLAgent("SELECT never_used FROM clients", delay_s=5.0)
+    graph_app = _install_speculative_memory(monkeypatch, sql_agent)
+
+    started = time.perf_counter()
+    result, _ = asyncio.run(
+        langgraph_flow.ainvoke_graph_pipeline(
+            db_path="data/statapp.sqlite",
+            question="How many clients by segment?",
+            thread_id="speculative-memory-wins",
+            graph_app=graph_app,
+        )
+    )
+
+    assert time.perf_counter() - started < 2.0
+    assert result["sql_source"] == "expert_memory"
+    assert result["speculative_sql_key"] == ""
+    assert sql_agent.async_calls == 1
+    assert sql_agent.calls == []
+    assert speculative_sql._PENDING == {}
+
+
+class _ChainAnalysisAgent:
+    """Analysis stub backed by a real (fake-model) chain, so its tokens can be streamed."""
+
+    def __init__(self, answer_text: str):
+        model = FakeListChatModel(responses=[answer_text])
+        self.chain = ChatPromptTemplate.from_messages([("human", "{question}")]) | model | StrOutputParser()
+
+    def summarize(self, question, sql, columns, rows, fallback_text):
+        return self.chain.invoke({"question": question})
+
+    async def asummarize(self, question, sql, columns, rows, fallback_text):
+        return await self.chain.ainvoke({"question": question})
+
+
+def _install_streaming_stubs(monkeypatch):
+    _install_graph_stubs(
+        monkeypatch,
+        guardrails_agent=_SequenceGuardrailsAgent(
+            GatekeeperResult(status="READY_FOR_SQL", parsed_intent="sql_query", notes="Allowed")
+        ),
+        sql_agent=_RecordingSQLAgent("SELECT segment, commune, COUNT(*) AS n FROM clients GROUP BY 1, 2"),
+        analysis_agent=_ChainAnalysisAgent("Segment B leads in Y."),
+        execute_results=[
+            {"ok": True, "columns": ["segment", "commune", "n"], "rows": [["A", "X", 3], ["B", "Y", 5]]}
+        ],
+    )
+    return _build_test_graph_app()
+
+
+def _assert_streamed_turn(events):
+    stages = [event.get("stage") for event in events if event["type"] == "progress"]
+    kinds = [event["type"] for event in events]
+    rows_at = next(i for i, e in enumerate(events) if e.get("stage") == "rows_ready")
+
+    assert stages[:4] == ["context_resolved", "guardrails_decided", "sql_ready", "rows_ready"]
+    assert events[rows_at]["rows"] == [["A", "X", 3], ["B", "Y", 5]]
+    assert rows_at < kinds.index("token")
+    assert "".join(e["text"] for e in events if e["type"] == "token") == "Segment B leads in Y."
+    assert kinds[-1] == "result" and kinds.count("result") == 1
+    result = events[-1]["result"]
+    assert result["route"] == "DATA"
+    assert result["answer_text"].startswith("Segment B leads in Y.")
+
+
+def test_stream_graph_pipeline_yields_rows_before_answer_tokens(monkeypatch):
+    graph_app = _install_streaming_stubs(monkeypatch)
+
+    events = list(
+        langgraph_flow.stream_graph_pipeline(
+            db_path="data/statapp.sqlite",
+            question="How many clients by segment and commune?",
+            thread_id="stream-sync",
+            graph_app=graph_app,
+        )
+    )
+
+    _assert_streamed_turn(events)
+    assert events[-1]["prior"] == {}
+
+
+def test_astream_graph_pipeline_yields_rows_before_answer_tokens(monkeypatch):
+    graph_app = _install_streaming_stubs(monkeypatch)
+
+    async def _collect():
+        return [
+            event
+            async for event in langgraph_flow.astream_graph_pipeline(
+                db_path="data/statapp.sqlite",
+                question="How many clients by segment and commune?",
+                thread_id="stream-async",
+                graph_app=graph_app,
+            )
+        ]
+
+    _assert_streamed_turn(asyncio.run(_collect()))
+
+
+def test_template_sql_skips_the_llm_and_falls_back_when_it_fails(monkeypatch):
+    template = "SELECT segment_client, COUNT(*) AS nb FROM clients GROUP BY segment_client"
+    sql_agent = _RecordingSQLAgent("SELECT segment, COUNT(*) AS n FROM clients GROUP BY segment")
+    _install_graph_stubs(
+        monkeypatch,
+        guardrails_agent=_StubGuardrailsAgent(),
+        sql_agent=sql_agent,
+        execute_results=[
+            {"ok": True, "columns": ["segment_client", "nb"], "rows": [["A", 3]]},
+            {"ok": False, "error": "no such column: segment_client"},
+            {"ok": True, "columns": ["segment", "n"], "rows": [["A", 3]]},
+        ],
+    )
+    monkeypatch.setattr(langgraph_flow, "compile_request_sql", lambda db_path, request: template)
+    graph_app = _build_test_graph_app()
+
+    result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path="data/statapp.sqlite",
+        question="How many clients by segment?",
+        thread_id="template-hit",
+        graph_app=graph_app,
+    )
+    assert result["sql_source"] == "template"
+    assert result["sql"] == template
+    assert sql_agent.calls == []
+
+    result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path="data/statapp.sqlite",
+        question="How many clients by segment?",
+        thread_id="template-fallback",
+        graph_app=graph_app,
+    )
+    assert result["route"] == "DATA"
+    assert result["sql_source"] == "llm"
+    assert result["sql"].endswith("AS n FROM clients GROUP BY segment")
+    assert len(sql_agent.calls) == 1
+
+
+def test_graph_compiles_templates_from_the_original_question(monkeypatch, tmp_path):
+    from benchmarks.synthetic_db import build_synthetic_db
+
+    db_path = str(build_synthetic_db(tmp_path / "synthetic.db", clients=50))
+    sql_agent = _RecordingSQLAgent("SELECT pays, COUNT(*) AS nb FROM transactions WHERE date_transaction LIKE '2024%' GROUP BY pays")
+    monkeypatch.setenv("CORRECTIONS_DB_PATH", str(tmp_path / "corrections.sqlite"))
+    monkeypatch.setattr(langgraph_flow, "GuardrailsAgent", lambda: _StubGuardrailsAgent())
+    monkeypatch.setattr(langgraph_flow, "SQLAgent", lambda: sql_agent)
+    monkeypatch.setattr(langgraph_flow, "ErrorAgent", lambda: _StubErrorAgent())
+    monkeypatch.setattr(langgraph_flow, "AnalysisAgent", lambda: _StubAnalysisAgent())
+    monkeypatch.setattr(langgraph_flow, "VizAgent", lambda: _StubVizAgent())
+    graph_app = _build_test_graph_app()
+
+    result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path=db_path,
+        question="How many transactions by month in 2024?",
+        thread_id="template-real-schema",
+        graph_app=graph_app,
+    )
+
+    assert result["route"] == "DATA"
+    assert result["sql_source"] == "template"
+    assert result["sql"] == (
+        "SELECT strftime('%Y-%m', date_transaction) AS mois, COUNT(*) AS nb FROM transactions "
+        "WHERE strftime('%Y', date_transaction) = '2024' GROUP BY mois ORDER BY mois"
+    )
+    assert result["rows"]
+    assert sql_agent.calls == []
+
+    # The follow-up inherits the 2024 time reference its own words do not mention.
+    result, _ = langgraph_flow.invoke_graph_pipeline(
+        db_path=db_path,
+        question="How many transactions by country?",
+        thread_id="template-real-schema",
+        graph_app=graph_app,
+    )
+
+    assert result["sql_source"] == "llm"
+    assert len(sql_agent.calls) == 1
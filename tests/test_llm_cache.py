@@ -0,0 +1,75 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.llm import cache as llm_cache
+from app.llm.cache import DiskLLMStore, cache_for, llm_cache_stats, reset_llm_cache_stats
+
+
+def _chain(model):
+    return ChatPromptTemplate.from_messages([("human", "{question}")]) | model | StrOutputParser()
+
+
+def test_cache_serves_repeated_prompts_and_counts_hits_per_agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    reset_llm_cache_stats()
+    model = FakeListChatModel(responses=["first", "second"], cache=cache_for("ollama", "llama3.1", 0.0, "sql_agent"))
+    chain = _chain(model)
+
+    assert chain.invoke({"question": "clients by segment"}) == "first"
+    assert chain.invoke({"question": "clients by segment"}) == "first"
+    assert chain.invoke({"question": "clients by commune"}) == "second"
+
+    assert llm_cache_stats()["sql_agent"] == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+
+def test_cache_is_keyed_on_model_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    warm = FakeListChatModel(responses=["cached"], cache=cache_for("ollama", "llama3.1", 0.0, "sql_agent"))
+    _chain(warm).invoke({"question": "q"})
+
+    other_model = FakeListChatModel(responses=["fresh"], cache=cache_for("ollama", "mistral", 0.0, "sql_agent"))
+
+    assert _chain(other_model).invoke({"question": "q"}) == "fresh"
+
+
+def test_cache_is_automatic_only_at_temperature_zero(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+
+    assert cache_for("openai", "gpt-4o-mini", 0.0, "analysis_agent") is not None
+    assert cache_for("openai", "gpt-4o-mini", 0.7, "analysis_agent") is None
+
+    monkeypatch.setenv("LLM_CACHE", "on")
+    assert cache_for("openai", "gpt-4o-mini", 0.7, "analysis_agent") is not None
+    monkeypatch.setenv("LLM_CACHE", "off")
+    assert cache_for("openai", "gpt-4o-mini", 0.0, "analysis_agent") is None
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    store = DiskLLMStore(tmp_path / "llm_cache.sqlite", max_entries=2)
+    store.put("a", "p", "m", "[]")
+    store.put("b", "p", "m", "[]")
+    assert store.get("a") == "[]"
+
+    store.put("c", "p", "m", "[]")
+
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") == "[]"
+
+
+def test_get_llm_attaches_agent_cache(monkeypatch, tmp_path):
+    from app.llm.factory import get_llm
+
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    monkeypatch.setenv("LLM_MODEL", "llama3.1")
+    monkeypatch.setenv("LLM_TEMPERATURE", "0")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+
+    llm = get_llm(agent="viz_agent")
+
+    assert isinstance(llm.cache, llm_cache.AgentLLMCache)
+    assert llm.cache.agent == "viz_agent"
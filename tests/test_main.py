@@ -0,0 +1,83 @@
+import io
+import json
+import threading
+
+import pytest
+
+from app import main as cli
+
+
+class _RecordingPipeline:
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, *, db_path, question, thread_id, graph_app=None):
+        with self._lock:
+            self.calls.append((thread_id, question, graph_app))
+        if question in self.fail_on:
+            raise RuntimeError("boom")
+        return {"route": "DATA", "answer_text": question.upper()}, {}
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    recorder = _RecordingPipeline(fail_on={"explode"})
+    compiled = []
+    monkeypatch.setattr(cli, "invoke_graph_pipeline", recorder)
+    monkeypatch.setattr(cli, "get_graph_app", lambda: compiled.append("app") or "compiled-app")
+    recorder.compiled = compiled
+    return recorder
+
+
+def test_batch_jsonl_reuses_one_graph_and_keeps_conversations_in_order(tmp_path, pipeline):
+    path = tmp_path / "questions.jsonl"
+    path.write_text(
+        "\n".join(
+            [
+                json.dumps({"id": "a", "question": "top 5 communes in 2024", "thread_id": "conv"}),
+                json.dumps("clients by segment"),
+                "",
+                json.dumps({"id": "b", "question": "plot it", "thread_id": "conv"}),
+            ]
+        ),
+        encoding="utf-8",
+    )
+    out = io.StringIO()
+
+    errors = cli.run_batch(cli.read_batch(str(path)), db_path="db.sqlite", workers=3, out=out)
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert errors == 0
+    assert pipeline.compiled == ["app"]
+    assert {graph_app for _, _, graph_app in pipeline.calls} == {"compiled-app"}
+    assert sorted(r["index"] for r in records) == [0, 1, 2]
+    conv = [call[1] for call in pipeline.calls if call[0] == "conv"]
+    assert conv == ["top 5 communes in 2024", "plot it"]
+    by_index = {r["index"]: r for r in records}
+    assert by_index[1]["thread_id"].startswith("batch-")
+    assert by_index[2]["result"]["answer_text"] == "PLOT IT"
+    assert all(r["elapsed_ms"] >= 0 for r in records)
+
+
+def test_batch_csv_reports_errors_and_exit_status(tmp_path, pipeline, capsys):
+    path = tmp_path / "questions.csv"
+    path.write_text("id,question\n1,how many clients in 2024\n2,explode\n", encoding="utf-8")
+
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["--batch", str(path), "--workers", "2"])
+
+    assert exc.value.code == 1
+    records = {r["id"]: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert records["1"]["route"] == "DATA"
+    assert records["2"]["route"] == "ERROR"
+    assert records["2"]["error"] == "RuntimeError: boom"
+
+
+def test_read_batch_rejects_rows_without_question(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text(json.dumps({"id": 1}) + "\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="line 1"):
+        cli.read_batch(str(path))
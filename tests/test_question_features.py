@@ -0,0 +1,62 @@
+import pytest
+
+from app.agents.guardrails.gatekeeper import gatekeep, is_unsafe_user_input
+from app.agents.guardrails.router import route_message
+from app.pipeline.chatbot_orchestrator import classify_turn_intent
+from app.question_features import question_features, vocabulary
+
+
+def test_features_tokenize_words_phrases_years_and_top_k():
+    features = question_features("  Top 10 communes by number of clients in 2024?  ")
+
+    assert features.text == "Top 10 communes by number of clients in 2024?"
+    assert features.words[:3] == ("top", "10", "communes")
+    assert features.years == ("2024",)
+    assert features.top_k == 10
+    assert features.has(vocabulary("number of clients"))
+    assert features.starts_with(vocabulary("top 10"))
+    assert not features.has_sql_marker
+
+
+def test_phrases_do_not_cross_punctuation():
+    features = question_features("show clients by, segment")
+
+    assert "by segment" not in features.terms
+    assert "clients by" in features.terms
+
+
+def test_features_are_shared_across_callers():
+    assert question_features("how many clients?") is question_features(" how many clients? ")
+
+
+def test_vocabulary_rejects_phrases_longer_than_the_index():
+    with pytest.raises(ValueError):
+        vocabulary("one two three four five six")
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["SELECT * FROM clients", "clients; DROP TABLE clients", "count -- comment", "update the chart"],
+)
+def test_unsafe_input_detected_from_features(question):
+    assert is_unsafe_user_input(question)
+    assert route_message(question).route == "REFUSE"
+
+
+def test_gatekeep_refuses_pii_words_only():
+    assert gatekeep("show nom and prenom").parsed_intent == "pii_request"
+    assert gatekeep("les noms des communes").parsed_intent == "sql_query"
+
+
+@pytest.mark.parametrize(
+    ("question", "intent"),
+    [
+        ("no by segment", "correction"),
+        ("no. by month", "unsupported_ambiguous"),
+        ("Actually top 3", "topk_modification"),
+        ("why is the result empty", "empty_result_explanation"),
+        ("compare  with 2023", "comparison_request"),
+    ],
+)
+def test_turn_intents_from_features(question, intent):
+    assert classify_turn_intent(question, {}, "") == intent
@@ -0,0 +1,94 @@
+import importlib
+import os
+import sqlite3
+import time
+
+from app.db.result_cache import QUERY_RESULT_CACHE, ResultCache, normalize_sql_key
+from app.pipeline.execute_sql import execute_sql
+
+
+def _build_db(db_path, communes=("Paris", "Lyon")):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE clients (client_id INTEGER PRIMARY KEY, commune TEXT)")
+    conn.executemany("INSERT INTO clients (commune) VALUES (?)", [(c,) for c in communes])
+    conn.commit()
+    conn.close()
+
+
+def test_normalize_sql_key_ignores_case_and_spacing_but_keeps_literals():
+    a = normalize_sql_key("SELECT commune\n  FROM clients WHERE commune = 'Paris';")
+    b = normalize_sql_key("select commune from   CLIENTS where commune = 'Paris'")
+    c = normalize_sql_key("select commune from clients where commune = 'paris'")
+
+    assert a == b
+    assert a != c
+
+
+def test_result_cache_evicts_least_recently_used_by_bytes():
+    cache = ResultCache(max_entries=10, max_bytes=100, ttl_s=60)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["cache_evictions"] == 1
+    assert cache.put("huge", 4, 101) is False
+
+
+def test_result_cache_expires_entries():
+    cache = ResultCache(ttl_s=0.01)
+    cache.put("a", 1, 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+
+
+def test_execute_sql_serves_repeated_query_from_cache(tmp_path, monkeypatch):
+    db_path = tmp_path / "cache.sqlite"
+    _build_db(db_path)
+    QUERY_RESULT_CACHE.clear()
+    calls = []
+
+    module = importlib.import_module("app.pipeline.execute_sql")
+    real_run_query = module.run_query
+    monkeypatch.setattr(module, "run_query", lambda *a, **kw: calls.append(a) or real_run_query(*a, **kw))
+
+    first = execute_sql(str(db_path), "SELECT commune FROM clients ORDER BY commune")
+    second = execute_sql(str(db_path), "select commune  from clients order by commune")
+
+    assert first["rows"] == second["rows"] == [("Lyon",), ("Paris",)]
+    assert second["cached"] is True
+    assert len(calls) == 1
+
+
+def test_execute_sql_cache_misses_after_database_rebuild(tmp_path):
+    db_path = tmp_path / "cache.sqlite"
+    _build_db(db_path)
+    QUERY_RESULT_CACHE.clear()
+    sql = "SELECT COUNT(*) AS n FROM clients"
+    assert execute_sql(str(db_path), sql)["rows"] == [(2,)]
+
+    rebuilt = tmp_path / "rebuilt.sqlite"
+    _build_db(rebuilt, communes=("Paris", "Lyon", "Nice"))
+    os.replace(rebuilt, db_path)
+
+    assert execute_sql(str(db_path), sql)["rows"] == [(3,)]
+
+
+def test_result_cache_reads_env_limits_on_first_use(monkeypatch):
+    cache = ResultCache(max_entries=256, env_prefix="TEST_RESULT_CACHE")
+    monkeypatch.setenv("TEST_RESULT_CACHE_MAX_ENTRIES", "1")
+
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+
+    assert cache.max_entries == 1
+    assert cache.get("a") is None and cache.get("b") == 2
+
+    monkeypatch.setenv("TEST_RESULT_CACHE_MAX_ENTRIES", "0")
+    cache.reconfigure()
+
+    assert cache.put("c", 3, 10) is False
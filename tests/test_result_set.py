@@ -0,0 +1,58 @@
+import pytest
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.db.result_set import ResultSet
+from app.formatters.viz_plotly import describe_result_set, infer_plotly
+
+
+def test_result_set_behaves_like_row_list_but_is_immutable():
+    rows = ResultSet(["commune", "n"], [("A", 3), ("B", 2)])
+
+    assert rows == [("A", 3), ("B", 2)]
+    assert rows[0][0] == "A"
+    assert len(rows) == 2
+    with pytest.raises(TypeError):
+        rows.append(("C", 1))
+    with pytest.raises(TypeError):
+        rows[0] = ("C", 1)
+
+
+def test_result_set_builds_typed_columns_and_frame_once():
+    rows = ResultSet(["commune", "n", "ratio", "x"], [("A", 3, 0.5, 1), ("B", 2, 1, None)])
+
+    assert rows.column("n").dtype.kind == "i"
+    assert rows.column("ratio").dtype.kind == "f"
+    assert rows.column(3).dtype == object
+    assert rows.column(1).flags.writeable is False
+    assert rows.to_frame() is rows.to_frame()
+    assert list(rows.to_frame()["n"]) == [3, 2]
+
+
+def test_result_set_frame_keeps_duplicate_column_names():
+    frame = ResultSet(["a", "a"], [(1, 2)]).to_frame()
+
+    assert list(frame.columns) == ["a", "a"]
+    assert frame.iloc[0].tolist() == [1, 2]
+
+
+def test_result_set_profile_matches_plain_rows_and_is_cached():
+    plain = [["A", 10], ["B", 8]]
+    rows = ResultSet(["commune", "nombre_clients"], [("A", 10), ("B", 8)])
+
+    profile = describe_result_set(["commune", "nombre_clients"], rows)
+    profile["reason"] = "mutated by caller"
+
+    assert describe_result_set(["commune", "nombre_clients"], rows) == describe_result_set(
+        ["commune", "nombre_clients"], plain
+    )
+    viz = infer_plotly("pie chart", ["commune", "nombre_clients"], rows)
+    assert viz["figure"]["data"][0]["values"] == [10, 8]
+
+
+def test_result_set_survives_checkpoint_serialization_as_plain_rows():
+    serde = JsonPlusSerializer()
+    rows = ResultSet(["commune", "n"], [("A", 3)])
+
+    restored = serde.loads_typed(serde.dumps_typed({"rows": rows}))
+
+    assert restored == {"rows": [["A", 3]]}
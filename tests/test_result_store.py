@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from app.db import result_store
+from app.db.result_set import ResultSet
+from app.db.result_store import ResultStore, result_handle
+
+
+def test_handle_is_content_addressed():
+    store = ResultStore()
+
+    first = store.put(["segment", "count"], [("A", 3), ("B", 5)])
+    again = store.put(["segment", "count"], [["A", 3], ["B", 5]])
+    other = store.put(["segment", "count"], [("A", 4)])
+
+    assert first == again == result_handle(["segment", "count"], [("A", 3)] + [("B", 5)])
+    assert other != first
+    assert len(store) == 2
+
+
+def test_same_rows_object_is_served_from_memory():
+    rows = ResultSet(["segment", "count"], [("A", 3)])
+    store = ResultStore()
+
+    assert store.get(store.put(rows.columns, rows)) is rows
+    assert store.get("unknown") is None
+    assert store.get("") is None
+
+
+def test_evicted_results_spill_to_disk_and_reload(tmp_path):
+    store = ResultStore(max_bytes=1, spill_path=str(tmp_path / "results.sqlite"))
+    first = store.put(["name", "blob"], [("a", b"\x00\x01"), ("b", None)])
+    store.put(["name", "blob"], [("c", 1.5)])
+
+    assert len(store) == 1
+    store.flush()
+    reloaded = store.get(first)
+
+    assert isinstance(reloaded, ResultSet)
+    assert list(reloaded) == [("a", b"\x00\x01"), ("b", None)]
+    assert reloaded.columns == ("name", "blob")
+
+
+def test_memory_only_store_forgets_evicted_results():
+    store = ResultStore(max_bytes=1)
+    first = store.put(["n"], [(1,)])
+    store.put(["n"], [(2,)])
+
+    assert store.get(first) is None
+
+
+def test_results_are_written_through_and_survive_a_restart(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    store = ResultStore(spill_path=path)
+    handle = store.put(["segment", "count"], [("A", 3)])
+    assert store.get(handle) == [("A", 3)]
+    store.flush()
+
+    restarted = ResultStore(spill_path=path)
+
+    assert list(restarted.get(handle)) == [("A", 3)]
+    restarted.clear()
+    assert ResultStore(spill_path=path).get(handle) is None
+
+
+def test_default_spill_path_does_not_depend_on_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    path = Path(result_store._DEFAULT_PATH)
+
+    assert path.is_absolute()
+    assert tmp_path not in path.parents
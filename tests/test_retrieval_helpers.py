@@ -1,7 +1,9 @@
 import sqlite3
 
 from app.db.sqlite import get_prompt_schema_text
-from app.agents.sql.retrieval import retrieve_similar_examples
+from app.agents.sql import retrieval
+from app.agents.sql.example_bank import EXAMPLES
+from app.agents.sql.retrieval import add_example, count_examples, retrieve_similar_examples
 
 
 def _build_test_db(db_path):
@@ -45,4 +47,31 @@ def test_retrieve_similar_examples_prefers_matching_pattern():
 
     assert len(examples) == 2
     assert any("JOIN clients" in example["sql"] for example in examples)
-    assert any("statut_acceptation" in example["sql"] for example in examples)
\ No newline at end of file
+    assert any("statut_acceptation" in example["sql"] for example in examples)
+
+
+def test_retrieval_index_matches_per_example_scoring():
+    examples = list(EXAMPLES)
+    question = "Total transaction amount by month"
+    index = retrieval._RetrievalIndex(examples, None)
+
+    lexical = [retrieval._score_example(question, example) for example in examples]
+    top_by_lexical = max(range(len(examples)), key=lambda i: lexical[i])
+
+    assert int(index.scores(question).argmax()) == top_by_lexical
+
+
+def test_add_example_updates_index_without_reloading(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrieval, "_STORE_PATH", tmp_path / "rag_examples.json")
+    monkeypatch.setattr(retrieval, "_INDEX", None)
+    before = count_examples()
+
+    add_example("Number of loyalty cards per pays", "SELECT pays, COUNT(*) FROM cartes GROUP BY pays")
+    monkeypatch.setattr(retrieval, "_load_examples", lambda: (_ for _ in ()).throw(AssertionError("reloaded")))
+
+    assert count_examples() == before + 1
+    assert retrieve_similar_examples("loyalty cards per pays", k=1)[0]["sql"].startswith("SELECT pays")
+
+    add_example("number of loyalty cards per pays", "SELECT pays, COUNT(DISTINCT id) FROM cartes GROUP BY pays")
+    assert count_examples() == before + 1
+    assert "DISTINCT" in retrieve_similar_examples("loyalty cards per pays", k=1)[0]["sql"]
@@ -0,0 +1,113 @@
+import sqlite3
+import sys
+
+import pytest
+
+from app.db.rollups import build_rollups, rewrite_for_rollups
+from app.db.sqlite import get_schema_text
+from app.pipeline.execute_sql import execute_sql
+from benchmarks.synthetic_db import build_synthetic_db
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    path = build_synthetic_db(tmp_path_factory.mktemp("rollups") / "synthetic.db", clients=300)
+    with sqlite3.connect(path) as con:
+        built = build_rollups(con)
+    assert set(built) == {
+        "rollup_transactions_hourly",
+        "rollup_transactions_segment_monthly",
+        "rollup_dossiers",
+        "rollup_dossiers_acceptance",
+        "rollup_transactions_monthly",
+    }
+    return str(path)
+
+
+def _rows(db_path, sql):
+    with sqlite3.connect(db_path) as con:
+        cur = con.execute(sql)
+        columns = [description[0] for description in cur.description]
+        rows = [tuple(round(v, 6) if isinstance(v, float) else v for v in row) for row in cur.fetchall()]
+    return columns, rows
+
+
+@pytest.mark.parametrize(
+    "sql, rollup",
+    [
+        (
+            "SELECT pays, SUM(montant) AS montant_total FROM transactions "
+            "WHERE strftime('%Y', date_transaction) = '2023' GROUP BY pays ORDER BY montant_total DESC LIMIT 200",
+            "rollup_transactions_monthly",
+        ),
+        (
+            "SELECT strftime('%Y-%m', date_transaction) AS mois, COUNT(*) AS nb FROM transactions GROUP BY mois ORDER BY mois",
+            "rollup_transactions_monthly",
+        ),
+        (
+            "SELECT categorie_achat, ROUND(AVG(montant), 2) FROM transactions GROUP BY categorie_achat ORDER BY AVG(montant) DESC",
+            "rollup_transactions_monthly",
+        ),
+        (
+            "SELECT strftime('%H', datetime_transaction) AS heure, COUNT(*) AS nb FROM transactions GROUP BY heure ORDER BY heure",
+            "rollup_transactions_hourly",
+        ),
+        (
+            "SELECT c.segment_client, AVG(t.montant) AS montant_moyen FROM transactions t "
+            "JOIN clients c ON t.client_id = c.client_id GROUP BY c.segment_client ORDER BY montant_moyen DESC",
+            "rollup_transactions_segment_monthly",
+        ),
+        (
+            "SELECT AVG(montant) AS montant_moyen FROM dossiers WHERE statut_acceptation = 'ACCEPTE'",
+            "rollup_dossiers",
+        ),
+        (
+            "SELECT d.type_produit, c.segment_client, COUNT(*) AS nb FROM dossiers d "
+            "JOIN clients c ON d.client_id = c.client_id GROUP BY d.type_produit, c.segment_client ORDER BY nb DESC",
+            "rollup_dossiers_acceptance",
+        ),
+        ("SELECT COUNT(*) FROM transactions WHERE strftime('%Y', date_transaction) = '1999'", "rollup_transactions_monthly"),
+    ],
+)
+def test_rewritten_query_returns_the_same_result_from_the_rollup(db_path, sql, rollup):
+    rewritten, used = rewrite_for_rollups(db_path, sql)
+
+    assert used == rollup
+    assert f"FROM {rollup}" in rewritten
+    assert _rows(db_path, rewritten) == _rows(db_path, sql)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT segment_client, COUNT(*) AS nb FROM clients GROUP BY segment_client",
+        "SELECT pays, COUNT(DISTINCT client_id) FROM transactions GROUP BY pays",
+        "SELECT pays, COUNT(*) FROM transactions WHERE montant > 10 GROUP BY pays",
+        "SELECT enseigne, COUNT(*) FROM transactions GROUP BY enseigne",
+        "SELECT client_id, SUM(nombre_incidents_paiement) AS n FROM dossiers GROUP BY client_id HAVING n > 5",
+        "SELECT t.pays, COUNT(*) FROM transactions t LEFT JOIN clients c ON t.client_id = c.client_id GROUP BY t.pays",
+        "SELECT pays, montant FROM transactions",
+    ],
+)
+def test_queries_outside_the_rollups_are_left_alone(db_path, sql):
+    assert rewrite_for_rollups(db_path, sql) is None
+
+
+def test_execute_sql_reads_rollups_only_when_enabled(db_path, monkeypatch):
+    execute_module = sys.modules["app.pipeline.execute_sql"]
+    executed = []
+    run_query = execute_module.run_query
+    monkeypatch.setattr(
+        execute_module, "run_query", lambda path, query, **kwargs: executed.append(query) or run_query(path, query, **kwargs)
+    )
+    sql = "SELECT pays, COUNT(*) AS nb FROM transactions GROUP BY pays ORDER BY nb DESC"
+    expected = execute_sql(db_path, sql, use_cache=False)
+    monkeypatch.setenv("ROLLUP_REWRITE", "on")
+
+    result = execute_sql(db_path, sql, use_cache=False)
+
+    assert executed[0] == sql
+    assert "FROM rollup_transactions_monthly" in executed[1]
+    assert result["ok"] and result["sql"] == sql
+    assert list(result["rows"]) == list(expected["rows"])
+    assert "rollup_" not in get_schema_text(db_path)
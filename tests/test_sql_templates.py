@@ -0,0 +1,112 @@
+import sqlite3
+
+import pytest
+
+from app.agents.sql.templates import compile_request_sql, compile_template_sql
+from app.pipeline.chatbot_orchestrator import build_normalized_request
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    # Like the pandas-built database: no declared primary keys.
+    path = tmp_path / "statapp.sqlite"
+    con = sqlite3.connect(path)
+    con.executescript(
+        """
+        CREATE TABLE clients (client_id INTEGER, segment_client TEXT, commune TEXT, anciennete_mois INTEGER);
+        CREATE TABLE dossiers (dossier_id INTEGER, client_id INTEGER, type_produit TEXT, montant REAL);
+        CREATE TABLE transactions (
+            transaction_id INTEGER, client_id INTEGER, dossier_id INTEGER,
+            montant REAL, pays TEXT, date_transaction TEXT
+        );
+        INSERT INTO clients VALUES (1, 'A', 'Paris', 10), (2, 'B', 'Lyon', 20);
+        INSERT INTO dossiers VALUES (1, 1, 'PRET', 100.0), (2, 1, 'CARTE', 50.0);
+        INSERT INTO transactions VALUES
+            (1, 1, 1, 10.0, 'FR', '2023-01-05'), (2, 2, 2, 5.0, 'BE', '2024-02-01');
+        """
+    )
+    con.commit()
+    con.close()
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("How many clients?", "SELECT COUNT(*) AS nb FROM clients"),
+        (
+            "How many clients by segment?",
+            "SELECT segment_client, COUNT(*) AS nb FROM clients GROUP BY segment_client ORDER BY nb DESC LIMIT 200",
+        ),
+        (
+            "Total transaction amount by country in 2023",
+            "SELECT pays, SUM(montant) AS montant_total FROM transactions "
+            "WHERE strftime('%Y', date_transaction) = '2023' GROUP BY pays ORDER BY montant_total DESC LIMIT 200",
+        ),
+        (
+            "Monthly number of transactions in 2024",
+            "SELECT strftime('%Y-%m', date_transaction) AS mois, COUNT(*) AS nb FROM transactions "
+            "WHERE strftime('%Y', date_transaction) = '2024' GROUP BY mois ORDER BY mois",
+        ),
+        (
+            "Average transaction amount by client segment",
+            "SELECT c.segment_client, AVG(t.montant) AS montant_moyen FROM transactions t "
+            "JOIN clients c ON t.client_id = c.client_id GROUP BY c.segment_client ORDER BY montant_moyen DESC LIMIT 200",
+        ),
+        (
+            "Number of clients by product type",
+            "SELECT d.type_produit, COUNT(DISTINCT c.client_id) AS nb FROM clients c "
+            "JOIN dossiers d ON c.client_id = d.client_id GROUP BY d.type_produit ORDER BY nb DESC LIMIT 200",
+        ),
+        (
+            "Top 1 communes by number of clients",
+            "SELECT commune, COUNT(*) AS nb FROM clients GROUP BY commune ORDER BY nb DESC LIMIT 1",
+        ),
+    ],
+)
+def test_compile_template_sql_fills_templates_from_the_schema(db_path, question, expected):
+    sql = compile_template_sql(db_path, question)
+
+    assert sql == expected
+    with sqlite3.connect(db_path) as con:
+        con.execute(sql).fetchall()
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Acceptance rate by product type",  # unknown words
+        "Total amount by segment",  # montant lives on two tables
+        "Total client seniority by product type",  # would sum clients once per dossier
+        "How many clients in 2024?",  # clients has no date column
+        "How many clients by segment and commune?",  # two dimensions
+        "Top clients by segment",  # "top" without a number
+        "list clients",  # no aggregate and no grouping
+    ],
+)
+def test_compile_template_sql_leaves_other_questions_to_the_llm(db_path, question):
+    assert compile_template_sql(db_path, question) is None
+
+
+def test_compile_request_sql_parses_the_original_question_only_when_nothing_is_inherited(db_path):
+    fresh = build_normalized_request("How many clients by segment?", "new_analytical_question", {}, "schema")
+    assert compile_request_sql(db_path, fresh) == compile_template_sql(db_path, "How many clients by segment?")
+    assert compile_request_sql(db_path, fresh) is not None
+
+    prior = {
+        "current_grouping": ["commune"],
+        "current_time_reference": {"kind": "year", "value": "2023"},
+        "current_filters": {"commune": "Paris"},
+    }
+    for question in ("How many clients?", "How many clients by segment?"):
+        follow_up = build_normalized_request(question, "follow_up_refinement", prior, "schema")
+        assert compile_request_sql(db_path, follow_up) is None
+
+
+def test_sql_templates_can_be_switched_off(db_path, monkeypatch):
+    from app.pipeline.langgraph_flow import _template_sql
+
+    state = {"db_path": db_path, "question": "How many clients?"}
+    assert _template_sql(state) == "SELECT COUNT(*) AS nb FROM clients"
+    monkeypatch.setenv("SQL_TEMPLATES", "off")
+    assert _template_sql(state) is None
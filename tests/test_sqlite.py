@@ -0,0 +1,136 @@
+import io
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+from app.db.sqlite import (
+    DBConfig,
+    _connect,
+    count_query_rows,
+    get_schema_text,
+    invalidate_connection_pool,
+    iter_query,
+    run_query,
+)
+from app.pipeline.execute_sql import execute_sql, export_sql_csv
+
+
+def _build_db(db_path, table_sql="CREATE TABLE clients (client_id INTEGER PRIMARY KEY, commune TEXT)"):
+    conn = sqlite3.connect(db_path)
+    conn.execute(table_sql)
+    conn.execute("INSERT INTO clients (client_id, commune) VALUES (1, 'Paris')")
+    conn.commit()
+    conn.close()
+
+
+def test_read_only_connections_are_reused_within_a_thread(tmp_path):
+    db_path = tmp_path / "pool.sqlite"
+    _build_db(db_path)
+    cfg = DBConfig(sqlite_path=db_path)
+
+    con_a = _connect(cfg)
+    con_b = _connect(cfg)
+    other = {}
+    thread = threading.Thread(target=lambda: other.setdefault("con", _connect(cfg)))
+    thread.start()
+    thread.join()
+
+    assert con_a is con_b
+    assert other["con"] is not con_a
+
+
+def test_pooled_connection_rejects_writes(tmp_path):
+    db_path = tmp_path / "pool.sqlite"
+    _build_db(db_path)
+
+    with pytest.raises(sqlite3.OperationalError):
+        run_query(db_path, "DELETE FROM clients")
+
+
+def test_rebuilt_database_is_picked_up(tmp_path):
+    db_path = tmp_path / "pool.sqlite"
+    _build_db(db_path)
+    assert "commune TEXT" in get_schema_text(db_path)
+    con_before = _connect(DBConfig(sqlite_path=db_path))
+
+    rebuilt = tmp_path / "rebuilt.sqlite"
+    _build_db(rebuilt, "CREATE TABLE clients (client_id INTEGER PRIMARY KEY, pays TEXT, commune TEXT)")
+    os.replace(rebuilt, db_path)
+
+    assert "pays TEXT" in get_schema_text(db_path)
+    assert _connect(DBConfig(sqlite_path=db_path)) is not con_before
+    assert run_query(db_path, "SELECT commune FROM clients") == (["commune"], [("Paris",)])
+
+
+def test_invalidate_connection_pool_forces_reconnect(tmp_path):
+    db_path = tmp_path / "pool.sqlite"
+    _build_db(db_path)
+    con_before = _connect(DBConfig(sqlite_path=db_path))
+
+    invalidate_connection_pool(db_path)
+
+    assert _connect(DBConfig(sqlite_path=db_path)) is not con_before
+
+
+def test_iter_query_streams_chunks_and_count_is_exact(tmp_path):
+    db_path = tmp_path / "stream.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE transactions (transaction_id INTEGER PRIMARY KEY, montant REAL)")
+    conn.executemany("INSERT INTO transactions (montant) VALUES (?)", [(float(i),) for i in range(25)])
+    conn.commit()
+    conn.close()
+    sql = "SELECT transaction_id, montant FROM transactions ORDER BY transaction_id"
+
+    columns, chunks = iter_query(db_path, sql, chunk_size=10)
+
+    assert columns == ["transaction_id", "montant"]
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert count_query_rows(db_path, sql) == 25
+
+
+def test_execute_sql_reports_real_total_and_exports_full_result(tmp_path):
+    db_path = tmp_path / "stream.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE transactions (transaction_id INTEGER PRIMARY KEY, montant REAL)")
+    conn.executemany("INSERT INTO transactions (montant) VALUES (?)", [(float(i),) for i in range(25)])
+    conn.commit()
+    conn.close()
+    sql = "SELECT transaction_id FROM transactions"
+
+    result = execute_sql(str(db_path), sql, max_rows=5, use_cache=False)
+    out = io.StringIO()
+    written = export_sql_csv(str(db_path), sql, out)
+
+    assert len(result["rows"]) == 5
+    assert result["total_rows"] == 25
+    assert result["truncated"] is True
+    assert written == 25
+    assert out.getvalue().splitlines()[0] == "transaction_id"
+    assert len(out.getvalue().splitlines()) == 26
+
+
+def test_execute_sql_counts_sql_ending_in_a_comment_and_survives_count_failures(tmp_path, monkeypatch):
+    db_path = tmp_path / "comment.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE transactions (transaction_id INTEGER PRIMARY KEY, montant REAL)")
+    conn.executemany("INSERT INTO transactions (montant) VALUES (?)", [(float(i),) for i in range(25)])
+    conn.commit()
+    conn.close()
+    sql = "SELECT * FROM transactions -- all rows"
+
+    result = execute_sql(str(db_path), sql, max_rows=10, use_cache=False)
+
+    assert result["ok"] is True
+    assert (len(result["rows"]), result["total_rows"], result["truncated"]) == (10, 25, True)
+
+    def _broken_count(*_args, **_kwargs):
+        raise sqlite3.OperationalError("count failed")
+
+    monkeypatch.setattr(sys.modules["app.pipeline.execute_sql"], "count_query_rows", _broken_count)
+    result = execute_sql(str(db_path), sql, max_rows=10, use_cache=False)
+
+    assert result["ok"] is True
+    assert (len(result["rows"]), result["total_rows"], result["truncated"]) == (10, 10, True)
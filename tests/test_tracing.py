@@ -0,0 +1,143 @@
+import asyncio
+import json
+import sqlite3
+import urllib.request
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app import tracing
+from app.db.async_executor import run_in_db_executor, shutdown_db_executor
+from app.db.sqlite import run_query
+from app.llm.usage import TOKEN_USAGE_HANDLER
+from app.pipeline.execute_sql import execute_sql
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("TRACE_EXPORT_PATH", str(path))
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+    return path
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "app.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE clients (client_id INTEGER, segment TEXT)")
+    conn.executemany("INSERT INTO clients VALUES (?, ?)", [(1, "A"), (2, "B"), (3, "A")])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def _exported(path):
+    traces = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        by_name = {}
+        for span in spans:
+            attributes = {item["key"]: next(iter(item["value"].values())) for item in span["attributes"]}
+            by_name.setdefault(span["name"], []).append({"span": span, "attributes": attributes})
+        traces.append(by_name)
+    return traces
+
+
+def test_span_is_a_noop_without_an_exporter(monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORT_PATH", raising=False)
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+
+    with tracing.span("turn") as current:
+        current.set(rows=3)
+        assert tracing.current_span() is None
+        assert tracing.current_trace_id() == ""
+
+
+def test_nested_spans_export_one_otlp_trace_per_root(trace_file, db_path):
+    with tracing.span("turn", thread_id="t1"):
+        first = execute_sql(db_path, "SELECT segment, COUNT(*) FROM clients GROUP BY segment")
+        second = execute_sql(db_path, "SELECT segment, COUNT(*) FROM clients GROUP BY segment")
+        with pytest.raises(ValueError):
+            with tracing.span("format.response"):
+                raise ValueError("bad column")
+
+    assert first["ok"] and second.get("cached")
+    (trace,) = _exported(trace_file)
+    (turn,) = trace["turn"]
+    assert "parentSpanId" not in turn["span"]
+    assert turn["attributes"]["thread_id"] == "t1"
+    assert float(turn["attributes"]["wall_s"]) > 0
+    # The cached second execution never reaches run_query.
+    (query,) = trace["sql.run_query"]
+    miss, hit = trace["sql.execute"]
+    assert query["span"]["parentSpanId"] == miss["span"]["spanId"]
+    assert query["attributes"]["rows"] == "2"
+    assert (miss["attributes"]["cache_hit"], hit["attributes"]["cache_hit"]) == (False, True)
+    assert miss["span"]["parentSpanId"] == turn["span"]["spanId"]
+    (failed,) = trace["format.response"]
+    assert failed["span"]["status"] == {"code": 2, "message": "ValueError: bad column"}
+    assert {item["span"]["traceId"] for items in trace.values() for item in items} == {turn["span"]["traceId"]}
+
+
+def test_executor_queries_nest_under_the_awaiting_span(trace_file, db_path):
+    async def _turn():
+        with tracing.span("node.execute_sql"):
+            return await run_in_db_executor(run_query, db_path, "SELECT * FROM clients")
+
+    try:
+        _columns, rows = asyncio.run(_turn())
+    finally:
+        shutdown_db_executor()
+
+    (trace,) = _exported(trace_file)
+    assert len(rows) == 3
+    assert trace["sql.run_query"][0]["span"]["parentSpanId"] == trace["node.execute_sql"][0]["span"]["spanId"]
+
+
+def test_token_usage_and_cache_hits_land_on_the_current_span(trace_file):
+    response = LLMResult(
+        generations=[
+            [
+                ChatGeneration(
+                    message=AIMessage(
+                        content="SELECT 1",
+                        usage_metadata={"input_tokens": 120, "output_tokens": 8, "total_tokens": 128},
+                    )
+                )
+            ]
+        ]
+    )
+
+    with tracing.span("llm.sql_agent"):
+        tracing.annotate(cache_hit=False)
+        TOKEN_USAGE_HANDLER.on_llm_end(response)
+
+    (trace,) = _exported(trace_file)
+    attributes = trace["llm.sql_agent"][0]["attributes"]
+    assert (attributes["prompt_tokens"], attributes["completion_tokens"], attributes["cache_hit"]) == ("120", "8", False)
+
+
+def test_metrics_endpoint_serves_prometheus_text(monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORT_PATH", raising=False)
+    monkeypatch.setenv("METRICS_PORT", "0")
+    tracing.METRICS.reset()
+    server = tracing.start_metrics_server()
+    try:
+        with tracing.span("sql.execute") as current:
+            current.set(rows=4, cache_hit=True)
+        with tracing.span("sql.execute") as current:
+            current.set(rows=2, cache_hit=False)
+
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode("utf-8")
+    finally:
+        tracing.stop_metrics_server()
+        tracing.METRICS.reset()
+
+    assert 'statapp_span_duration_seconds_count{span="sql.execute"} 2' in body
+    assert 'statapp_span_duration_seconds_bucket{span="sql.execute",le="+Inf"} 2' in body
+    assert 'statapp_rows_total{span="sql.execute"} 6' in body
+    assert 'statapp_cache_lookups_total{span="sql.execute",outcome="hit"} 1' in body
+    assert 'statapp_cache_lookups_total{span="sql.execute",outcome="miss"} 1' in body